@@ -0,0 +1,285 @@
+"""
+SA Health App - Admission Control
+Limits how many audio clips are synthesized at once, so a burst of
+uncached audio requests cannot tie up every worker and take the phrase
+lists down with it.
+
+A request that has to synthesize takes a slot: at most `max_concurrent`
+at once overall and `max_per_client` (running or waiting) per client.
+Beyond that, up to `max_queue` requests wait for a slot for at most
+`queue_timeout` seconds. Everything else is turned away at once - 429
+when one client is over its share, 503 when the service is saturated -
+with a Retry-After estimated from recent synthesis times.
+
+The limiter's state lives in shared memory guarded by a
+multiprocessing.Lock, so when it is created before the workers are
+forked (wsgi.py preloads the app) the limits hold across all of them;
+otherwise they are per process. Each slot records the pid that holds it,
+and slots of workers that died holding them (e.g. killed on timeout)
+are reclaimed. So is the lock itself: it is only ever waited for with a
+timeout, and a lock whose recorded holder is dead is released. If it
+still cannot be had, the synthesis goes ahead unlimited rather than
+hanging the request. Queued requests poll for a free slot (acquire()
+sleeps between polls; asgi.py awaits them through join() and poll()
+instead). Clients are
+counted in a fixed table of hashed buckets, so two clients occasionally
+share a count.
+"""
+
+import math
+import multiprocessing
+import os
+import time
+import zlib
+from contextlib import contextmanager
+
+CLIENT_BUCKETS = 4096
+
+# Seconds to wait for the shared lock, which is only ever held briefly
+LOCK_TIMEOUT = 1.0
+
+# Seconds between checks for a free slot while queued
+POLL_INTERVAL = 0.02
+
+# Header fields of the shared state
+(ADMITTED, REJECTED_CLIENT, REJECTED_BUSY, TIMED_OUT, REAPED, AVERAGE_MS,
+ LOCK_HOLDER, LOCKS_RECOVERED) = range(8)
+HEADER = 8
+
+
+class AdmissionRejected(Exception):
+    """Raised when a synthesis is not admitted; `status` is 429 or 503"""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _alive(pid):
+    if pid == os.getpid() or os.name == 'nt':
+        # On Windows os.kill() terminates the process instead of probing it
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SynthesisLimiter:
+    """Global and per-client concurrency limits with a bounded wait queue"""
+
+    def __init__(self, max_concurrent=4, max_per_client=2, max_queue=4, queue_timeout=5.0):
+        self.max_concurrent = max_concurrent
+        self.max_per_client = max_per_client
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = multiprocessing.Lock()
+        # Held while releasing the lock of a dead holder, so only one process does
+        self._repair = multiprocessing.Lock()
+        # Header, then (pid, bucket + 1) for every running and waiting slot, then the client buckets
+        self._running = HEADER
+        self._waiting = self._running + 2 * max_concurrent
+        self._buckets = self._waiting + 2 * max_queue
+        self._state = multiprocessing.RawArray('q', self._buckets + CLIENT_BUCKETS)
+        # Syntheses let through unlimited because the lock was unavailable (this process)
+        self.bypassed = 0
+
+    def _acquire_lock(self):
+        """Take the shared lock, releasing it first if its holder died; False on timeout"""
+        if self._lock.acquire(timeout=LOCK_TIMEOUT):
+            return True
+        holder = self._state[LOCK_HOLDER]
+        if holder and not _alive(holder) and self._repair.acquire(timeout=LOCK_TIMEOUT):
+            try:
+                # Re-read under the repair lock: another process may have repaired it already
+                if self._state[LOCK_HOLDER] == holder:
+                    self._state[LOCK_HOLDER] = 0
+                    self._state[LOCKS_RECOVERED] += 1
+                    try:
+                        self._lock.release()
+                    except ValueError:
+                        pass  # not held after all
+            finally:
+                self._repair.release()
+        return self._lock.acquire(timeout=LOCK_TIMEOUT)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the shared lock inside the block; yields False if it could not be had"""
+        if not self._acquire_lock():
+            yield False
+            return
+        self._state[LOCK_HOLDER] = os.getpid()
+        try:
+            yield True
+        finally:
+            self._state[LOCK_HOLDER] = 0
+            self._lock.release()
+
+    def _bucket(self, client):
+        return self._buckets + zlib.crc32(client.encode('utf-8')) % CLIENT_BUCKETS
+
+    def _count(self, table, size):
+        return sum(1 for i in range(size) if self._state[table + 2 * i])
+
+    def _take(self, table, size, bucket):
+        """Claim a free entry of a slot table, returning its index"""
+        for i in range(size):
+            index = table + 2 * i
+            if not self._state[index]:
+                self._state[index] = os.getpid()
+                self._state[index + 1] = bucket + 1 if bucket is not None else 0
+                return index
+        raise RuntimeError('no free slot')
+
+    def _free(self, index):
+        bucket = self._state[index + 1]
+        if bucket:
+            self._state[bucket - 1] -= 1
+        self._state[index] = 0
+        self._state[index + 1] = 0
+
+    def _reap(self):
+        """Free the slots of processes that died holding them"""
+        for table, size in ((self._running, self.max_concurrent), (self._waiting, self.max_queue)):
+            for i in range(size):
+                index = table + 2 * i
+                if self._state[index] and not _alive(self._state[index]):
+                    self._free(index)
+                    self._state[REAPED] += 1
+
+    def _retry_after(self):
+        """Seconds until the current backlog should have drained"""
+        average = (self._state[AVERAGE_MS] or 1000) / 1000
+        backlog = self._count(self._running, self.max_concurrent) + self._count(self._waiting, self.max_queue)
+        return max(1, math.ceil(average * (backlog + 1) / self.max_concurrent))
+
+    def _reject(self, counter, message, status):
+        self._state[counter] += 1
+        raise AdmissionRejected(message, status, self._retry_after())
+
+    def _full(self):
+        return self._count(self._running, self.max_concurrent) >= self.max_concurrent
+
+    def acquire(self, client=None):
+        """Take a synthesis slot, waiting in the queue if needed; returns the slot
+
+        `client` None (internal work such as the warm-up) is only subject
+        to the global limit. Returns None, and limits nothing, if the
+        shared lock cannot be had.
+        """
+        slot, waiting = self.join(client)
+        if waiting is None:
+            return slot
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            time.sleep(POLL_INTERVAL)
+            done, slot = self.poll(waiting, deadline)
+            if done:
+                return slot
+
+    def join(self, client=None):
+        """First step of acquire(): (slot, None) if admitted, (None, queue entry) if queued
+
+        Raises AdmissionRejected as acquire() does. A queued caller then
+        calls poll() every POLL_INTERVAL until it is done.
+        """
+        bucket = self._bucket(client) if client is not None else None
+        with self._locked() as locked:
+            if not locked:
+                self.bypassed += 1
+                return None, None
+
+            if bucket is not None and self._state[bucket] >= self.max_per_client:
+                self._reap()
+                if self._state[bucket] >= self.max_per_client:
+                    self._reject(REJECTED_CLIENT, 'Too many audio requests from this client - retry shortly', 429)
+
+            if self._full() or self._count(self._waiting, self.max_queue):
+                self._reap()
+            if not self._full() and not self._count(self._waiting, self.max_queue):
+                slot = self._take(self._running, self.max_concurrent, bucket)
+                if bucket is not None:
+                    self._state[bucket] += 1
+                self._state[ADMITTED] += 1
+                return slot, None
+
+            # Full, or others are already waiting: join the queue
+            if self._count(self._waiting, self.max_queue) >= self.max_queue:
+                self._reject(REJECTED_BUSY, 'Audio generation is busy - retry shortly', 503)
+            waiting = self._take(self._waiting, self.max_queue, bucket)
+            if bucket is not None:
+                self._state[bucket] += 1
+            return None, waiting
+
+    def poll(self, waiting, deadline):
+        """Check on a queue entry from join(): (True, slot) once admitted, (False, None) to keep waiting
+
+        Raises AdmissionRejected once time.monotonic() passes `deadline`.
+        """
+        with self._locked() as locked:
+            if not locked:
+                if time.monotonic() < deadline:
+                    return False, None
+                # Freed even without the lock, like release() - better than leaking the entry
+                self._free(waiting)
+                self.bypassed += 1
+                return True, None
+            if self._full():
+                # A holder may have died
+                self._reap()
+            if not self._full():
+                # Move from the queue to a running slot; the client count carries over
+                bucket = self._state[waiting + 1] - 1 if self._state[waiting + 1] else None
+                self._state[waiting] = 0
+                self._state[waiting + 1] = 0
+                slot = self._take(self._running, self.max_concurrent, bucket)
+                self._state[ADMITTED] += 1
+                return True, slot
+            if time.monotonic() >= deadline:
+                self._free(waiting)
+                self._reject(TIMED_OUT, 'Audio generation is busy - retry shortly', 503)
+            return False, None
+
+    def release(self, slot, seconds):
+        """Free a slot, folding its synthesis time into the average"""
+        if slot is None:
+            return
+        with self._locked() as locked:
+            # Freed even without the lock - better than leaking the slot
+            self._free(slot)
+            if locked:
+                previous = self._state[AVERAGE_MS]
+                elapsed = int(seconds * 1000)
+                self._state[AVERAGE_MS] = elapsed if not previous else (previous * 4 + elapsed) // 5
+
+    @contextmanager
+    def slot(self, client=None):
+        slot = self.acquire(client)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(slot, time.perf_counter() - start)
+
+    def stats(self):
+        """Counters read without the lock (the readiness check must never wait for it)"""
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_per_client': self.max_per_client,
+            'max_queue': self.max_queue,
+            'running': self._count(self._running, self.max_concurrent),
+            'waiting': self._count(self._waiting, self.max_queue),
+            'admitted': self._state[ADMITTED],
+            'rejected_client': self._state[REJECTED_CLIENT],
+            'rejected_busy': self._state[REJECTED_BUSY],
+            'timed_out': self._state[TIMED_OUT],
+            'reaped': self._state[REAPED],
+            'locks_recovered': self._state[LOCKS_RECOVERED],
+            'bypassed': self.bypassed,
+            'average_ms': self._state[AVERAGE_MS]
+        }
@@ -3,11 +3,27 @@ SA Health App - Multilingual Medical Communication Tool
 Flask Backend Application
 """
 
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, render_template, jsonify, request, url_for
+from werkzeug.middleware.proxy_fix import ProxyFix
 import json
 import os
-from gtts import gTTS
-from io import BytesIO
+import threading
+from urllib.parse import urlencode
+
+from catalog import Catalog, CatalogStore, HistoryExpiredError, PhraseUsage, validate_catalog_data
+from compact import CompactCatalog
+from snapshot import SnapshotFile
+from shards import ShardedCatalogStore
+from sqlite_store import SQLiteCatalogStore
+import search  # registers the search indexes with the catalog
+import semantic  # registers the situation finder index
+from category_query import CategoryQueryError
+from pagination import PaginationError, page_slice
+from shared_cache import TieredCache, open_shared_cache
+from serialization import BodyCache, PrebuiltBodies, ProjectionError, WIRE_FORMATS, ndjson_chunks
+from admission import AdmissionRejected, SynthesisLimiter
+from audio import (AudioService, AudioCache, CircuitBreaker, TTSUnavailableError, clip_chunks,
+                   FALLBACK_LANGUAGES, GTTS_LANGUAGE_MAP)
 
 # Initialize Flask app with correct template and static folders
 app = Flask(__name__, 
@@ -17,84 +33,544 @@ app = Flask(__name__,
 # Configure app
 app.config['JSON_SORT_KEYS'] = False
 
+# Audio warm-up: categories whose clips are pre-generated before the app reports ready
+app.config['AUDIO_WARMUP_CATEGORIES'] = [
+    c.strip() for c in os.environ.get('AUDIO_WARMUP_CATEGORIES', 'emergency').split(',') if c.strip()
+]
+app.config['AUDIO_WARMUP_LANGUAGES'] = [
+    l.strip() for l in os.environ.get('AUDIO_WARMUP_LANGUAGES', 'en,zu,xh,af,nso').split(',') if l.strip()
+]
+# Seconds before a warm-up pass with failures is retried (doubling up to WARMUP_RETRY_MAX)
+app.config['AUDIO_WARMUP_RETRY'] = float(os.environ.get('AUDIO_WARMUP_RETRY', 30))
+app.config['AUDIO_CACHE_MAX_BYTES'] = int(os.environ.get('AUDIO_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+# Pack file shared by all worker processes; empty keeps a per-process in-memory cache
+app.config['AUDIO_PACK'] = os.environ.get('AUDIO_PACK', '')
+# Admission control on audio synthesis (cache hits are never limited); 0 concurrency disables it
+app.config['AUDIO_SYNTH_CONCURRENCY'] = int(os.environ.get('AUDIO_SYNTH_CONCURRENCY', 4))
+app.config['AUDIO_SYNTH_PER_CLIENT'] = int(os.environ.get('AUDIO_SYNTH_PER_CLIENT', 2))
+app.config['AUDIO_SYNTH_QUEUE'] = int(os.environ.get('AUDIO_SYNTH_QUEUE', 4))
+app.config['AUDIO_SYNTH_QUEUE_TIMEOUT'] = float(os.environ.get('AUDIO_SYNTH_QUEUE_TIMEOUT', 5))
+# Reverse proxies in front of the app whose X-Forwarded-For is trusted for client addresses
+app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', 0))
+if app.config['TRUSTED_PROXIES']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+# Cache shared by all app nodes (redis://host:port/db or a directory); empty disables it
+app.config['SHARED_CACHE_URL'] = os.environ.get('SHARED_CACHE_URL', '')
+app.config['SHARED_CACHE_TTL'] = float(os.environ.get('SHARED_CACHE_TTL', 7 * 24 * 3600))
+app.config['SHARED_CACHE_MAX_BYTES'] = int(os.environ.get('SHARED_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+app.config['SHARED_CACHE_MAX_ENTRY_BYTES'] = int(os.environ.get('SHARED_CACHE_MAX_ENTRY_BYTES', 8 * 1024 * 1024))
+app.config['SEARCH_MAX_LIMIT'] = 100
+app.config['AUTOCOMPLETE_MAX_LIMIT'] = 10
+app.config['PAGE_DEFAULT_LIMIT'] = 50
+app.config['PAGE_MAX_LIMIT'] = 500
+app.config['BATCH_MAX_IDS'] = int(os.environ.get('BATCH_MAX_IDS', 200))
+app.config['BODY_CACHE_MAX_BYTES'] = int(os.environ.get('BODY_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+app.config['CATALOG_HISTORY_SIZE'] = int(os.environ.get('CATALOG_HISTORY_SIZE', 50))
+app.config['BOOTSTRAP_PAGE_SIZE'] = 20
+# Embed the bootstrap payload in /app so first paint needs no API calls
+app.config['EMBED_BOOTSTRAP'] = os.environ.get('EMBED_BOOTSTRAP', '1') != '0'
+
+# Output of the build pipeline (see build_catalog.py): a directory per
+# build, with 'current' linking to the one to serve. When it exists the
+# app reads the build's validated data and prebuilt artifacts instead of
+# data/, and publishing a new build reloads the catalog like an edit.
+CATALOG_BUILD = os.environ.get('CATALOG_BUILD', os.path.join('data', 'build', 'current'))
+DATA_DIR = CATALOG_BUILD if os.path.isdir(CATALOG_BUILD) else 'data'
+
 # Path to data file
-DATA_FILE = os.path.join('data', 'phrases.json')
+DATA_FILE = os.path.join(DATA_DIR, 'phrases.json')
+
+# Word groups of the situation finder; a change rebuilds the indexes
+CONCEPTS_FILE = os.path.join(DATA_DIR, 'concepts.json')
+semantic.CONCEPTS_FILE = CONCEPTS_FILE
+
+# Compiled snapshot of the data file (see build_snapshot.py), used when
+# it is at least as new as the JSON. Set CATALOG_SNAPSHOT to '' to disable.
+SNAPSHOT_FILE = os.environ.get('CATALOG_SNAPSHOT', os.path.join(DATA_DIR, 'phrases.snapshot'))
+
+# Storage backend: 'memory' keeps the whole catalog in each worker,
+# 'compact' does too but in columnar form instead of nested dicts,
+# 'sqlite' serves it from an indexed database imported from the JSON,
+# 'sharded' loads each language's translations only when first requested
+CATALOG_BACKEND = os.environ.get('CATALOG_BACKEND', 'memory')
+CATALOG_DB = os.environ.get('CATALOG_DB', os.path.join(DATA_DIR, 'phrases.db'))
+CATALOG_SHARDS = os.environ.get('CATALOG_SHARDS', os.path.join(DATA_DIR, 'shards'))
+# Language shards kept loaded per worker by the 'sharded' backend (0 = no limit)
+CATALOG_MAX_LANGUAGES = int(os.environ.get('CATALOG_MAX_LANGUAGES', 0))
+
+# Reload from a background file watcher instead of checking the data
+# files' mtimes on every request; changes are applied after the files
+# have been quiet for CATALOG_WATCH_DEBOUNCE seconds
+CATALOG_WATCH = os.environ.get('CATALOG_WATCH', '0') == '1'
+CATALOG_WATCH_DEBOUNCE = float(os.environ.get('CATALOG_WATCH_DEBOUNCE', 0.5))
+
+# Without the watcher, changed data files are reloaded in a background
+# thread; the request that notices waits this long for it, then (like
+# every other request) is served the previous catalog until it is done
+CATALOG_RELOAD_WAIT = float(os.environ.get('CATALOG_RELOAD_WAIT', 2))
 
 def load_phrases_data():
-    """Load phrases data from JSON file"""
+    """Load and validate phrases data from the JSON file
+
+    Raises on a missing, half-written or invalid file rather than
+    returning an empty catalog, which a reload would otherwise swap in as
+    "every phrase deleted"; the store keeps serving the previous catalog.
+    """
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        return validate_catalog_data(json.load(f))
+
+# In-memory catalog with lookup indexes, reloaded when phrases.json changes
+if CATALOG_BACKEND == 'sqlite':
+    catalog_store = SQLiteCatalogStore(DATA_FILE, CATALOG_DB,
+                                       history_size=app.config['CATALOG_HISTORY_SIZE'],
+                                       index_files=[CONCEPTS_FILE])
+elif CATALOG_BACKEND == 'sharded':
+    catalog_store = ShardedCatalogStore(DATA_FILE, CATALOG_SHARDS, max_languages=CATALOG_MAX_LANGUAGES,
+                                        history_size=app.config['CATALOG_HISTORY_SIZE'],
+                                        index_files=[CONCEPTS_FILE])
+else:
+    catalog_store = CatalogStore(DATA_FILE, load_phrases_data,
+                                 history_size=app.config['CATALOG_HISTORY_SIZE'],
+                                 snapshot=SnapshotFile(SNAPSHOT_FILE) if SNAPSHOT_FILE else None,
+                                 catalog_class=CompactCatalog if CATALOG_BACKEND == 'compact' else Catalog,
+                                 index_files=[CONCEPTS_FILE])
+
+catalog_store.reload_wait = CATALOG_RELOAD_WAIT
+
+def get_catalog():
+    """Get the current indexed catalog"""
+    if CATALOG_WATCH and not catalog_store.watching:
+        # Started lazily so each worker (and each forked child) runs its own
+        catalog_store.start_watching(debounce=CATALOG_WATCH_DEBOUNCE)
+    return catalog_store.get()
+
+def get_list_arg(name):
+    """Read a comma-separated query parameter as a list"""
+    value = request.args.get(name, '')
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def get_limit_arg(default, maximum):
+    """Read the 'limit' query parameter, clamped to [1, maximum]"""
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {"categories": [], "phrases": []}
-    except json.JSONDecodeError:
-        return {"categories": [], "phrases": []}
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+def project(phrases, catalog):
+    """Apply the 'langs' and 'fields' query parameters to a list of phrases"""
+    if not isinstance(phrases, list):
+        # Lazy sequences from the SQLite backend
+        phrases = list(phrases)
+    return catalog.index('projection').project(
+        phrases, langs=get_list_arg('langs'), fields=get_list_arg('fields')
+    )
+
+def paginate(phrases, catalog):
+    """Page and project a phrase list ('limit'/'cursor' optional)"""
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return {'phrases': project(phrases, catalog)}
+    
+    limit = get_limit_arg(app.config['PAGE_DEFAULT_LIMIT'], app.config['PAGE_MAX_LIMIT'])
+    page, next_cursor = page_slice(phrases, catalog.digest, limit, request.args.get('cursor'))
+    page = project(page, catalog)
+    
+    next_url = None
+    if next_cursor:
+        args = request.args.to_dict()
+        args.update(limit=limit, cursor=next_cursor)
+        next_url = url_for(request.endpoint, **request.view_args, **args)
+    
+    return {
+        'phrases': page,
+        'catalog_version': catalog.digest,
+        'next_cursor': next_cursor,
+        'next': next_url
+    }
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def response_mimetype():
+    """Pick the response format from ?format=ndjson or the Accept header (JSON by default)"""
+    if request.args.get('format') == 'ndjson':
+        return NDJSON_MIMETYPE
+    offered = ['application/json', NDJSON_MIMETYPE] + list(WIRE_FORMATS)
+    return request.accept_mimetypes.best_match(offered) or 'application/json'
+
+def wants_ndjson():
+    """True if the client asked for NDJSON via ?format=ndjson or the Accept header"""
+    return response_mimetype() == NDJSON_MIMETYPE
+
+def encode_body(data, mimetype):
+    """Encode a response body as JSON or one of the binary wire formats"""
+    if mimetype in WIRE_FORMATS:
+        return WIRE_FORMATS[mimetype](data)
+    return app.json.response(data).get_data()
+
+def negotiated(data):
+    """Uncached response in the format the client asked for"""
+    mimetype = response_mimetype()
+    if mimetype not in WIRE_FORMATS:
+        mimetype = 'application/json'
+    response = app.response_class(encode_body(data, mimetype), mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
+
+def stream_ndjson(phrases, catalog):
+    """Stream a phrase list as NDJSON (one projected phrase per line)"""
+    langs = get_list_arg('langs')
+    fields = get_list_arg('fields')
+    projector = catalog.index('projection')
+    projector.validate(langs, fields)
+    
+    response = app.response_class(
+        ndjson_chunks(phrases, lambda chunk: projector.project(chunk, langs=langs, fields=fields)),
+        mimetype=NDJSON_MIMETYPE
+    )
+    response.headers['X-Total-Count'] = str(len(phrases))
+    response.headers['X-Catalog-Version'] = catalog.digest
+    response.vary.add('Accept')
+    return response
+
+def with_shared_cache(local, namespace):
+    """`local` in front of the shared cache's `namespace`, or just `local` without one"""
+    if not app.config['SHARED_CACHE_URL']:
+        return local
+    return TieredCache(local, open_shared_cache(
+        app.config['SHARED_CACHE_URL'], namespace,
+        ttl=app.config['SHARED_CACHE_TTL'],
+        max_bytes=app.config['SHARED_CACHE_MAX_BYTES'],
+        max_entry_bytes=app.config['SHARED_CACHE_MAX_ENTRY_BYTES']
+    ))
+
+# Rendered bodies of the list endpoints, keyed by catalog digest, format and query
+body_cache = with_shared_cache(BodyCache(max_bytes=app.config['BODY_CACHE_MAX_BYTES']), 'bodies')
+
+# Bodies rendered by the build pipeline, served to the catalog they were built from
+prebuilt_bodies = PrebuiltBodies(os.path.join(DATA_DIR, 'bodies'))
+
+def cached_body(catalog, key, render):
+    """Body for `key` from the body cache, the prebuilt bodies or render()"""
+    def build():
+        body = prebuilt_bodies.get(catalog, key)
+        return render() if body is None else body
+
+    # By digest, not the per-process version: workers and nodes serving the
+    # same data share bodies through the shared tier whatever their reload count
+    return body_cache.fill(f'{catalog.digest}:{key}', build)
+
+def cached_response(catalog, build):
+    """Serve build()'s body from the body cache when possible, in the negotiated format"""
+    mimetype = response_mimetype()
+    if mimetype not in WIRE_FORMATS:
+        mimetype = 'application/json'
+    query = urlencode(sorted(request.args.items(multi=True)))
+    body = cached_body(catalog, f'{mimetype}:{request.path}?{query}', lambda: encode_body(build(), mimetype))
+    response = app.response_class(body, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
+
+def language_capabilities(catalog):
+    """Per-language phrase counts and audio support"""
+    counts = {language: 0 for language in catalog.languages}
+    for phrase in catalog.phrases:
+        for language in phrase['translations']:
+            counts[language] += 1
+    return {
+        language: {
+            'phrases': count,
+            'audio': 'fallback' if language in FALLBACK_LANGUAGES else 'native',
+            'tts_language': GTTS_LANGUAGE_MAP.get(language, 'en')
+        }
+        for language, count in counts.items()
+    }
+
+def bootstrap_payload(catalog, limit, projected=True):
+    """Everything the app needs for first paint: categories, languages and the first page
+
+    `projected` applies the request's 'langs'/'fields'; without it the
+    page is complete, whatever the query.
+    """
+    page, next_cursor = page_slice(catalog.phrases, catalog.digest, limit, None)
+    return {
+        'success': True,
+        'catalog_version': catalog.digest,
+        'categories': catalog.categories,
+        'languages': language_capabilities(catalog),
+        'total': len(catalog.phrases),
+        'phrases': project(page, catalog) if projected else list(page),
+        'next_cursor': next_cursor
+    }
 
 def get_phrases_by_category(category_id):
     """Get all phrases for a specific category"""
-    data = load_phrases_data()
-    filtered_phrases = [
-        phrase for phrase in data['phrases']
-        if category_id in phrase.get('categories', [])
-    ]
-    return filtered_phrases
+    return get_catalog().get_category_phrases(category_id)
+
+# Phrase usage counts (audio plays), used to rank autocomplete suggestions
+phrase_usage = PhraseUsage()
+
+# Audio clip cache and TTS circuit breaker
+if app.config['AUDIO_PACK']:
+    from audio_pack import AudioPack  # needs fcntl - not available on Windows
+    audio_cache = AudioPack(app.config['AUDIO_PACK'])
+else:
+    audio_cache = AudioCache(max_bytes=app.config['AUDIO_CACHE_MAX_BYTES'])
+audio_limiter = SynthesisLimiter(
+    max_concurrent=app.config['AUDIO_SYNTH_CONCURRENCY'],
+    max_per_client=app.config['AUDIO_SYNTH_PER_CLIENT'],
+    max_queue=app.config['AUDIO_SYNTH_QUEUE'],
+    queue_timeout=app.config['AUDIO_SYNTH_QUEUE_TIMEOUT']
+) if app.config['AUDIO_SYNTH_CONCURRENCY'] > 0 else None
+audio_service = AudioService(cache=with_shared_cache(audio_cache, 'audio'), breaker=CircuitBreaker(),
+                             limiter=audio_limiter)
+
+# Clips of edited or deleted phrases are dropped when the catalog reloads
+catalog_store.listeners.append(
+    lambda old, new, record: audio_service.forget_changed(old, new, record['phrases'])
+)
+
+# Warm-up state reported by the readiness check
+warmup_state = {
+    'started': False,
+    'done': False,
+    'passes': 0,
+    'total': 0,
+    'generated': 0,
+    'failed': 0,
+    'retry_in': None
+}
+warmup_lock = threading.Lock()
+# Set to make the warm-up thread run another pass now
+warmup_wakeup = threading.Event()
+WARMUP_RETRY_MAX = 600
+
+# Reloads may drop clips of the warm-up set (edited phrases) or add to it
+catalog_store.listeners.append(lambda old, new, record: warmup_wakeup.set())
+
+def warmup_clips(catalog):
+    """List the (phrase, language) clips in the configured warm-up set"""
+    clips = []
+    seen = set()
+    for category_id in app.config['AUDIO_WARMUP_CATEGORIES']:
+        for phrase in catalog.get_category_phrases(category_id):
+            for language in app.config['AUDIO_WARMUP_LANGUAGES']:
+                if language in phrase['translations'] and (phrase['id'], language) not in seen:
+                    seen.add((phrase['id'], language))
+                    clips.append((phrase, language))
+    return clips
+
+def warm_up():
+    """Load the catalog and generate the clips of the warm-up set that are not cached"""
+    catalog = get_catalog()
+    clips = warmup_clips(catalog)
+    warmup_state.update(total=len(clips), generated=0, failed=0)
+
+    for phrase, language in clips:
+        if audio_service.is_cached(phrase, language):
+            continue
+        try:
+            audio_service.get_clip(phrase, language)
+            warmup_state['generated'] += 1
+        except Exception:
+            warmup_state['failed'] += 1
+
+    warmup_state['passes'] += 1
+    # Ready once a pass leaves the whole set cached; clips dropped later are
+    # regenerated in the background without taking the worker out of rotation
+    if not warmup_state['failed']:
+        warmup_state['done'] = True
+    return warmup_state
+
+def keep_warm():
+    """Warm up, then again after every reload; passes with failures are retried with backoff"""
+    delay = app.config['AUDIO_WARMUP_RETRY']
+    while True:
+        warmup_wakeup.clear()
+        try:
+            warm_up()
+        except Exception:
+            # Catalog failed to load - retried like a failed clip
+            warmup_state['failed'] += 1
+        if warmup_state['failed']:
+            warmup_state['retry_in'] = delay
+            delay = min(delay * 2, WARMUP_RETRY_MAX)
+        else:
+            warmup_state['retry_in'] = None
+            delay = app.config['AUDIO_WARMUP_RETRY']
+        warmup_wakeup.wait(warmup_state['retry_in'])
+
+def start_warmup():
+    """Start the warm-up thread once per process"""
+    with warmup_lock:
+        if warmup_state['started']:
+            return False
+        warmup_state['started'] = True
+    threading.Thread(target=keep_warm, name='audio-warmup', daemon=True).start()
+    return True
 
 # Routes
 
 @app.route('/')
 def home():
     """Home page route"""
-    data = load_phrases_data()
+    catalog = get_catalog()
     return render_template('index.html', 
-                         categories=data.get('categories', []),
-                         total_phrases=len(data.get('phrases', [])))
+                         categories=catalog.categories,
+                         total_phrases=len(catalog.phrases))
 
 @app.route('/app')
 def app_interface():
     """Interactive app interface"""
-    return render_template('app.html')
+    if not app.config['EMBED_BOOTSTRAP']:
+        return render_template('app.html', bootstrap=None)
+    
+    # The page embeds catalog data, so cache the rendered HTML per catalog digest;
+    # it is cached under one key, so the query string must not shape it
+    catalog = get_catalog()
+    body = cached_body(catalog, '/app', lambda: render_template(
+        'app.html', bootstrap=bootstrap_payload(catalog, app.config['BOOTSTRAP_PAGE_SIZE'], projected=False)
+    ).encode('utf-8'))
+    return app.response_class(body, mimetype='text/html')
 
 @app.route('/api/categories')
 def get_categories():
     """API endpoint to get all categories"""
-    data = load_phrases_data()
-    return jsonify({
+    catalog = get_catalog()
+    return cached_response(catalog, lambda: {
         'success': True,
-        'categories': data.get('categories', [])
+        'categories': catalog.categories
     })
 
+@app.route('/api/bootstrap')
+def get_bootstrap():
+    """API endpoint combining categories, language capabilities and the first page of phrases"""
+    catalog = get_catalog()
+    limit = get_limit_arg(app.config['BOOTSTRAP_PAGE_SIZE'], app.config['PAGE_MAX_LIMIT'])
+    return cached_response(catalog, lambda: bootstrap_payload(catalog, limit))
+
 @app.route('/api/phrases')
 def get_all_phrases():
     """API endpoint to get all phrases"""
-    data = load_phrases_data()
-    return jsonify({
-        'success': True,
-        'total': len(data.get('phrases', [])),
-        'phrases': data.get('phrases', [])
-    })
+    catalog = get_catalog()
+    if wants_ndjson():
+        return stream_ndjson(catalog.phrases, catalog)
+    
+    def build():
+        result = {
+            'success': True,
+            'catalog_version': catalog.digest,
+            'total': len(catalog.phrases)
+        }
+        result.update(paginate(catalog.phrases, catalog))
+        return result
+    
+    return cached_response(catalog, build)
 
 @app.route('/api/phrases/category/<category_id>')
 def get_phrases_by_category_route(category_id):
     """API endpoint to get phrases by category"""
-    phrases = get_phrases_by_category(category_id)
+    catalog = get_catalog()
+    phrases = catalog.get_category_phrases(category_id)
+    if wants_ndjson():
+        return stream_ndjson(phrases, catalog)
     
-    return jsonify({
+    def build():
+        result = {
+            'success': True,
+            'category': category_id,
+            'total': len(phrases)
+        }
+        result.update(paginate(phrases, catalog))
+        return result
+    
+    return cached_response(catalog, build)
+
+@app.route('/api/phrases/query')
+def query_phrases_by_categories():
+    """API endpoint for boolean category expressions, e.g. 'emergency OR symptoms NOT greeting'"""
+    expression = request.args.get('q', '')
+    catalog = get_catalog()
+    
+    try:
+        positions = catalog.index('category_bits').query(expression)
+    except CategoryQueryError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    phrases = catalog.phrases_at(positions)
+    if wants_ndjson():
+        return stream_ndjson(phrases, catalog)
+    
+    def build():
+        result = {
+            'success': True,
+            'query': expression,
+            'total': len(phrases)
+        }
+        result.update(paginate(phrases, catalog))
+        return result
+    
+    return cached_response(catalog, build)
+
+@app.route('/api/phrases/batch', methods=['GET', 'POST'])
+def get_phrases_batch():
+    """API endpoint to get many phrases by ID in one request"""
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        phrase_ids = body.get('ids') if isinstance(body, dict) else None
+        if not isinstance(phrase_ids, list) or not all(isinstance(i, str) for i in phrase_ids):
+            return jsonify({
+                'success': False,
+                'error': "Request body must be JSON like {\"ids\": [\"phrase_001\", ...]}"
+            }), 400
+    else:
+        phrase_ids = get_list_arg('ids')
+    
+    if not phrase_ids:
+        return jsonify({
+            'success': False,
+            'error': 'No phrase IDs given'
+        }), 400
+    
+    max_ids = app.config['BATCH_MAX_IDS']
+    if len(phrase_ids) > max_ids:
+        return jsonify({
+            'success': False,
+            'error': f'Too many phrase IDs ({len(phrase_ids)}); the maximum is {max_ids}'
+        }), 400
+    
+    catalog = get_catalog()
+    phrases = catalog.get_phrases(phrase_ids)
+    found = project([phrase for phrase in phrases if phrase is not None], catalog)
+    
+    # Results follow request order; missing IDs get a not-found marker
+    results = []
+    found_iter = iter(found)
+    for phrase_id, phrase in zip(phrase_ids, phrases):
+        if phrase is None:
+            results.append({'id': phrase_id, 'found': False, 'error': 'Phrase not found'})
+        else:
+            results.append({'id': phrase_id, 'found': True, 'phrase': next(found_iter)})
+    
+    return negotiated({
         'success': True,
-        'category': category_id,
-        'total': len(phrases),
-        'phrases': phrases
+        'total': len(results),
+        'found': len(found),
+        'results': results
     })
 
 @app.route('/api/phrase/<phrase_id>')
 def get_phrase_by_id(phrase_id):
     """API endpoint to get a specific phrase by ID"""
-    data = load_phrases_data()
-    phrase = next((p for p in data['phrases'] if p['id'] == phrase_id), None)
+    catalog = get_catalog()
+    phrase = catalog.get_phrase(phrase_id)
     
     if phrase:
-        return jsonify({
+        return negotiated({
             'success': True,
-            'phrase': phrase
+            'phrase': project([phrase], catalog)[0]
         })
     else:
         return jsonify({
@@ -102,6 +578,171 @@ def get_phrase_by_id(phrase_id):
             'error': 'Phrase not found'
         }), 404
 
+@app.route('/api/changes')
+def get_catalog_changes():
+    """API endpoint for delta sync - phrases and categories changed since a catalog digest"""
+    # Version numbers are per worker process, so clients name the data they have by its digest
+    digest = request.args.get('digest', '')
+    if not digest:
+        return jsonify({
+            'success': False,
+            'error': "Query parameter 'digest' (the catalog_version the client last saw) is required"
+        }), 400
+    
+    try:
+        catalog, changes = catalog_store.changes_since(digest)
+    except HistoryExpiredError as e:
+        catalog = get_catalog()
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'digest': catalog.digest
+        }), 410
+    
+    phrase_changes = changes['phrases']
+    category_changes = changes['categories']
+    changed_ids = phrase_changes['added'] + phrase_changes['modified']
+    
+    return jsonify({
+        'success': True,
+        'since': digest,
+        'digest': catalog.digest,
+        'phrases': {
+            'added': project(catalog.get_phrases(phrase_changes['added']), catalog),
+            'modified': project(catalog.get_phrases(phrase_changes['modified']), catalog),
+            'deleted': phrase_changes['deleted']
+        },
+        'categories': {
+            'added': [c for c in catalog.categories if c['id'] in category_changes['added']],
+            'modified': [c for c in catalog.categories if c['id'] in category_changes['modified']],
+            'deleted': category_changes['deleted']
+        },
+        'hashes': {phrase_id: catalog.phrase_hashes[phrase_id] for phrase_id in changed_ids}
+    })
+
+@app.route('/api/search')
+def search_phrases():
+    """API endpoint for ranked keyword or fuzzy search across all languages"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({
+            'success': False,
+            'error': "Missing search query parameter 'q'"
+        }), 400
+    
+    mode = request.args.get('mode', 'keyword')
+    if mode not in ('keyword', 'fuzzy'):
+        return jsonify({
+            'success': False,
+            'error': f'Unknown search mode: {mode}'
+        }), 400
+    
+    languages = get_list_arg('lang')
+    categories = get_list_arg('category')
+    limit = get_limit_arg(20, app.config['SEARCH_MAX_LIMIT'])
+    
+    catalog = get_catalog()
+    result = {
+        'success': True,
+        'query': query,
+        'mode': mode
+    }
+    
+    if mode == 'fuzzy':
+        # Typo/pronunciation tolerant: also matches phonetic and TTS respellings
+        max_distance = request.args.get('max_distance', type=int)
+        total, hits, matched = catalog.index('fuzzy').search(
+            query, languages=languages, categories=categories, limit=limit,
+            max_distance=max_distance
+        )
+        result['matches'] = {
+            word: [{'term': term, 'distance': distance} for term, distance in terms]
+            for word, terms in matched.items()
+        }
+    else:
+        total, hits = catalog.index('search').search(
+            query, languages=languages, categories=categories, limit=limit
+        )
+    
+    phrases = project([catalog.get_phrase(phrase_id) for phrase_id, _, _ in hits], catalog)
+    result['total'] = total
+    result['results'] = [
+        {
+            'score': round(score, 4),
+            'language': language,
+            'phrase': phrase
+        }
+        for (phrase_id, score, language), phrase in zip(hits, phrases)
+    ]
+    return jsonify(result)
+
+@app.route('/api/autocomplete')
+def autocomplete():
+    """API endpoint for search-as-you-type completions in one language"""
+    prefix = request.args.get('q', '')
+    language = request.args.get('lang', 'en')
+    category = request.args.get('category') or None
+    limit = get_limit_arg(5, app.config['AUTOCOMPLETE_MAX_LIMIT'])
+    
+    catalog = get_catalog()
+    if language not in catalog.languages:
+        return jsonify({
+            'success': False,
+            'error': f'Language {language} not available'
+        }), 400
+    
+    words, phrases = catalog.index('prefix').complete(
+        prefix, language, limit=limit, category=category,
+        usage=phrase_usage.array(catalog)
+    )
+    
+    # Kept deliberately small for slow connections
+    response = jsonify({
+        'success': True,
+        'words': words,
+        'phrases': [{'id': phrase_id, 'text': text} for phrase_id, text in phrases]
+    })
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
+@app.route('/api/suggest')
+def suggest_phrases():
+    """API endpoint for describing a situation in plain words and getting phrases"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({
+            'success': False,
+            'error': "Missing situation description parameter 'q'"
+        }), 400
+    
+    categories = get_list_arg('category')
+    limit = get_limit_arg(10, app.config['SEARCH_MAX_LIMIT'])
+    
+    catalog = get_catalog()
+    hits = catalog.index('semantic').search(query, categories=categories, limit=limit)
+    
+    # Summarize which categories the situation falls into
+    category_scores = {}
+    for phrase_id, score in hits:
+        for category_id in catalog.get_phrase(phrase_id).get('categories', []):
+            category_scores[category_id] = category_scores.get(category_id, 0) + score
+    category_names = {category['id']: category['name'] for category in catalog.categories}
+    phrases = project([catalog.get_phrase(phrase_id) for phrase_id, _ in hits], catalog)
+    
+    return jsonify({
+        'success': True,
+        'query': query,
+        'total': len(hits),
+        'categories': [
+            {'id': category_id, 'name': category_names.get(category_id, category_id), 'score': round(score, 4)}
+            for category_id, score in sorted(category_scores.items(), key=lambda item: -item[1])
+        ],
+        'results': [
+            {'score': round(score, 4), 'phrase': phrase}
+            for (phrase_id, score), phrase in zip(hits, phrases)
+        ]
+    })
+
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
@@ -111,13 +752,66 @@ def health_check():
         'version': '1.0.0'
     })
 
+@app.route('/api/ready')
+def readiness_check():
+    """Readiness endpoint - 200 once the catalog is indexed and audio has been warmed up
+
+    A warm-up pass that left clips missing (TTS down, phrases edited by a
+    reload) does not take the worker out of rotation; the warm-up thread
+    fills them in the background and the report shows what is missing.
+    """
+    # The first probe kicks off warm-up so plain WSGI deployments become ready too
+    start_warmup()
+
+    catalog = get_catalog() if catalog_store.loaded else None
+    cached = 0
+    total = 0
+    if catalog is not None:
+        clips = warmup_clips(catalog)
+        total = len(clips)
+        cached = sum(1 for phrase, language in clips if audio_service.is_cached(phrase, language))
+
+    ready = catalog is not None and warmup_state['done']
+
+    return jsonify({
+        'status': 'ready' if ready else 'warming_up',
+        'catalog': {
+            'loaded': catalog is not None,
+            'version': catalog.version if catalog else None,
+            'digest': catalog.digest if catalog else None,
+            'source': catalog.source if catalog else None,
+            'load_ms': round(catalog.load_seconds * 1000, 1) if catalog and catalog.load_seconds else None,
+            'incremental': catalog.incremental if catalog else False,
+            'phrases': len(catalog.phrases) if catalog else 0,
+            'categories': len(catalog.categories) if catalog else 0,
+            'indexes': sorted(catalog.indexes) if catalog else [],
+            'language_shards': catalog.shards.stats() if hasattr(catalog, 'shards') else None,
+            'import_error': catalog_store.import_error,
+            'load_error': catalog_store.load_error,
+            'watcher': catalog_store.watcher.stats() if catalog_store.watching else None
+        },
+        'warmup': {
+            'categories': app.config['AUDIO_WARMUP_CATEGORIES'],
+            'done': warmup_state['done'],
+            'passes': warmup_state['passes'],
+            'cached': cached,
+            'total': total,
+            'failed': warmup_state['failed'],
+            'retry_in': warmup_state['retry_in']
+        },
+        'prebuilt_bodies': prebuilt_bodies.stats(),
+        'body_cache': body_cache.stats(),
+        'audio_cache': audio_service.cache.stats(),
+        'audio_admission': audio_service.limiter.stats() if audio_service.limiter else None,
+        'tts_breaker': audio_service.breaker.stats()
+    }), 200 if ready else 503
+
 @app.route('/api/audio/<phrase_id>/<language>')
 def generate_audio(phrase_id, language):
     """Generate audio for a specific phrase in a specific language"""
     try:
-        # Load phrase data
-        data = load_phrases_data()
-        phrase = next((p for p in data['phrases'] if p['id'] == phrase_id), None)
+        # Look up phrase in the catalog index
+        phrase = get_catalog().get_phrase(phrase_id)
         
         if not phrase:
             return jsonify({
@@ -132,47 +826,33 @@ def generate_audio(phrase_id, language):
                 'error': f'Language {language} not available for this phrase'
             }), 404
         
-        # gTTS language mapping - some SA languages not yet supported by Google TTS
-        gtts_language_map = {
-            'en': 'en',     # English - supported
-            'af': 'af',     # Afrikaans - supported
-            'zu': 'en',     # Zulu - not supported, use English as fallback
-            'xh': 'en',     # Xhosa - not supported, use English as fallback  
-            'nso': 'en'     # Sepedi - not supported, use English as fallback
-        }
-        
-        gtts_lang = gtts_language_map.get(language, 'en')
-        
-        # For unsupported languages, try to use TTS-optimized pronunciation if available
-        # This uses a special respelling format designed for TTS engines:
-        # - Only ONE capitalized syllable for primary stress
-        # - All other syllables lowercase
-        # - Hyphens for syllable separation (helps TTS parse correctly)
-        translation = phrase['translations'][language]
-        
-        if language in ['zu', 'xh', 'nso'] and 'tts_pronunciation' in translation:
-            # Use TTS-optimized pronunciation respelling
-            text = translation['tts_pronunciation']
-        else:
-            # Use native text (for supported languages or when no TTS pronunciation exists)
-            text = translation['text']
+        # Serve from the clip cache, synthesizing with gTTS on a miss if admitted
+        clip = audio_service.get_clip(phrase, language, client=request.remote_addr)
+        phrase_usage.record(phrase_id, get_catalog())
         
-        # Generate audio using gTTS
-        tts = gTTS(text=text, lang=gtts_lang, slow=False)
-        
-        # Save to in-memory buffer
-        audio_buffer = BytesIO()
-        tts.write_to_fp(audio_buffer)
-        audio_buffer.seek(0)
-        
-        # Return audio file
-        return send_file(
-            audio_buffer,
-            mimetype='audio/mp3',
-            as_attachment=False,
-            download_name=f'{phrase_id}_{language}.mp3'
-        )
+        # Stream the clip straight from the cache (a memoryview of the pack
+        # file's mmap when AUDIO_PACK is set), honouring Range requests
+        view = memoryview(clip)
+        response = app.response_class(clip_chunks(view), mimetype='audio/mp3', direct_passthrough=True)
+        response.headers['Content-Disposition'] = f'inline; filename={phrase_id}_{language}.mp3'
+        response.content_length = len(view)
+        response.accept_ranges = 'bytes'
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(view))
         
+    except TTSUnavailableError as e:
+        response = jsonify({
+            'success': False,
+            'error': str(e)
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+    except AdmissionRejected as e:
+        response = jsonify({
+            'success': False,
+            'error': str(e)
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status
     except Exception as e:
         return jsonify({
             'success': False,
@@ -189,6 +869,23 @@ def not_found(error):
         'error': 'Resource not found'
     }), 404
 
+@app.errorhandler(PaginationError)
+def pagination_error(error):
+    """Handle invalid or stale pagination cursors"""
+    return jsonify({
+        'success': False,
+        'error': str(error),
+        'catalog_version': get_catalog().digest
+    }), error.status
+
+@app.errorhandler(ProjectionError)
+def projection_error(error):
+    """Handle unknown languages or fields in 'langs'/'fields'"""
+    return jsonify({
+        'success': False,
+        'error': str(error)
+    }), 400
+
 @app.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors"""
@@ -202,4 +899,5 @@ if __name__ == '__main__':
     # Use debug=False for production, debug=True for local development
     import os
     debug_mode = os.environ.get('FLASK_ENV') == 'development'
+    start_warmup()
     app.run(debug=debug_mode, host='0.0.0.0', port=5000)
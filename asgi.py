@@ -0,0 +1,198 @@
+"""
+SA Health App - ASGI Entry Point
+Serves the same Flask app from an event loop, so a request waiting for
+text-to-speech holds a coroutine instead of a worker thread.
+
+Audio requests whose clip is not cached yet are handled here: the cache
+lookup (which may read the pack file, a shared cache directory or a
+Redis server) runs in the default executor, and synthesis runs in a
+bounded pool of ASGI_TTS_THREADS threads, subject to the same admission
+control as under WSGI (see admission.py). A request queued for a slot
+waits on the event loop, polling the limiter between sleeps, and only
+takes a TTS thread once admitted. Concurrent requests for the same clip
+share one synthesis. Once the clip is cached - or TTS has
+failed - the request is passed on to the Flask route, which serves the
+hit (or the error) exactly as under WSGI. A synthesized clip the cache
+did not keep (too large, a failed pack write, an unreachable shared
+cache) is sent from here instead, as a whole, so TTS is not called
+again. All other routes go straight to Flask, run in the executor
+through asgiref's WSGI adapter.
+
+The catalog is preloaded on import as in wsgi.py.
+
+Usage: uvicorn asgi:application --port 8000
+   or: gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:application
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.http import parse_list_header
+
+import app as app_module
+import wsgi
+from admission import POLL_INTERVAL, AdmissionRejected
+from audio import TTSUnavailableError
+
+# Threads synthesizing at once; further misses wait on the event loop for one
+TTS_THREADS = int(os.environ.get('ASGI_TTS_THREADS', 32))
+
+AUDIO_PATH = re.compile(r'^/api/audio/([^/]+)/([^/]+)$')
+
+tts_executor = ThreadPoolExecutor(TTS_THREADS, thread_name_prefix='tts')
+flask_application = WsgiToAsgi(wsgi.application)
+
+# Clip key -> future of the synthesis in progress
+_synthesizing = {}
+
+
+def _audio_job(phrase_id, language):
+    """(phrase, clip key) if the clip has to be synthesized, else None"""
+    phrase = app_module.get_catalog().get_phrase(phrase_id)
+    if not phrase or language not in phrase['translations']:
+        return None  # Flask answers with the 404
+    if app_module.audio_service.is_cached(phrase, language):
+        return None
+    return phrase, app_module.audio_service.key_for(phrase, language)
+
+
+def _left_uncached(phrase, language):
+    """True if the cache did not keep a synthesized clip; the play is then recorded here"""
+    if app_module.audio_service.is_cached(phrase, language):
+        return False
+    app_module.phrase_usage.record(phrase['id'], app_module.get_catalog())
+    return True
+
+
+def _client_address(scope):
+    """The client address the Flask route sees, behind TRUSTED_PROXIES proxies as ProxyFix resolves it"""
+    trusted = app_module.app.config['TRUSTED_PROXIES']
+    if trusted:
+        forwarded = b','.join(value for name, value in scope.get('headers', ()) if name == b'x-forwarded-for')
+        addresses = parse_list_header(forwarded.decode('latin-1'))
+        if len(addresses) >= trusted:
+            return addresses[-trusted]
+    return scope['client'][0] if scope.get('client') else None
+
+
+def _forget(key, future):
+    if _synthesizing.get(key) is future:
+        del _synthesizing[key]
+
+
+async def _admit(limiter, client):
+    """Wait for a synthesis slot without holding a TTS thread; returns the slot
+
+    Each step takes the shared lock, which may block briefly, so it runs
+    in the default executor.
+    """
+    loop = asyncio.get_running_loop()
+    slot, waiting = await loop.run_in_executor(None, limiter.join, client)
+    if waiting is None:
+        return slot
+    deadline = time.monotonic() + limiter.queue_timeout
+    while True:
+        await asyncio.sleep(POLL_INTERVAL)
+        done, slot = await loop.run_in_executor(None, limiter.poll, waiting, deadline)
+        if done:
+            return slot
+
+
+def _get_admitted_clip(phrase, language, client, slot):
+    """Run in a TTS thread: get the clip with the slot _admit() took, then free it"""
+    service = app_module.audio_service
+    start = time.perf_counter()
+    try:
+        return service.get_clip(phrase, language, client, admitted=True)
+    finally:
+        service.limiter.release(slot, time.perf_counter() - start)
+
+
+async def _get_clip(phrase, language, client):
+    service = app_module.audio_service
+    loop = asyncio.get_running_loop()
+    if service.limiter is None:
+        return await loop.run_in_executor(tts_executor, service.get_clip, phrase, language, client)
+    # An open breaker answers at once, as under WSGI, rather than after queueing
+    if not service.breaker.allow():
+        raise TTSUnavailableError(service.breaker.retry_after())
+    slot = await _admit(service.limiter, client)
+    return await loop.run_in_executor(tts_executor, _get_admitted_clip, phrase, language, client, slot)
+
+
+async def _synthesize(phrase, language, key, client):
+    """Await the clip's synthesis, joining one already in progress"""
+    future = _synthesizing.get(key)
+    if future is not None:
+        try:
+            # A client that disconnects must not cancel the synthesis others wait for
+            return await asyncio.shield(future)
+        except AdmissionRejected:
+            pass  # the request we joined was turned away - try on our own client's account
+
+    future = asyncio.ensure_future(_get_clip(phrase, language, client))
+    _synthesizing[key] = future
+    future.add_done_callback(lambda done: _forget(key, done))
+    return await asyncio.shield(future)
+
+
+async def _send_json(send, status, payload, retry_after=None):
+    body = json.dumps(payload).encode('utf-8')
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('ascii'))]
+    if retry_after is not None:
+        headers.append((b'retry-after', str(retry_after).encode('ascii')))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_clip(send, scope, phrase_id, language, clip):
+    """Send a clip as the Flask route would, without Range support"""
+    body = bytes(clip)
+    headers = [
+        (b'content-type', b'audio/mp3'),
+        (b'content-length', str(len(body)).encode('ascii')),
+        (b'content-disposition', f'inline; filename={phrase_id}_{language}.mp3'.encode('utf-8'))
+    ]
+    await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body if scope['method'] == 'GET' else b''})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            tts_executor.shutdown(wait=False, cancel_futures=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+
+    match = AUDIO_PATH.match(scope.get('path', '')) if scope['type'] == 'http' else None
+    if match and scope['method'] in ('GET', 'HEAD'):
+        phrase_id, language = match.groups()
+        loop = asyncio.get_running_loop()
+        try:
+            job = await loop.run_in_executor(None, _audio_job, phrase_id, language)
+            if job is not None:
+                clip = await _synthesize(job[0], language, job[1], _client_address(scope))
+                if await loop.run_in_executor(None, _left_uncached, job[0], language):
+                    return await _send_clip(send, scope, phrase_id, language, clip)
+        except TTSUnavailableError:
+            pass  # the route answers 503 with Retry-After from the open breaker
+        except AdmissionRejected as e:
+            return await _send_json(send, e.status, {'success': False, 'error': str(e)}, e.retry_after)
+        except Exception as e:
+            # Not retried synchronously by the route - that would call TTS again
+            return await _send_json(send, 500, {'success': False, 'error': str(e)})
+
+    await flask_application(scope, receive, send)
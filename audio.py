@@ -0,0 +1,203 @@
+"""
+SA Health App - Audio Generation
+Text-to-speech synthesis with an in-memory clip cache and a circuit
+breaker around the upstream gTTS service.
+"""
+
+import hashlib
+import threading
+import time
+from io import BytesIO
+
+from gtts import gTTS
+
+from cache import LRUCache
+
+# gTTS language mapping - some SA languages not yet supported by Google TTS
+GTTS_LANGUAGE_MAP = {
+    'en': 'en',     # English - supported
+    'af': 'af',     # Afrikaans - supported
+    'zu': 'en',     # Zulu - not supported, use English as fallback
+    'xh': 'en',     # Xhosa - not supported, use English as fallback
+    'nso': 'en'     # Sepedi - not supported, use English as fallback
+}
+
+# Languages that are spoken through the English voice using a respelling
+FALLBACK_LANGUAGES = ['zu', 'xh', 'nso']
+
+# WSGI servers only accept bytes, so clips are written out in slices of this size
+CLIP_CHUNK_SIZE = 64 * 1024
+
+
+class TTSUnavailableError(Exception):
+    """Raised when the TTS circuit breaker is open"""
+
+    def __init__(self, retry_after):
+        super().__init__('Text-to-speech service temporarily unavailable')
+        self.retry_after = retry_after
+
+
+def tts_input(translation, language):
+    """Return (text, gtts_lang) to synthesize for a translation"""
+    gtts_lang = GTTS_LANGUAGE_MAP.get(language, 'en')
+
+    # For unsupported languages, try to use TTS-optimized pronunciation if available
+    # This uses a special respelling format designed for TTS engines:
+    # - Only ONE capitalized syllable for primary stress
+    # - All other syllables lowercase
+    # - Hyphens for syllable separation (helps TTS parse correctly)
+    if language in FALLBACK_LANGUAGES and 'tts_pronunciation' in translation:
+        text = translation['tts_pronunciation']
+    else:
+        # Use native text (for supported languages or when no TTS pronunciation exists)
+        text = translation['text']
+
+    return text, gtts_lang
+
+
+def synthesize(text, gtts_lang):
+    """Generate MP3 bytes using gTTS"""
+    tts = gTTS(text=text, lang=gtts_lang, slow=False)
+    audio_buffer = BytesIO()
+    tts.write_to_fp(audio_buffer)
+    return audio_buffer.getvalue()
+
+
+def clip_chunks(view, chunk_size=CLIP_CHUNK_SIZE):
+    """Yield a clip (a memoryview) as bytes, copying one chunk at a time"""
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
+
+
+def clip_key(phrase_id, language, text, gtts_lang):
+    """Cache key for a clip - changes whenever the spoken text changes"""
+    text_hash = hashlib.sha1(f'{gtts_lang}:{text}'.encode('utf-8')).hexdigest()[:12]
+    return f'{phrase_id}/{language}/{text_hash}'
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream for a cool-down period"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def retry_after(self):
+        if self.opened_at is None:
+            return 0
+        return max(0, int(self.reset_timeout - (time.monotonic() - self.opened_at)) + 1)
+
+    def allow(self):
+        return self.state != self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                # Trip (or re-trip after a failed half-open probe)
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'retry_after': self.retry_after()
+        }
+
+
+class AudioCache(LRUCache):
+    """LRU cache of MP3 clips, keyed by clip_key()"""
+
+
+class AudioService:
+    """Serves clips from the cache, synthesizing through the breaker on a miss"""
+
+    def __init__(self, cache=None, breaker=None, synthesizer=synthesize, limiter=None):
+        self.cache = cache if cache is not None else AudioCache()
+        self.breaker = breaker or CircuitBreaker()
+        self.synthesizer = synthesizer
+        # admission.SynthesisLimiter bounding concurrent syntheses, if any
+        self.limiter = limiter
+
+    def key_for(self, phrase, language):
+        text, gtts_lang = tts_input(phrase['translations'][language], language)
+        return clip_key(phrase['id'], language, text, gtts_lang)
+
+    def is_cached(self, phrase, language):
+        return self.key_for(phrase, language) in self.cache
+
+    def forget_changed(self, old_catalog, new_catalog, phrase_changes):
+        """Drop clips of deleted phrases and of translations whose spoken text changed
+
+        phrase_changes is the 'phrases' part of a catalog change record.
+        Returns the number of clips removed.
+        """
+        removed = 0
+        for phrase_id in phrase_changes['modified'] + phrase_changes['deleted']:
+            old_phrase = old_catalog.get_phrase(phrase_id)
+            new_phrase = new_catalog.get_phrase(phrase_id)
+            try:
+                for language in old_phrase['translations']:
+                    key = self.key_for(old_phrase, language)
+                    if new_phrase is None or language not in new_phrase['translations'] or \
+                            self.key_for(new_phrase, language) != key:
+                        removed += self.cache.delete(key)
+            except (LookupError, ValueError):
+                # Old data no longer readable (e.g. replaced shards) - the clips age out instead
+                continue
+        return removed
+
+    def synthesize(self, text, gtts_lang, client=None, admitted=False):
+        """Synthesize a clip through the breaker and the limiter
+
+        `admitted` is True when the caller already holds a limiter slot.
+        """
+        if not self.breaker.allow():
+            raise TTSUnavailableError(self.breaker.retry_after())
+        if self.limiter is None or admitted:
+            return self._call_synthesizer(text, gtts_lang)
+        with self.limiter.slot(client):
+            return self._call_synthesizer(text, gtts_lang)
+
+    def _call_synthesizer(self, text, gtts_lang):
+        try:
+            clip = self.synthesizer(text, gtts_lang)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return clip
+
+    def get_clip(self, phrase, language, client=None, admitted=False):
+        """Return MP3 bytes for a phrase
+
+        Raises TTSUnavailableError if the breaker is open, and
+        admission.AdmissionRejected if `client` (an address) may not
+        synthesize right now. Cache hits are never limited. With
+        `admitted` the caller has taken the limiter slot already.
+        """
+        text, gtts_lang = tts_input(phrase['translations'][language], language)
+        key = clip_key(phrase['id'], language, text, gtts_lang)
+
+        # With a shared cache, only one node synthesizes a clip missing everywhere
+        return self.cache.fill(key, lambda: self.synthesize(text, gtts_lang, client, admitted))
@@ -0,0 +1,238 @@
+"""
+SA Health App - Shared Audio Pack
+Append-only file of audio clips shared by every worker process, used in
+place of the per-process AudioCache when AUDIO_PACK is set.
+
+Each record is a header, the clip key and the clip bytes:
+    MAGIC (4) | key length (2) | flags (2) | data length (4) | CRC-32 (4) | key | data
+
+A worker that synthesizes a clip appends it under an exclusive flock(),
+so concurrent appends from several processes never interleave. Each
+process keeps an index {key: (offset, length)} built by scanning the
+record headers, and refreshes it when a key is missing, picking up clips
+other workers appended. Clips are served as memoryviews of a read-only
+mmap of the file, so they are never copied into the Python heap.
+
+Deleting a clip appends a tombstone. The file only shrinks through
+compact(), which rewrites the live clips to a new file and renames it
+into place; processes notice the new inode and reopen it.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from cache import CacheBackend
+
+MAGIC = b'SAC1'
+_HEADER = struct.Struct('>4sHHII')
+FLAG_TOMBSTONE = 1
+
+
+class AudioPackError(ValueError):
+    """Raised when a pack file cannot be read"""
+
+
+def _record(key, data, flags=0):
+    encoded = key.encode('utf-8')
+    crc = zlib.crc32(data, zlib.crc32(encoded))
+    return _HEADER.pack(MAGIC, len(encoded), flags, len(data), crc) + encoded + data
+
+
+class AudioPack(CacheBackend):
+    """Clips in a shared, append-only pack file, with the interface of AudioCache"""
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.appends = 0
+        self.corrupt = 0
+        self._lock = threading.Lock()
+        self._fd = None
+        self._open()
+
+    def _open(self):
+        """(Re)open the file and index it from the start; call with the lock held or from __init__"""
+        if self._fd is not None:
+            os.close(self._fd)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._pid = os.getpid()
+        self._inode = os.fstat(self._fd).st_ino
+        self._index = {}
+        self._scanned = 0
+        self._live_bytes = 0
+        self._map = None
+        self._mapped = 0
+        self._scan()
+
+    def _replaced(self):
+        # A forked worker needs its own open file: flock() locks are shared
+        # by every process holding the same open file description
+        if os.getpid() != self._pid:
+            return True
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except OSError:
+            return True
+
+    def _scan(self):
+        """Index the records appended since the last scan; returns the file size"""
+        size = os.fstat(self._fd).st_size
+        offset = self._scanned
+        while offset + _HEADER.size <= size:
+            header = os.pread(self._fd, _HEADER.size, offset)
+            magic, key_length, flags, data_length, crc = _HEADER.unpack(header)
+            end = offset + _HEADER.size + key_length + data_length
+            if magic != MAGIC or end > size:
+                # Being written by another process, or torn by a crash
+                break
+            body = os.pread(self._fd, key_length + data_length, offset + _HEADER.size)
+            if zlib.crc32(body) != crc:
+                if end == size:
+                    break
+                self.corrupt += 1
+            else:
+                key = body[:key_length].decode('utf-8')
+                previous = self._index.pop(key, None)
+                if previous is not None:
+                    self._live_bytes -= previous[1]
+                if not flags & FLAG_TOMBSTONE:
+                    self._index[key] = (offset + _HEADER.size + key_length, data_length)
+                    self._live_bytes += data_length
+            offset = end
+        self._scanned = offset
+        return size
+
+    def _refresh(self):
+        """Pick up records appended (or a compaction done) by other processes"""
+        if self._replaced():
+            self._open()
+        else:
+            self._scan()
+
+    def _view(self, offset, length):
+        if offset + length > self._mapped:
+            size = os.fstat(self._fd).st_size
+            # Views handed out earlier keep the previous map alive
+            self._map = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+            self._mapped = size
+        return memoryview(self._map)[offset:offset + length]
+
+    def get(self, key):
+        """The clip as a read-only memoryview, or None"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self._refresh()
+                entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._view(*entry)
+
+    def _append(self, record):
+        """Append a record under the file lock, reopening if the file was compacted meanwhile"""
+        while True:
+            if self._replaced():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if self._replaced():
+                    # Compacted while we waited for the lock
+                    continue
+                size = self._scan()
+                if self._scanned < size:
+                    # Torn tail left by a crashed writer - nobody else writes while we hold the lock
+                    os.ftruncate(self._fd, self._scanned)
+                os.write(self._fd, record)
+                self._scan()
+                return
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def put(self, key, value):
+        with self._lock:
+            self._refresh()
+            if key in self._index:
+                # Another worker synthesized it first
+                return
+            self._append(_record(key, bytes(value)))
+            self.appends += 1
+
+    def delete(self, key):
+        """Append a tombstone for a key, returning True if it was stored"""
+        with self._lock:
+            self._refresh()
+            if key not in self._index:
+                return False
+            self._append(_record(key, b'', FLAG_TOMBSTONE))
+            return True
+
+    def __contains__(self, key):
+        with self._lock:
+            if key not in self._index:
+                self._refresh()
+            return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def keys(self):
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+    def stats(self):
+        with self._lock:
+            file_bytes = self._scanned
+            return {
+                'backend': 'pack',
+                'path': self.path,
+                'entries': len(self._index),
+                'bytes': self._live_bytes,
+                'file_bytes': file_bytes,
+                'garbage_bytes': file_bytes - self._live_bytes - sum(
+                    _HEADER.size + len(key.encode('utf-8')) for key in self._index),
+                'hits': self.hits,
+                'misses': self.misses,
+                'appends': self.appends,
+                'corrupt': self.corrupt
+            }
+
+    def compact(self, keep=None):
+        """Rewrite the live clips (only keys in `keep`, if given) to a new file
+
+        Holds the file lock throughout, so appends from other processes
+        wait and then go to the new file. Returns (clips kept, bytes freed).
+        """
+        with self._lock:
+            if self._replaced():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if self._replaced():
+                    raise AudioPackError(f'{self.path} was replaced during compaction - retry')
+                before = self._scan()
+                tmp_path = f'{self.path}.compact'
+                kept = 0
+                with open(tmp_path, 'wb') as f:
+                    for key, (offset, length) in self._index.items():
+                        if keep is None or key in keep:
+                            f.write(_record(key, os.pread(self._fd, length, offset)))
+                            kept += 1
+                    f.flush()
+                    os.fsync(f.fileno())
+                    after = f.tell()
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._open()
+            return kept, before - after
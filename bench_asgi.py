@@ -0,0 +1,140 @@
+"""
+Sync vs ASGI Audio Benchmark
+Sends a burst of concurrent audio requests for clips that are not cached
+yet - each one a text-to-speech call - to the app served by Gunicorn's
+sync workers (wsgi.py) and by a single Uvicorn process (asgi.py), and
+meanwhile polls a phrase list to see whether the rest of the app stays
+responsive. gTTS is replaced by a stand-in that takes a fixed time, so
+both servers see exactly the same upstream latency. A third run serves
+the sync workers with admission control on (admission.py), so requests
+that would tie up the last free workers are turned away instead.
+
+Usage: python bench_asgi.py [concurrent requests] [sync workers] [tts seconds]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+if os.environ.get('BENCH_TTS_SECONDS'):
+    # Imported by the server under test
+    import app as app_module
+
+    def slow_synthesizer(text, gtts_lang, seconds=float(os.environ['BENCH_TTS_SECONDS'])):
+        time.sleep(seconds)
+        return b'ID3' + text.encode('utf-8') * 40
+
+    app_module.audio_service.synthesizer = slow_synthesizer
+    import asgi
+    import wsgi
+    wsgi_app = wsgi.application
+    asgi_app = asgi.application
+
+PHRASE_LIST = '/api/phrases?limit=20&langs=en'
+
+
+async def fetch(port, path):
+    """(status, seconds) of one GET on a fresh connection"""
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n'.encode('ascii'))
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        status = int(response.split(b' ', 2)[1])
+    except (OSError, ValueError, IndexError):
+        status = 0
+    return status, time.perf_counter() - start
+
+
+async def burst(port, concurrency):
+    """Audio burst plus phrase-list probes; returns (wall seconds, audio results, probe results)"""
+    done = asyncio.Event()
+    probes = []
+
+    async def probe():
+        while not done.is_set():
+            probes.append(await fetch(port, PHRASE_LIST))
+            await asyncio.sleep(0.1)
+
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    audio = await asyncio.gather(*[fetch(port, f'/api/audio/phrase_{i:06d}/en') for i in range(1, concurrency + 1)])
+    wall = time.perf_counter() - start
+    done.set()
+    await prober
+    return wall, audio, probes
+
+
+def wait_until_up(port, server, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('server exited during startup')
+        if asyncio.run(fetch(port, '/api/categories'))[0] == 200:
+            return
+        time.sleep(0.5)
+    raise RuntimeError('server did not start')
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+
+def run(label, command, env, port, concurrency):
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(port, server)
+        wall, audio, probes = asyncio.run(burst(port, concurrency))
+    finally:
+        server.terminate()
+        server.wait(30)
+
+    ok = [seconds for status, seconds in audio if status == 200]
+    probe_times = [seconds for status, seconds in probes if status == 200]
+    print(f"  {label:<28} {wall:6.1f} s {len(ok):>5}/{len(audio)} "
+          f"{statistics.median(ok) if ok else 0:7.2f} s {percentile(ok, 0.95):7.2f} s "
+          f"{statistics.median(probe_times) * 1000 if probe_times else 0:8.0f} ms "
+          f"{percentile(probe_times, 0.95) * 1000:8.0f} ms")
+
+
+if __name__ == '__main__':
+    from bench_common import make_catalog_data
+
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    tts_seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    port = 8765
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'phrases.json'), 'w', encoding='utf-8') as f:
+            json.dump(make_catalog_data(max(concurrency, 1000)), f, ensure_ascii=False)
+        env = dict(os.environ, CATALOG_BUILD=tmp, CATALOG_SNAPSHOT='', AUDIO_WARMUP_CATEGORIES='',
+                   CATALOG_WATCH='0', AUDIO_PACK='', SHARED_CACHE_URL='', AUDIO_SYNTH_CONCURRENCY='0',
+                   BENCH_TTS_SECONDS=str(tts_seconds), PORT=str(port), WEB_CONCURRENCY=str(workers))
+        # The servers get different ports: Gunicorn's workers may outlive its master briefly
+
+        print(f"{concurrency} concurrent requests for uncached clips, TTS takes {tts_seconds} s each")
+        print()
+        print(f"  {'':<28} {'total':>8} {'served':>11} {'p50':>9} {'p95':>9} "
+              f"{'list p50':>11} {'list p95':>11}")
+        run(f'Gunicorn, {workers} sync workers',
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'bench_asgi:wsgi_app'],
+            env, port, concurrency)
+        # Keep a worker free for other routes; the burst comes from one address, so lift the per-client limit
+        admitted = max(1, workers - 2)
+        run(f'Gunicorn, admission {admitted}+1',
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'bench_asgi:wsgi_app'],
+            dict(env, PORT=str(port + 2), AUDIO_SYNTH_CONCURRENCY=str(admitted), AUDIO_SYNTH_QUEUE='1',
+                 AUDIO_SYNTH_PER_CLIENT=str(admitted + 1)),
+            port + 2, concurrency)
+        run('Uvicorn, 1 process (asgi.py)',
+            [sys.executable, '-m', 'uvicorn', 'bench_asgi:asgi_app', '--port', str(port + 1),
+             '--workers', '1', '--log-level', 'warning', '--backlog', '4096'],
+            env, port + 1, concurrency)
@@ -0,0 +1,34 @@
+"""
+Category Query Benchmark
+Measures boolean category expression latency at 100k phrases
+
+Usage: python bench_category_query.py [n_phrases]
+"""
+
+import sys
+import time
+
+from bench_common import make_catalog_data, timeit
+from catalog import Catalog
+import category_query  # noqa: F401 - registers the bitset index
+
+EXPRESSIONS = [
+    'examination AND pain_assessment',
+    'emergency OR symptoms NOT greeting',
+    '(symptoms OR examination OR instructions) AND NOT (greeting OR reassurance)',
+]
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    catalog = Catalog(make_catalog_data(n))
+
+    start = time.perf_counter()
+    bitsets = catalog.index('category_bits')
+    print(f"Built {len(bitsets.bits)} category bitsets over {n:,} phrases in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    print()
+
+    for expression in EXPRESSIONS:
+        median, p95 = timeit(lambda: bitsets.query(expression))
+        print(f"'{expression}': median {median:.3f} ms, p95 {p95:.3f} ms "
+              f"({len(bitsets.query(expression)):,} phrases)")
@@ -0,0 +1,59 @@
+"""
+Benchmark helpers - builds large synthetic catalogs from the real phrases
+"""
+
+import json
+import os
+import random
+import time
+
+DATA_FILE = os.path.join('data', 'phrases.json')
+
+
+def load_seed_data():
+    with open(DATA_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def make_catalog_data(n_phrases, seed=42):
+    """Return a phrases.json-shaped dict with n_phrases synthetic phrases
+
+    Each phrase is a copy of a real phrase with a few words borrowed from
+    other phrases appended, so vocabulary and posting lists look realistic.
+    """
+    rng = random.Random(seed)
+    data = load_seed_data()
+    base = data['phrases']
+
+    vocab = {}
+    for phrase in base:
+        for lang, translation in phrase['translations'].items():
+            vocab.setdefault(lang, []).extend(translation['text'].rstrip('.?!').split())
+
+    phrases = []
+    for i in range(n_phrases):
+        source = base[i % len(base)]
+        translations = {}
+        for lang, translation in source['translations'].items():
+            extra = ' '.join(rng.choice(vocab[lang]) for _ in range(rng.randint(1, 4)))
+            copy = dict(translation)
+            copy['text'] = f"{translation['text']} {extra} {i}"
+            translations[lang] = copy
+        phrases.append({
+            'id': f'phrase_{i + 1:06d}',
+            'categories': list(source['categories']),
+            'translations': translations
+        })
+
+    return {'categories': data['categories'], 'phrases': phrases}
+
+
+def timeit(func, repeat=50):
+    """Return (median, p95) wall time of func() in milliseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2], times[int(len(times) * 0.95) - 1]
@@ -0,0 +1,64 @@
+"""
+Memory Benchmark
+Measures bytes per phrase of the dicts from json.load versus the
+compact columnar form, and the cost of serializing from each
+
+Usage: python bench_memory.py [n_phrases]
+"""
+
+import gc
+import json
+import sys
+import tracemalloc
+
+from bench_common import make_catalog_data, timeit
+from catalog import Catalog
+from compact import CompactCatalog, PhraseTable
+from serialization import PhraseProjector
+
+
+def traced(build):
+    """Return (result, bytes still allocated, peak bytes) for build()"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def page_json(catalog, limit=50):
+    page = catalog.phrases[1000:1000 + limit]
+    return json.dumps(PhraseProjector(catalog).project(page), ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    text = json.dumps(make_catalog_data(n), ensure_ascii=False)
+
+    phrases, dict_bytes, _ = traced(lambda: json.loads(text)['phrases'])
+    del phrases
+    table, table_bytes, table_peak = traced(lambda: PhraseTable(json.loads(text)['phrases']))
+    del table
+
+    catalog, catalog_bytes, _ = traced(lambda: Catalog(json.loads(text)))
+    compact, compact_bytes, _ = traced(lambda: CompactCatalog(json.loads(text)))
+
+    print(f"Catalog with {n:,} phrases (JSON text {len(text.encode('utf-8')) / 1e6:.1f} MB)")
+    print()
+    print("Phrase data only:")
+    print(f"  dicts from json.load: {dict_bytes / 1e6:8.1f} MB  {dict_bytes / n:6.0f} bytes/phrase")
+    print(f"  compact table:        {table_bytes / 1e6:8.1f} MB  {table_bytes / n:6.0f} bytes/phrase "
+          f"({dict_bytes / table_bytes:.1f}x smaller, {table_peak / 1e6:.0f} MB peak while building)")
+    print()
+    print("Catalog with lookup indexes (before search indexes):")
+    print(f"  Catalog:        {catalog_bytes / 1e6:8.1f} MB  {catalog_bytes / n:6.0f} bytes/phrase")
+    print(f"  CompactCatalog: {compact_bytes / 1e6:8.1f} MB  {compact_bytes / n:6.0f} bytes/phrase")
+    print()
+
+    for name, c in [('Catalog', catalog), ('CompactCatalog', compact)]:
+        median, p95 = timeit(lambda: page_json(c), repeat=200)
+        lookup, _ = timeit(lambda: c.get_phrase('phrase_050000')['translations']['zu']['text'], repeat=200)
+        print(f"  {name:<15} 50-phrase page to JSON: {median:6.2f} ms (p95 {p95:.2f})   "
+              f"get_phrase + text: {lookup * 1000:6.1f} us")
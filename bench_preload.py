@@ -0,0 +1,124 @@
+"""
+Preload Memory Benchmark
+Measures per-worker memory of a pre-forking server when each worker
+loads the catalog itself, when the master preloads it (wsgi.preload)
+without gc.freeze(), and with it
+
+Workers are forked the way gunicorn forks them, serve a mix of
+requests, run a full garbage collection and are then measured together
+from /proc/<pid>/smaps_rollup (Linux only). USS is memory private to
+one worker; PSS also charges each worker its share of shared pages.
+
+Usage: python bench_preload.py [n_phrases] [workers]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+MODES = [
+    ('per_worker', 'Each worker loads the catalog'),
+    ('preload', 'Master preloads, no gc.freeze()'),
+    ('preload_frozen', 'Master preloads with gc.freeze()')
+]
+
+REQUESTS = [
+    '/api/phrases?limit=50&langs=en,zu',
+    '/api/phrases/category/emergency?limit=50',
+    '/api/phrases/query?q=emergency%20OR%20symptoms&limit=50',
+    '/api/search?q=where%20does%20it%20hurt&lang=en,zu',
+    '/api/search?q=sawubona&mode=fuzzy',
+    '/api/autocomplete?q=he&lang=en',
+    '/api/suggest?q=chest%20pain%20since%20morning',
+    '/api/phrase/phrase_000042',
+    '/api/bootstrap'
+]
+
+
+def memory(pid):
+    """{'rss', 'pss', 'uss'} in bytes from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'uss': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def serve(app_module, rounds):
+    import gc
+    with app_module.app.test_client() as client:
+        for _ in range(rounds):
+            for url in REQUESTS:
+                client.get(url)
+    gc.collect()
+
+
+def run_mode(mode, workers, rounds):
+    """Fork the workers, measure them while all are alive, print JSON"""
+    import app as app_module
+    import wsgi
+
+    if mode != 'per_worker':
+        wsgi.preload(freeze=mode == 'preload_frozen')
+
+    children = []
+    for _ in range(workers):
+        ready_r, ready_w = os.pipe()
+        done_r, done_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            os.close(done_w)
+            if mode == 'per_worker':
+                app_module.catalog_store.get()
+            serve(app_module, rounds)
+            os.write(ready_w, b'1')
+            os.read(done_r, 1)
+            os._exit(0)
+        os.close(ready_w)
+        os.close(done_r)
+        children.append((pid, ready_r, done_w))
+
+    for _, ready_r, _ in children:
+        os.read(ready_r, 1)
+    result = {'master': memory(os.getpid()), 'workers': [memory(pid) for pid, _, _ in children]}
+    for pid, _, done_w in children:
+        os.write(done_w, b'1')
+        os.waitpid(pid, 0)
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--mode':
+        run_mode(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+        sys.exit(0)
+
+    from bench_common import make_catalog_data
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rounds = 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'phrases.json'), 'w', encoding='utf-8') as f:
+            json.dump(make_catalog_data(n), f, ensure_ascii=False)
+        env = dict(os.environ, CATALOG_BUILD=tmp, CATALOG_SNAPSHOT='', WSGI_PRELOAD='0',
+                   AUDIO_WARMUP_CATEGORIES='', CATALOG_WATCH='0')
+
+        print(f"{workers} workers, {n:,} phrases, {rounds * len(REQUESTS)} requests each "
+              f"(backend: {env.get('CATALOG_BACKEND', 'memory')})")
+        print()
+        print(f"  {'':<34} {'USS/worker':>11} {'PSS/worker':>11} {'total PSS':>10}")
+        for mode, label in MODES:
+            out = subprocess.run([sys.executable, __file__, '--mode', mode, str(workers), str(rounds)],
+                                 env=env, capture_output=True, text=True, check=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            uss = sum(w['uss'] for w in result['workers']) / workers
+            pss = sum(w['pss'] for w in result['workers']) / workers
+            total = result['master']['pss'] + sum(w['pss'] for w in result['workers'])
+            print(f"  {label:<34} {uss / 1e6:8.1f} MB {pss / 1e6:8.1f} MB {total / 1e6:7.0f} MB")
@@ -0,0 +1,77 @@
+"""
+Search Benchmark
+Measures keyword, fuzzy and autocomplete index build time and query latency
+at 100k phrases
+
+Usage: python bench_search.py [n_phrases]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from bench_common import make_catalog_data, timeit
+from catalog import Catalog
+import search  # noqa: F401 - registers the search index
+
+QUERIES = [
+    ('single common term', 'please', None, None),
+    ('two terms', 'hoe gaan', None, None),
+    ('phonetic', 'hlahn', None, None),
+    ('language filter', 'ngicela umlomo', ['zu'], None),
+    ('category filter', 'hurt', None, ['pain_assessment']),
+]
+
+FUZZY_QUERIES = [
+    ('typo', 'emergensy'),
+    ('sound-typed', 'sawbona'),
+    ('syllables', 'oon jah nee'),
+    ('short word', 'hert'),
+    ('as-you-type', 'ngicel'),
+]
+
+AUTOCOMPLETE_QUERIES = [
+    ('one letter', 'p', 'en'),
+    ('short prefix', 'ngi', 'zu'),
+    ('phrase prefix', 'hallo hoe g', 'af'),
+]
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    data = make_catalog_data(n)
+
+    start = time.perf_counter()
+    catalog = Catalog(data)
+    index = catalog.index('search')
+    print(f"Built catalog + search index for {n:,} phrases in {time.perf_counter() - start:.2f}s")
+    print(f"Vocabulary: {len(index.postings):,} tokens")
+    print()
+
+    for label, query, languages, categories in QUERIES:
+        median, p95 = timeit(lambda: index.search(query, languages, categories, limit=20))
+        total, _ = index.search(query, languages, categories)
+        print(f"{label:20s} '{query}': median {median:.2f} ms, p95 {p95:.2f} ms ({total:,} matches)")
+
+    start = time.perf_counter()
+    fuzzy = catalog.index('fuzzy')
+    print()
+    print(f"Built fuzzy trigram index in {time.perf_counter() - start:.2f}s "
+          f"({len(fuzzy.terms):,} terms, {len(fuzzy.gram_postings):,} trigrams)")
+    print()
+
+    for label, query in FUZZY_QUERIES:
+        median, p95 = timeit(lambda: fuzzy.search(query, limit=20))
+        total, _, _ = fuzzy.search(query)
+        print(f"{label:20s} '{query}': median {median:.2f} ms, p95 {p95:.2f} ms ({total:,} matches)")
+
+    start = time.perf_counter()
+    prefix = catalog.index('prefix')
+    print()
+    print(f"Built autocomplete index in {time.perf_counter() - start:.2f}s")
+    print()
+
+    usage = np.zeros(len(catalog.phrases), dtype=np.float32)
+    for label, query, language in AUTOCOMPLETE_QUERIES:
+        median, p95 = timeit(lambda: prefix.complete(query, language, limit=5, usage=usage))
+        print(f"{label:20s} '{query}' ({language}): median {median:.2f} ms, p95 {p95:.2f} ms")
@@ -0,0 +1,38 @@
+"""
+Situation Finder Benchmark
+Measures embedding build time, matrix memory and query latency at 100k phrases
+
+Usage: python bench_semantic.py [n_phrases]
+"""
+
+import sys
+import time
+
+from bench_common import make_catalog_data, timeit
+from catalog import Catalog
+import semantic  # noqa: F401 - registers the semantic index
+
+QUERIES = [
+    'I need to ask about chest pain',
+    'the patient is scared',
+    'how long have they been sick',
+    'emergency bleeding',
+]
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    catalog = Catalog(make_catalog_data(n))
+
+    start = time.perf_counter()
+    index = catalog.index('semantic')
+    print(f"Embedded {n:,} phrases in {time.perf_counter() - start:.2f}s")
+    print(f"Matrix: {index.matrix.shape[0]:,} x {index.matrix.shape[1]} float32 = "
+          f"{index.matrix.nbytes / 1024 / 1024:.1f} MB")
+    print()
+
+    for query in QUERIES:
+        median, p95 = timeit(lambda: index.search(query, limit=10))
+        print(f"'{query}': median {median:.2f} ms, p95 {p95:.2f} ms")
+
+    median, p95 = timeit(lambda: index.search(QUERIES[0], categories=['pain_assessment'], limit=10))
+    print(f"with category filter: median {median:.2f} ms, p95 {p95:.2f} ms")
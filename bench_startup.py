@@ -0,0 +1,52 @@
+"""
+Startup Benchmark
+Measures catalog load time (data plus every index) from phrases.json
+and from a compiled snapshot
+
+Usage: python bench_startup.py [n_phrases]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+import app  # noqa: F401 - registers every index with the catalog
+from bench_common import make_catalog_data
+from catalog import CatalogStore
+from snapshot import SnapshotFile, compile_snapshot
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'phrases.json')
+        snapshot_path = os.path.join(tmp, 'phrases.snapshot')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(make_catalog_data(n), f, ensure_ascii=False)
+
+        def loader():
+            with open(json_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        start = time.perf_counter()
+        loader()
+        parse_s = time.perf_counter() - start
+
+        json_catalog = CatalogStore(json_path, loader).get()
+
+        start = time.perf_counter()
+        compile_snapshot(json_path, snapshot_path)
+        compile_s = time.perf_counter() - start
+
+        snapshot_catalog = CatalogStore(json_path, loader, snapshot=SnapshotFile(snapshot_path)).get()
+        assert snapshot_catalog.source == 'snapshot'
+
+        print(f"Catalog with {n:,} phrases")
+        print(f"  phrases.json:      {os.path.getsize(json_path) / 1e6:8.1f} MB (parse only {parse_s * 1000:.0f} ms)")
+        print(f"  phrases.snapshot:  {os.path.getsize(snapshot_path) / 1e6:8.1f} MB (compiled in {compile_s:.1f} s)")
+        print()
+        print(f"  startup from JSON:     {json_catalog.load_seconds * 1000:10.0f} ms")
+        print(f"  startup from snapshot: {snapshot_catalog.load_seconds * 1000:10.0f} ms "
+              f"({json_catalog.load_seconds / snapshot_catalog.load_seconds:.0f}x faster)")
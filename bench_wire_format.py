@@ -0,0 +1,42 @@
+"""
+Wire Format Benchmark
+Compares JSON, MessagePack and CBOR response bodies for the phrase list:
+body size (raw and gzipped) and encode/decode time
+
+Usage: python bench_wire_format.py [n_phrases]
+"""
+
+import gzip
+import json
+import sys
+
+from bench_common import make_catalog_data, timeit
+from serialization import WIRE_FORMATS, cbor2, msgpack
+
+FORMATS = [('JSON', lambda data: json.dumps(data, separators=(',', ':')).encode('utf-8'), json.loads)]
+if msgpack is not None:
+    FORMATS.append(('MessagePack', WIRE_FORMATS['application/msgpack'], lambda body: msgpack.unpackb(body, raw=False)))
+if cbor2 is not None:
+    FORMATS.append(('CBOR', WIRE_FORMATS['application/cbor'], cbor2.loads))
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    data = make_catalog_data(n)
+    payload = {'success': True, 'total': n, 'phrases': data['phrases']}
+    repeat = 5 if n >= 50_000 else 20
+
+    print(f"Phrase list with {n:,} phrases")
+    print()
+    print(f"{'Format':<12} {'Size':>10} {'Gzipped':>10} {'Encode':>10} {'Decode':>10}")
+
+    json_size = None
+    for name, encode, decode in FORMATS:
+        body = encode(payload)
+        if decode(body) != payload:
+            raise SystemExit(f"{name} round trip changed the data")
+        zipped = len(gzip.compress(body, compresslevel=6))
+        encode_ms, _ = timeit(lambda: encode(payload), repeat)
+        decode_ms, _ = timeit(lambda: decode(body), repeat)
+        json_size = json_size or len(body)
+        print(f"{name:<12} {len(body) / 1e6:>8.2f}MB {zipped / 1e6:>8.2f}MB "
+              f"{encode_ms:>8.1f}ms {decode_ms:>8.1f}ms  ({len(body) / json_size:.0%} of JSON)")
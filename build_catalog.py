@@ -0,0 +1,44 @@
+"""
+Build Step - Catalog Build Pipeline
+Validates data/phrases.json against the catalog schema, normalizes its
+text and writes every derived artifact (snapshot with all indexes,
+SQLite database, language shards, pre-rendered API bodies, audio
+manifest) into data/build/<build>/, then points data/build/current at
+it. The app serves from data/build/current when it exists.
+
+Usage: python build_catalog.py [phrases.json] [build root] [--no-publish]
+"""
+
+import os
+import sys
+import time
+
+import app
+from catalog import CatalogValidationError
+from pipeline import build_catalog
+from snapshot import SnapshotError
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    json_path = args[0] if len(args) > 0 else os.path.join('data', 'phrases.json')
+    build_root = args[1] if len(args) > 1 else os.path.dirname(app.CATALOG_BUILD)
+
+    start = time.perf_counter()
+    try:
+        manifest = build_catalog(json_path, build_root, publish_build='--no-publish' not in sys.argv)
+    except (CatalogValidationError, SnapshotError) as e:
+        print(f"[FAIL] {e}")
+        sys.exit(1)
+
+    build_dir = os.path.join(build_root, manifest['build'])
+    if manifest['reused']:
+        print(f"[OK] {json_path} unchanged since build {manifest['build']}")
+    else:
+        print(f"[OK] Built {manifest['phrases']:,} phrases from {json_path} into {build_dir} "
+              f"in {time.perf_counter() - start:.1f}s")
+        print(f"     {manifest['normalized_strings']} strings normalized, {manifest['bodies']} bodies pre-rendered, "
+              f"{len(manifest['artifacts'])} files")
+        print(f"     steps (ms): {', '.join(f'{name} {ms:,.0f}' for name, ms in manifest['steps_ms'].items())}")
+    if '--no-publish' not in sys.argv:
+        print(f"     serving {manifest['build']}" +
+              (f", removed old builds {', '.join(manifest['pruned'])}" if manifest['pruned'] else ''))
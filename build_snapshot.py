@@ -0,0 +1,30 @@
+"""
+Build Step - Compile the Phrase Catalog Snapshot
+Validates data/phrases.json, builds every search index and writes
+data/phrases.snapshot, which the app loads instead of the JSON while
+the snapshot is at least as new.
+
+Usage: python build_snapshot.py [phrases.json] [output.snapshot]
+"""
+
+import sys
+import time
+
+import app  # noqa: F401 - registers every index with the catalog
+from catalog import CatalogValidationError
+from snapshot import SnapshotError, compile_snapshot
+
+if __name__ == '__main__':
+    json_path = sys.argv[1] if len(sys.argv) > 1 else app.DATA_FILE
+    snapshot_path = sys.argv[2] if len(sys.argv) > 2 else (app.SNAPSHOT_FILE or 'data/phrases.snapshot')
+
+    start = time.perf_counter()
+    try:
+        header = compile_snapshot(json_path, snapshot_path)
+    except (CatalogValidationError, SnapshotError) as e:
+        print(f"[FAIL] {e}")
+        sys.exit(1)
+
+    print(f"[OK] Compiled {header['phrases']:,} phrases from {json_path} into {snapshot_path} "
+          f"in {time.perf_counter() - start:.1f}s")
+    print(f"     digest {header['digest']}, indexes: {', '.join(header['indexes'])}")
@@ -0,0 +1,108 @@
+"""
+SA Health App - Caching
+The interface every cache of byte strings implements, and the thread-safe
+in-memory LRU cache, bounded by total size. Caches shared between worker
+processes and app nodes are in audio_pack.py and shared_cache.py.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class CacheBackend:
+    """Interface of the audio and response body caches: bytes values under string keys"""
+
+    def get(self, key):
+        """The value, or None on a miss"""
+        raise NotImplementedError
+
+    def put(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove a key, returning True if it was cached"""
+        raise NotImplementedError
+
+    def __contains__(self, key):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def fill(self, key, compute):
+        """The cached value, or compute() stored under the key
+
+        Shared caches override this so that only one caller - across
+        processes and nodes - computes a missing value while the others
+        wait for it.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+
+class LRUCache(CacheBackend):
+    """Thread-safe LRU cache of bytes values bounded by total bytes"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def delete(self, key):
+        """Remove a key, returning True if it was cached"""
+        with self._lock:
+            value = self._items.pop(key, None)
+            if value is None:
+                return False
+            self.size -= len(value)
+            return True
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def items(self):
+        """List of (key, value) pairs, least recently used first"""
+        with self._lock:
+            return list(self._items.items())
+
+    def stats(self):
+        return {
+            'entries': len(self._items),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'fill': round(self.size / self.max_bytes, 4) if self.max_bytes else 0,
+            'hits': self.hits,
+            'misses': self.misses
+        }
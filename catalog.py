@@ -0,0 +1,631 @@
+"""
+SA Health App - Phrase Catalog
+Loads phrases.json once, keeps it in memory with lookup indexes,
+and reloads it when the data file changes on disk.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import numpy as np
+
+from watcher import FileWatcher
+
+# Derived indexes registered by other modules (search, etc.)
+# Each builder takes a Catalog and returns the index object.
+_index_builders = {}
+
+# Names of indexes that are saved in compiled snapshots (see snapshot.py)
+_snapshot_indexes = set()
+
+# Reloads that change more than this fraction of the phrases rebuild
+# every index instead of patching the previous catalog's
+INCREMENTAL_MAX_FRACTION = 0.1
+
+# Seconds a request that finds the data changed waits for the reload;
+# it and every other request are served the previous catalog after that
+RELOAD_WAIT = 2.0
+
+logger = logging.getLogger(__name__)
+
+
+def register_index(name, builder, snapshot=True):
+    """Register a derived index that is rebuilt whenever the catalog loads
+
+    If the index class has a `patch(catalog, remap, positions)` method,
+    small reloads call it on the previous catalog's index instead (see
+    Catalog.patch_indexes); it returns the new index or None to rebuild.
+
+    Indexes registered with snapshot=True are stored prebuilt in compiled
+    snapshots; the builder must be a class whose instance state is plain
+    data and NumPy arrays.
+    """
+    _index_builders[name] = builder
+    if snapshot:
+        _snapshot_indexes.add(name)
+    else:
+        _snapshot_indexes.discard(name)
+
+
+class CatalogValidationError(ValueError):
+    """Raised when phrases.json is structurally invalid"""
+
+    @classmethod
+    def from_problems(cls, problems):
+        shown = '; '.join(problems[:10])
+        more = f' (and {len(problems) - 10} more)' if len(problems) > 10 else ''
+        return cls(f'{len(problems)} problem(s) in catalog data: {shown}{more}')
+
+
+def validate_catalog_data(data):
+    """Check the shape of phrases.json data, raising CatalogValidationError"""
+    problems = []
+    if not isinstance(data.get('categories'), list) or not isinstance(data.get('phrases'), list):
+        raise CatalogValidationError("Data must have 'categories' and 'phrases' lists")
+
+    category_ids = set()
+    for i, category in enumerate(data['categories']):
+        if not isinstance(category, dict) or not isinstance(category.get('id'), str):
+            problems.append(f'Category #{i} has no id')
+        elif category['id'] in category_ids:
+            problems.append(f"Duplicate category id '{category['id']}'")
+        else:
+            category_ids.add(category['id'])
+
+    phrase_ids = set()
+    for i, phrase in enumerate(data['phrases']):
+        if not isinstance(phrase, dict) or not isinstance(phrase.get('id'), str):
+            problems.append(f'Phrase #{i} has no id')
+            continue
+        phrase_id = phrase['id']
+        if phrase_id in phrase_ids:
+            problems.append(f"Duplicate phrase id '{phrase_id}'")
+        phrase_ids.add(phrase_id)
+
+        for category_id in phrase.get('categories', []):
+            if category_id not in category_ids:
+                problems.append(f"Phrase '{phrase_id}' has unknown category '{category_id}'")
+        translations = phrase.get('translations')
+        if not isinstance(translations, dict) or not translations:
+            problems.append(f"Phrase '{phrase_id}' has no translations")
+            continue
+        for language, translation in translations.items():
+            if not isinstance(translation, dict) or not isinstance(translation.get('text'), str):
+                problems.append(f"Phrase '{phrase_id}' has no '{language}' text")
+
+    if problems:
+        raise CatalogValidationError.from_problems(problems)
+    return data
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive flock() on the lock file `path`, serializing processes
+
+    Without fcntl (Windows) nothing is locked.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def temp_path(path):
+    """A new, uniquely named temporary file next to `path`, to be renamed over it"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    os.close(fd)
+    # mkstemp creates the file private to its owner; keep the usual permissions
+    os.chmod(tmp_path, 0o644)
+    return tmp_path
+
+
+def _plain(value):
+    """json.dumps fallback for the read-only phrase views of compact and sharded catalogs"""
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def content_hash(item):
+    """Short, stable hash of a phrase or category's content"""
+    encoded = json.dumps(item, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=_plain)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:12]
+
+
+class Catalog:
+    """An immutable, fully indexed snapshot of the phrase data"""
+
+    # True when phrases are read-only views (compact.py, shards.py) rather
+    # than the dicts from json.load, so they must be copied to serialize
+    lazy_phrases = False
+
+    def __init__(self, data, version=1, digest='', loaded_at=None, source='json'):
+        self.data = data
+        self.categories = data.get('categories', [])
+        self.phrases = data.get('phrases', [])
+        self.version = version
+        self.digest = digest
+        self.loaded_at = loaded_at or time.time()
+        # Where the data came from ('json' or 'snapshot') and how long loading took
+        self.source = source
+        self.load_seconds = None
+        # True when the indexes were patched from the previous catalog
+        self.incremental = False
+
+        # Core lookup indexes
+        self.by_id = {phrase['id']: phrase for phrase in self.phrases}
+        self.position = {phrase['id']: i for i, phrase in enumerate(self.phrases)}
+        self.languages = []
+        for phrase in self.phrases:
+            for language in phrase.get('translations', {}):
+                if language not in self.languages:
+                    self.languages.append(language)
+        self.category_ids = [category['id'] for category in self.categories]
+        self.by_category = {category_id: [] for category_id in self.category_ids}
+        for phrase in self.phrases:
+            for category_id in phrase.get('categories', []):
+                self.by_category.setdefault(category_id, []).append(phrase)
+
+        self.indexes = {}
+        self._phrase_hashes = None
+        self._category_hashes = None
+
+    @property
+    def phrase_hashes(self):
+        """Content hash per phrase ID, computed on first use"""
+        if self._phrase_hashes is None:
+            self._phrase_hashes = {phrase['id']: content_hash(phrase) for phrase in self.phrases}
+        return self._phrase_hashes
+
+    @property
+    def category_hashes(self):
+        """Content hash per category ID, computed on first use"""
+        if self._category_hashes is None:
+            self._category_hashes = {category['id']: content_hash(category) for category in self.categories}
+        return self._category_hashes
+
+    def build_indexes(self):
+        """Build every registered derived index not already present (e.g. from a snapshot)"""
+        for name, builder in _index_builders.items():
+            if name not in self.indexes:
+                self.indexes[name] = builder(self)
+        return self
+
+    def patch_indexes(self, old):
+        """Build the indexes by patching `old`'s, re-indexing only changed phrases
+
+        Phrases are matched by ID and content hash. Indexes without a
+        `patch` method are rebuilt. Returns False, having built nothing,
+        when the catalogs are too different to patch: languages or
+        categories changed, or more than INCREMENTAL_MAX_FRACTION of the
+        phrases did.
+        """
+        if self.languages != old.languages or self.category_ids != old.category_ids or \
+                self.category_hashes != old.category_hashes:
+            return False
+        added, modified, deleted = diff_hashes(old.phrase_hashes, self.phrase_hashes)
+        if len(added) + len(modified) + len(deleted) > INCREMENTAL_MAX_FRACTION * max(len(self.phrases), 1):
+            return False
+
+        # Old position -> new position for unchanged phrases, -1 for the rest
+        remap = np.full(len(old.phrases), -1, dtype=np.int64)
+        stale = set(modified) | set(deleted)
+        for phrase_id, position in old.position.items():
+            if phrase_id not in stale:
+                remap[position] = self.position[phrase_id]
+        positions = np.array(sorted(self.position[phrase_id] for phrase_id in added + modified), dtype=np.int64)
+
+        for name, builder in _index_builders.items():
+            previous = old.indexes.get(name)
+            index = previous.patch(self, remap, positions) if hasattr(previous, 'patch') else None
+            self.indexes[name] = index if index is not None else builder(self)
+        self.incremental = True
+        return True
+
+    def index(self, name):
+        """Return a derived index, building it on first use if needed"""
+        if name not in self.indexes:
+            self.indexes[name] = _index_builders[name](self)
+        return self.indexes[name]
+
+    def get_phrase(self, phrase_id):
+        return self.by_id.get(phrase_id)
+
+    def get_phrases(self, phrase_ids):
+        """Look up many IDs at once; missing IDs give None, order is kept"""
+        return list(map(self.by_id.get, phrase_ids))
+
+    def get_category_phrases(self, category_id):
+        return self.by_category.get(category_id, [])
+
+    def phrases_at(self, positions):
+        """Phrases at the given catalog positions, in that order"""
+        return [self.phrases[i] for i in positions]
+
+
+def diff_hashes(old, new):
+    """Compare two {id: hash} maps, returning (added, modified, deleted) ID lists"""
+    added = [item_id for item_id in new if item_id not in old]
+    modified = [item_id for item_id, digest in new.items() if item_id in old and old[item_id] != digest]
+    deleted = [item_id for item_id in old if item_id not in new]
+    return added, modified, deleted
+
+
+def diff_catalogs(old, new):
+    """Describe what changed between two catalog snapshots (IDs only)"""
+    phrases = diff_hashes(old.phrase_hashes, new.phrase_hashes)
+    categories = diff_hashes(old.category_hashes, new.category_hashes)
+    return {
+        'from_version': old.version,
+        'from_digest': old.digest,
+        'to_version': new.version,
+        'phrases': dict(zip(('added', 'modified', 'deleted'), phrases)),
+        'categories': dict(zip(('added', 'modified', 'deleted'), categories))
+    }
+
+
+class HistoryExpiredError(LookupError):
+    """Raised when a client's catalog is not covered by the kept change history"""
+
+
+class CatalogStore:
+    """Holds the current Catalog and swaps in a new one when the file changes
+
+    Each reload is diffed against the previous snapshot and the change
+    record is kept in a bounded history, so clients can ask for just the
+    changes since the version they last saw.
+
+    If a compiled snapshot (see snapshot.py) is given and is at least as
+    new as the JSON file, the data and prebuilt indexes are loaded from it
+    instead; a stale, missing or corrupt snapshot falls back to JSON.
+    `catalog_class` builds each Catalog from the loaded data (e.g.
+    compact.CompactCatalog).
+
+    When only a few phrases changed, the new catalog's indexes are
+    patched from the current one's (see Catalog.patch_indexes).
+    `index_files` are files the indexes are built from besides the data
+    (semantic.py's concepts.json): when one changes, the catalog reloads
+    with every index rebuilt, and an older snapshot counts as stale. Callables
+    in `listeners` are called with (old catalog, new catalog, change
+    record) after each reload.
+
+    A load that fails (unreadable or invalid data) leaves the current
+    catalog in service, without a change record or listener calls; the
+    error is kept in `load_error` until a later load succeeds.
+
+    When get() finds the files changed it reloads in a background
+    thread, waiting at most `reload_wait` seconds for it; until the new
+    catalog is swapped in, requests keep getting the previous one, so a
+    slow rebuild (all indexes of a large catalog) never holds them up.
+
+    With start_watching(), a background FileWatcher reloads the catalog
+    when its files change and get() stops checking mtimes on every call.
+    """
+
+    def __init__(self, path, loader, history_size=50, snapshot=None, catalog_class=Catalog, index_files=()):
+        self.path = path
+        self.loader = loader
+        self.snapshot = snapshot
+        self.catalog_class = catalog_class
+        self.index_files = list(index_files)
+        self.listeners = []
+        self.reload_wait = RELOAD_WAIT
+        # _lock guards the watcher and reload thread; _reload_lock is held while loading
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._reloader = None
+        self._catalog = None
+        self._mtime = None
+        # mtimes of index_files when the current catalog's indexes were built
+        self._indexed_mtimes = None
+        self._rebuild_indexes = False
+        self._version = 0
+        self.watcher = None
+        self.history = deque(maxlen=history_size)
+        # Last failed import of the JSON into derived files (see _import_if_stale)
+        self.import_error = None
+        # Error of the last load if it failed (see reload)
+        self.load_error = None
+        self._failed_import = None
+
+    def _json_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _file_mtime(self):
+        if self.snapshot is None:
+            return self._json_mtime()
+        return (self._json_mtime(), self.snapshot.mtime())
+
+    def _index_mtimes(self):
+        mtimes = []
+        for path in self.index_files:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _source_mtime(self):
+        """mtimes of the data and index files, compared to spot a change"""
+        return (self._file_mtime(), self._index_mtimes())
+
+    def _file_digest(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()[:16]
+        except OSError:
+            return ''
+
+    def _import_if_stale(self, derived_mtime, run_import, lock_path):
+        """Run run_import() when the JSON file is newer than the files derived from it
+
+        For stores that serve files imported from the JSON (a database,
+        shards). Processes take turns through a file lock, so only the
+        first to get it imports and the rest find the files fresh. If the
+        import fails - e.g. the edited JSON does not validate - the error
+        is logged and kept in `import_error`, the existing files keep
+        being served, and the same JSON is not tried again until it
+        changes. Raises when there are no existing files to serve.
+        """
+        json_mtime = self._json_mtime()
+
+        def stale():
+            mtime = derived_mtime()
+            return json_mtime is not None and (mtime is None or mtime < json_mtime)
+
+        if not stale() or json_mtime == self._failed_import:
+            return
+        with file_lock(lock_path):
+            if not stale():
+                return
+            try:
+                run_import()
+            except Exception as e:
+                if derived_mtime() is None:
+                    raise
+                self._failed_import = json_mtime
+                self.import_error = f'{type(e).__name__}: {e}'
+                logger.warning('Import of %s failed, serving the previous data: %s', self.path, self.import_error)
+                return
+        self._failed_import = None
+        self.import_error = None
+
+    def watched_paths(self):
+        """Files whose changes should trigger a reload"""
+        paths = [self.path]
+        if self.snapshot is not None:
+            paths.append(self.snapshot.path)
+        return paths + self.index_files
+
+    @property
+    def watching(self):
+        return self.watcher is not None and self.watcher.alive()
+
+    def start_watching(self, **options):
+        """Reload from a background FileWatcher instead of checking on each get()
+
+        Options are passed to FileWatcher (debounce, poll_interval, ...).
+        Restarts the watcher if its thread is gone, e.g. after a fork.
+        """
+        with self._lock:
+            if self.watching:
+                return self.watcher
+            self.watcher = FileWatcher(self.watched_paths(), self.reload, **options).start()
+            return self.watcher
+
+    def stop_watching(self):
+        watcher, self.watcher = self.watcher, None
+        if watcher is not None:
+            watcher.stop()
+
+    def get(self):
+        """Return the current catalog, reloading if the data file changed
+
+        While a watcher is running it does the reloading, so no stat()
+        is needed here. Only the first load happens in the caller's
+        thread; later ones run in the background (see reload_in_background).
+        """
+        catalog = self._catalog
+        if catalog is not None and (self.watching or self._source_mtime() == self._mtime):
+            return catalog
+        if catalog is None:
+            return self.reload()
+        return self.reload_in_background()
+
+    def reload_in_background(self):
+        """Start a reload thread unless one is running, and return the catalog
+
+        The caller that starts it waits up to `reload_wait` seconds, so
+        quick reloads are seen at once; everyone else gets the current
+        catalog straight away.
+        """
+        with self._lock:
+            if self._reloader is not None and self._reloader.is_alive():
+                return self._catalog
+            self._reloader = threading.Thread(target=self._reload_logged, name='catalog-reload', daemon=True)
+            self._reloader.start()
+            reloader = self._reloader
+        reloader.join(self.reload_wait)
+        return self._catalog
+
+    def _reload_logged(self):
+        try:
+            self.reload()
+        except Exception:
+            logger.exception('Reloading %s failed, serving the previous catalog', self.path)
+
+    def _load_json(self, version, digest):
+        catalog = self.catalog_class(self.loader(), version=version, digest=digest)
+        old = self._catalog
+        if old is not None and type(old) is type(catalog) and not self._rebuild_indexes \
+                and catalog.patch_indexes(old):
+            return catalog
+        return catalog.build_indexes()
+
+    def _read_source(self):
+        """Return (digest, load) where load(version, digest) builds the new Catalog"""
+        # A snapshot's prebuilt indexes are stale once an index file is newer
+        newest = max((m for m in (self._json_mtime(),) + self._index_mtimes() if m is not None), default=None)
+        header = self.snapshot.fresh_header(newest) if self.snapshot else None
+        if header is None:
+            return self._file_digest(), self._load_json
+
+        def load_snapshot(version, digest):
+            try:
+                data, indexes = self.snapshot.load(header)
+            except ValueError:
+                # Corrupt snapshot - the JSON file is the source of truth
+                return self._load_json(version, self._file_digest())
+            catalog = self.catalog_class(data, version=version, digest=digest, source='snapshot')
+            catalog.indexes.update(indexes)
+            return catalog.build_indexes()
+
+        return header['digest'], load_snapshot
+
+    def reload(self, force=False):
+        """Load the data (snapshot or JSON file) and build, or patch, the indexes
+
+        Runs in the calling thread; get() keeps returning the previous
+        catalog until this one is built.
+        """
+        with self._reload_lock:
+            mtime = self._source_mtime()
+            if self._catalog is not None and mtime == self._mtime and not force:
+                return self._catalog
+
+            start = time.perf_counter()
+            digest, load = self._read_source()
+            self._rebuild_indexes = self._catalog is not None and mtime[1] != self._indexed_mtimes
+            if self._catalog is not None and digest == self._catalog.digest and not force \
+                    and not self._rebuild_indexes:
+                # Touched but unchanged - keep the current snapshot
+                self._mtime = mtime
+                return self._catalog
+
+            try:
+                catalog = load(self._version + 1, digest)
+            except Exception as e:
+                if self._catalog is None:
+                    raise
+                # A half-written or invalid file: keep serving the current
+                # catalog - never "every phrase deleted" - until it changes again
+                self._mtime = mtime
+                self.load_error = f'{type(e).__name__}: {e}'
+                logger.warning('Loading %s failed, serving the previous catalog: %s', self.path, self.load_error)
+                return self._catalog
+            self._version += 1
+            self._indexed_mtimes = mtime[1]
+            self.load_error = None
+            catalog.load_seconds = time.perf_counter() - start
+            old, record = self._catalog, None
+            if old is not None:
+                record = diff_catalogs(old, catalog)
+                record['load_ms'] = round(catalog.load_seconds * 1000, 1)
+                record['incremental'] = catalog.incremental
+                self.history.append(record)
+            self._catalog = catalog
+            self._mtime = mtime
+        if old is not None:
+            for listener in self.listeners:
+                listener(old, catalog, record)
+        return catalog
+
+    @property
+    def loaded(self):
+        return self._catalog is not None
+
+    def changes_since(self, digest):
+        """Merge the change records since the catalog with `digest` into one set of IDs
+
+        Version numbers count the reloads of one process, so another
+        worker (or this one after a restart) numbers the same data
+        differently; the catalog a client holds is identified by its
+        digest instead, which every process derives from the data.
+
+        Returns (catalog, changes) where changes is {'phrases': {...},
+        'categories': {...}} with added/modified/deleted ID lists relative
+        to the catalog with `digest`. Raises HistoryExpiredError if that
+        catalog is not covered by this process's history.
+        """
+        catalog = self.get()
+        records = list(self.history)
+        if digest == catalog.digest:
+            records = []
+        else:
+            starts = [i for i, record in enumerate(records) if record['from_digest'] == digest]
+            if not starts:
+                raise HistoryExpiredError(f'No change history for catalog {digest}; fetch the full catalog')
+            records = records[starts[-1]:]
+
+        current = {'phrases': catalog.phrase_hashes, 'categories': catalog.category_hashes}
+        changes = {}
+        for kind, present in current.items():
+            # Whether each touched ID existed at `version` is decided by the
+            # first record that mentions it; its state now decides the rest
+            existed = {}
+            for record in records:
+                for action, item_ids in record[kind].items():
+                    for item_id in item_ids:
+                        existed.setdefault(item_id, action != 'added')
+            changes[kind] = {'added': [], 'modified': [], 'deleted': []}
+            for item_id, was_there in existed.items():
+                if item_id in present:
+                    changes[kind]['modified' if was_there else 'added'].append(item_id)
+                elif was_there:
+                    changes[kind]['deleted'].append(item_id)
+        return catalog, changes
+
+
+
+class PhraseUsage:
+    """Counts how often each phrase is used, by phrase ID
+
+    Counts survive catalog reloads; the per-catalog array view used for
+    ranking is rebuilt once per catalog version and then updated in place.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._array = None
+        self._version = None
+
+    def record(self, phrase_id, catalog):
+        with self._lock:
+            self.counts[phrase_id] += 1
+            if self._version == catalog.version and phrase_id in catalog.position:
+                self._array[catalog.position[phrase_id]] += 1
+
+    def array(self, catalog):
+        """Use counts aligned with catalog.phrases"""
+        with self._lock:
+            if self._version != catalog.version:
+                array = np.zeros(len(catalog.phrases), dtype=np.float32)
+                for phrase_id, count in self.counts.items():
+                    if phrase_id in catalog.position:
+                        array[catalog.position[phrase_id]] = count
+                self._array = array
+                self._version = catalog.version
+            return self._array
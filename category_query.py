@@ -0,0 +1,194 @@
+"""
+SA Health App - Category Queries
+Boolean expressions over categories, e.g.
+    examination AND pain_assessment
+    emergency OR symptoms NOT greeting
+    (symptoms OR examination) AND NOT instructions
+
+Each category is a precomputed NumPy bool array over the catalog's
+phrases, so an expression costs one vectorized op per operator
+regardless of catalog size.
+
+Precedence is NOT > AND > OR. Adjacent terms are joined with AND, so
+"symptoms NOT greeting" means "symptoms AND NOT greeting".
+
+Expressions are limited in length, number of categories and nesting
+(parentheses and NOTs), so a crafted one cannot exhaust the recursive
+parser and evaluators; over-limit expressions are malformed ones.
+"""
+
+import re
+from collections import defaultdict
+
+import numpy as np
+
+from catalog import register_index
+
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|([A-Za-z0-9_\-]+))')
+_OPERATORS = {'AND', 'OR', 'NOT'}
+
+MAX_LENGTH = 500
+MAX_TERMS = 32
+MAX_DEPTH = 10
+
+
+class CategoryQueryError(ValueError):
+    """Raised for malformed expressions or unknown categories"""
+
+
+def parse(expression):
+    """Parse an expression into a nested tuple tree
+
+    ('cat', id) | ('not', node) | ('and', left, right) | ('or', left, right)
+    """
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    if len(expression) > MAX_LENGTH:
+        raise CategoryQueryError(f'Category expression longer than {MAX_LENGTH} characters')
+    while position < len(expression):
+        match = _TOKEN_RE.match(expression, position)
+        if not match or match.end() == position:
+            raise CategoryQueryError(f'Unexpected character at position {position}: {expression[position]!r}')
+        position = match.end()
+        if match.group(1):
+            tokens.append('(')
+        elif match.group(2):
+            tokens.append(')')
+        else:
+            word = match.group(3)
+            tokens.append(word.upper() if word.upper() in _OPERATORS else ('cat', word))
+
+    if not tokens:
+        raise CategoryQueryError('Empty category expression')
+    if sum(1 for token in tokens if isinstance(token, tuple)) > MAX_TERMS:
+        raise CategoryQueryError(f'Category expression uses more than {MAX_TERMS} categories')
+
+    parser = _Parser(tokens)
+    tree = parser.parse_or()
+    if parser.pos != len(tokens):
+        raise CategoryQueryError(f'Unexpected {parser.describe(tokens[parser.pos])}')
+    return tree
+
+
+class _Parser:
+    """Recursive-descent parser over the token list"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.depth = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    @staticmethod
+    def describe(token):
+        return f"category '{token[1]}'" if isinstance(token, tuple) else f"'{token}'"
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == 'OR':
+            self.take()
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while True:
+            token = self.peek()
+            if token == 'AND':
+                self.take()
+            elif token is None or token in ('OR', ')'):
+                return node
+            # Anything else starts an implicit AND
+            node = ('and', node, self.parse_not())
+
+    def nest(self):
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise CategoryQueryError(f'Category expression nested more than {MAX_DEPTH} levels deep')
+
+    def parse_not(self):
+        if self.peek() == 'NOT':
+            self.take()
+            self.nest()
+            node = ('not', self.parse_not())
+            self.depth -= 1
+            return node
+        return self.parse_atom()
+
+    def parse_atom(self):
+        token = self.take()
+        if token == '(':
+            self.nest()
+            node = self.parse_or()
+            if self.take() != ')':
+                raise CategoryQueryError("Missing closing ')'")
+            self.depth -= 1
+            return node
+        if isinstance(token, tuple):
+            return token
+        if token is None:
+            raise CategoryQueryError('Expression ended unexpectedly')
+        raise CategoryQueryError(f'Unexpected {self.describe(token)}')
+
+
+class CategoryBitsets:
+    """One bool array per category, aligned with catalog.phrases"""
+
+    def __init__(self, catalog):
+        self.n_phrases = len(catalog.phrases)
+        self.bits = {}
+        for category_id, phrases in catalog.by_category.items():
+            bits = np.zeros(self.n_phrases, dtype=bool)
+            bits[[catalog.position[phrase['id']] for phrase in phrases]] = True
+            self.bits[category_id] = bits
+
+    def patch(self, catalog, remap, positions):
+        """A copy for catalog, re-reading only the phrases at positions
+
+        remap maps this index's phrase positions to catalog's (-1 for
+        phrases deleted or modified).
+        """
+        index = CategoryBitsets.__new__(CategoryBitsets)
+        index.n_phrases = len(catalog.phrases)
+        index.bits = {}
+        fresh = defaultdict(list)
+        for position in positions:
+            for category_id in catalog.phrases[position].get('categories', []):
+                fresh[category_id].append(position)
+        kept = remap >= 0
+        for category_id in catalog.by_category:
+            bits = np.zeros(index.n_phrases, dtype=bool)
+            old = self.bits.get(category_id)
+            if old is not None:
+                bits[remap[np.flatnonzero(old & kept)]] = True
+            bits[fresh[category_id]] = True
+            index.bits[category_id] = bits
+        return index
+
+    def evaluate(self, tree):
+        """Evaluate a parsed tree to a bool array"""
+        kind = tree[0]
+        if kind == 'cat':
+            if tree[1] not in self.bits:
+                raise CategoryQueryError(f'Unknown category: {tree[1]}')
+            return self.bits[tree[1]]
+        if kind == 'not':
+            return ~self.evaluate(tree[1])
+        if kind == 'and':
+            return self.evaluate(tree[1]) & self.evaluate(tree[2])
+        return self.evaluate(tree[1]) | self.evaluate(tree[2])
+
+    def query(self, expression):
+        """Return catalog positions of phrases matching the expression"""
+        return np.flatnonzero(self.evaluate(parse(expression)))
+
+
+register_index('category_bits', CategoryBitsets)
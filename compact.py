@@ -0,0 +1,257 @@
+"""
+SA Health App - Compact Phrase Storage
+Columnar in-memory form of the phrase data, used instead of the nested
+dicts from json.load when the app runs with CATALOG_BACKEND=compact.
+
+Every translation string is stored UTF-8 encoded in one bytes blob, with
+a NumPy offset array marking where each string starts. Phrase IDs,
+category IDs and language codes are interned, and the per-phrase layout
+(which languages, which fields, in which order) and category lists are
+shared between all phrases that have the same one.
+
+CompactCatalog has the same interface as catalog.Catalog. Phrases are
+read-only mapping views over the table; a translation is decoded into a
+plain dict when it is read, so the routes serialize the same JSON as
+before.
+"""
+
+import operator
+import sys
+from array import array
+from collections.abc import Mapping
+
+import numpy as np
+
+from catalog import Catalog
+
+PHRASE_KEYS = ('id', 'categories', 'translations')
+
+
+def _layout(phrase):
+    """((language, (field, ...)), ...) for a phrase, or None if it does not fit the table"""
+    if tuple(phrase) != PHRASE_KEYS or not isinstance(phrase['categories'], list):
+        return None
+    if not all(isinstance(category_id, str) for category_id in phrase['categories']):
+        return None
+    layout = []
+    for language, translation in phrase['translations'].items():
+        if not all(isinstance(value, str) for value in translation.values()):
+            return None
+        layout.append((sys.intern(language), tuple(sys.intern(field) for field in translation)))
+    return tuple(layout)
+
+
+class _Shape:
+    """Languages and translation fields of a phrase, shared by phrases with the same layout"""
+
+    __slots__ = ('languages', 'fields', 'starts')
+
+    def __init__(self, layout):
+        self.languages = tuple(language for language, _ in layout)
+        self.fields = {}
+        self.starts = {}
+        count = 0
+        for language, fields in layout:
+            self.fields[language] = fields
+            self.starts[language] = count
+            count += len(fields)
+
+
+class PhraseTable:
+    """All phrases in columnar form
+
+    Phrases that do not fit the layout (extra keys, non-string values)
+    are kept as they are in `fallback`.
+    """
+
+    def __init__(self, phrases):
+        self.ids = []
+        self.categories = []
+        self.shapes = []
+        self.fallback = {}
+        shapes = {}
+        category_lists = {}
+        blob = bytearray()
+        offsets = array('q', [0])
+        first = array('q', [0])
+        for i, phrase in enumerate(phrases):
+            self.ids.append(sys.intern(phrase['id']))
+            layout = _layout(phrase)
+            if layout is None:
+                self.fallback[i] = phrase
+                self.categories.append(())
+                self.shapes.append(None)
+            else:
+                categories = tuple(sys.intern(category_id) for category_id in phrase['categories'])
+                self.categories.append(category_lists.setdefault(categories, categories))
+                shape = shapes.get(layout)
+                if shape is None:
+                    shape = shapes[layout] = _Shape(layout)
+                self.shapes.append(shape)
+                for language, fields in layout:
+                    translation = phrase['translations'][language]
+                    for field in fields:
+                        blob += translation[field].encode('utf-8')
+                        offsets.append(len(blob))
+            first.append(len(offsets) - 1)
+
+        self.blob = bytes(blob)
+        self.offsets = np.array(offsets, dtype=np.uint32 if len(blob) < 2 ** 32 else np.int64)
+        self.first = np.array(first, dtype=np.uint32 if len(offsets) < 2 ** 32 else np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def strings(self, index, start, count):
+        """Decode `count` strings of phrase `index`, starting at its `start`-th string"""
+        k = int(self.first[index]) + start
+        bounds = self.offsets[k:k + count + 1].tolist()
+        blob = self.blob
+        return [blob[bounds[j]:bounds[j + 1]].decode('utf-8') for j in range(count)]
+
+    def phrase(self, index):
+        fallback = self.fallback.get(index)
+        if fallback is not None:
+            return fallback
+        return CompactPhrase(self, index)
+
+    def languages(self):
+        """Language codes in order of first appearance"""
+        seen = {}
+        for index, shape in enumerate(self.shapes):
+            languages = shape.languages if shape is not None else self.fallback[index]['translations']
+            for language in languages:
+                seen.setdefault(language, None)
+        return list(seen)
+
+
+class CompactTranslations(Mapping):
+    """Read-only {language: translation} view; translations are decoded on access"""
+
+    __slots__ = ('_table', '_index', '_shape')
+
+    def __init__(self, table, index, shape):
+        self._table = table
+        self._index = index
+        self._shape = shape
+
+    def __getitem__(self, language):
+        fields = self._shape.fields[language]
+        values = self._table.strings(self._index, self._shape.starts[language], len(fields))
+        return dict(zip(fields, values))
+
+    def __contains__(self, language):
+        return language in self._shape.fields
+
+    def __iter__(self):
+        return iter(self._shape.languages)
+
+    def __len__(self):
+        return len(self._shape.languages)
+
+
+class CompactPhrase(Mapping):
+    """Read-only view of one phrase in a PhraseTable, with the keys of the JSON form"""
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key):
+        if key == 'id':
+            return self._table.ids[self._index]
+        if key == 'categories':
+            return list(self._table.categories[self._index])
+        if key == 'translations':
+            return CompactTranslations(self._table, self._index, self._table.shapes[self._index])
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(PHRASE_KEYS)
+
+    def __len__(self):
+        return len(PHRASE_KEYS)
+
+    def __repr__(self):
+        return f'CompactPhrase({self._table.ids[self._index]!r})'
+
+
+class CompactPhraseList:
+    """Read-only list of phrases in a PhraseTable, optionally a subset of positions"""
+
+    def __init__(self, table, positions=None):
+        self.table = table
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.table) if self.positions is None else len(self.positions)
+
+    def _position(self, i):
+        return i if self.positions is None else int(self.positions[i])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.table.phrase(self._position(i)) for i in range(*index.indices(len(self)))]
+        index = operator.index(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('phrase index out of range')
+        return self.table.phrase(self._position(index))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.table.phrase(self._position(i))
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __eq__(self, other):
+        if isinstance(other, (list, CompactPhraseList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+
+class _CompactById(Mapping):
+    """{phrase_id: phrase} view over the catalog's position index"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __getitem__(self, phrase_id):
+        return self.catalog.table.phrase(self.catalog.position[phrase_id])
+
+    def __iter__(self):
+        return iter(self.catalog.position)
+
+    def __len__(self):
+        return len(self.catalog.position)
+
+
+class CompactCatalog(Catalog):
+    """A Catalog that keeps its phrases in a PhraseTable instead of dicts"""
+
+    lazy_phrases = True
+
+    def __init__(self, data, version=1, digest='', loaded_at=None, source='json'):
+        super().__init__({'categories': data.get('categories', []), 'phrases': []},
+                         version=version, digest=digest, loaded_at=loaded_at, source=source)
+        self.data = None
+        self.table = PhraseTable(data.get('phrases', []))
+        self.phrases = CompactPhraseList(self.table)
+        self.position = {phrase_id: i for i, phrase_id in enumerate(self.table.ids)}
+        self.by_id = _CompactById(self)
+        self.languages = self.table.languages()
+
+        members = {category_id: [] for category_id in self.category_ids}
+        for i, categories in enumerate(self.table.categories):
+            for category_id in categories or self.table.fallback.get(i, {}).get('categories', ()):
+                members.setdefault(category_id, []).append(i)
+        self.by_category = {
+            category_id: CompactPhraseList(self.table, np.array(positions, dtype=np.int32))
+            for category_id, positions in members.items()
+        }
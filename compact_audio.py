@@ -0,0 +1,42 @@
+"""
+Maintenance Step - Audio Pack Compaction
+Rewrites the shared audio pack (AUDIO_PACK) without deleted and replaced
+clips, and with --manifest without clips the current build can no longer
+play (keys not in its audio_manifest.json). Safe to run while the app
+serves: appends wait for the compaction and workers reopen the new file.
+
+Usage: python compact_audio.py [pack file] [--manifest]
+"""
+
+import json
+import os
+import sys
+
+import app
+from audio_pack import AudioPack
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    pack_path = args[0] if args else app.config['AUDIO_PACK']
+    if not pack_path:
+        print("[FAIL] No pack file given and AUDIO_PACK is not set")
+        sys.exit(1)
+    if not os.path.exists(pack_path):
+        print(f"[FAIL] {pack_path} does not exist")
+        sys.exit(1)
+
+    keep = None
+    if '--manifest' in sys.argv:
+        manifest_path = os.path.join(app.DATA_DIR, 'audio_manifest.json')
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                keep = {clip['key'] for clip in json.load(f)['clips']}
+        except OSError as e:
+            print(f"[FAIL] Cannot read the audio manifest: {e} - run build_catalog.py first")
+            sys.exit(1)
+
+    pack = AudioPack(pack_path)
+    before = pack.stats()
+    kept, freed = pack.compact(keep)
+    print(f"[OK] Compacted {pack_path}: kept {kept:,} of {before['entries']:,} clips, "
+          f"freed {freed:,} of {before['file_bytes']:,} bytes")
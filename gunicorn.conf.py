@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration for production (Linux)
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:application
+
+The app is imported - and wsgi.preload() run - once in the master
+before the workers are forked, so the catalog and its indexes are
+shared copy-on-write between workers. Each worker then generates the
+warm audio clips in the background (WSGI_WARMUP_AUDIO=1 generates them
+in the master instead, before forking). See bench_preload.py for the
+measured per-worker savings.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Load wsgi.py (catalog, indexes) in the master before forking.
+# After a data change each worker reloads its own copy (the master's is
+# never reloaded), so restart the server to share a large change again
+preload_app = True
+
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'sync'
+timeout = 30
+graceful_timeout = 30
+
+# Workers never need recycling to shed a per-worker catalog copy, and a
+# replacement is forked from the preloaded master, so it starts warm
+max_requests = 0
+
+accesslog = '-'
+errorlog = '-'
+
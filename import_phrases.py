@@ -0,0 +1,28 @@
+"""
+Import phrases.json into the SQLite store
+Validates the JSON and (re)builds the database used when the app runs
+with CATALOG_BACKEND=sqlite. The app also re-imports on its own when the
+JSON is newer than the database.
+
+Usage: python import_phrases.py [phrases.json] [phrases.db]
+"""
+
+import sys
+import time
+
+import app
+from catalog import CatalogValidationError
+from sqlite_store import import_json
+
+if __name__ == '__main__':
+    json_path = sys.argv[1] if len(sys.argv) > 1 else app.DATA_FILE
+    db_path = sys.argv[2] if len(sys.argv) > 2 else app.CATALOG_DB
+
+    start = time.perf_counter()
+    try:
+        digest = import_json(json_path, db_path)
+    except CatalogValidationError as e:
+        print(f"[FAIL] {e}")
+        sys.exit(1)
+
+    print(f"[OK] Imported {json_path} into {db_path} in {time.perf_counter() - start:.1f}s (digest {digest})")
@@ -0,0 +1,52 @@
+"""
+SA Health App - Cursor Pagination
+Opaque cursors that pin a page walk to one catalog version.
+
+A cursor records the catalog digest and the next offset. Digests are
+content hashes, so every worker serving the same phrases.json accepts
+the same cursors; after a reload the old cursors are rejected and the
+client restarts instead of silently skipping or repeating phrases.
+"""
+
+import base64
+import json
+
+
+class PaginationError(Exception):
+    """Raised for invalid or stale cursors; carries the HTTP status"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def encode_cursor(version, offset):
+    payload = json.dumps({'v': version, 'o': offset}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (version, offset) or raise PaginationError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        version, offset = payload['v'], int(payload['o'])
+    except (ValueError, KeyError, TypeError):
+        raise PaginationError('Invalid cursor')
+    if offset < 0:
+        raise PaginationError('Invalid cursor')
+    return version, offset
+
+
+def page_slice(items, version, limit, cursor=None):
+    """Return (page, next cursor or None) for one page of items"""
+    offset = 0
+    if cursor:
+        cursor_version, offset = decode_cursor(cursor)
+        if cursor_version != version:
+            raise PaginationError('Catalog changed during pagination - restart from the first page', 409)
+
+    page = items[offset:offset + limit]
+    next_offset = offset + len(page)
+    next_cursor = encode_cursor(version, next_offset) if next_offset < len(items) else None
+    return page, next_cursor
@@ -0,0 +1,356 @@
+"""
+SA Health App - Catalog Build Pipeline
+Validates phrases.json once, normalizes its text and writes every
+derived artifact into a versioned build directory, so workers serve a
+build without validating, indexing or rendering anything at startup.
+
+Layout of the build root (data/build by default):
+    <build>/                one directory per build, named by the digest of its
+                            inputs (the catalog's digest when there are no concepts)
+        phrases.json        validated, normalized catalog
+        concepts.json       word groups of the situation finder (semantic.py)
+        phrases.snapshot    data plus every prebuilt index (snapshot.py)
+        phrases.db          SQLite database (CATALOG_BACKEND=sqlite)
+        shards/             per-language shards (CATALOG_BACKEND=sharded)
+        bodies/             pre-rendered API bodies, index.json maps keys to files
+        audio_manifest.json the text and cache key of every audio clip
+        manifest.json       digest, counts, artifact checksums, step timings
+    current                 symlink to the build being served
+
+A build is written under a temporary name and renamed into place, and
+`current` is switched with an atomic rename, so workers never see a
+partial build; with the file watcher they reload when it switches.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import unicodedata
+
+import catalog as catalog_module
+import semantic
+from audio import clip_key, tts_input
+from catalog import Catalog, CatalogStore, CatalogValidationError, validate_catalog_data
+from shards import write_shards
+from snapshot import SnapshotFile, write_snapshot
+from sqlite_store import write_database
+
+CURRENT_LINK = 'current'
+MANIFEST_FILE = 'manifest.json'
+# Read from next to the source phrases.json and copied into the build
+CONCEPTS_FILE = 'concepts.json'
+
+# Field types of each record, beyond what validate_catalog_data checks
+SCHEMA = {
+    'category': {'required': {'id': str, 'name': str}, 'optional': {'icon': str, 'description': str}},
+    'phrase': {'required': {'id': str, 'categories': list, 'translations': dict}, 'optional': {}},
+    'translation': {'required': {'text': str, 'phonetic': str}, 'optional': {'tts_pronunciation': str}}
+}
+
+ID_PATTERN = re.compile(r'^[a-z0-9_]+$')
+
+# Translations that were never filled in
+PLACEHOLDER_TEXT = {'todo', 'tbd', 'placeholder'}
+
+# Bodies rendered for every build, besides one page per category
+PREBUILT_URLS = ['/api/categories', '/api/phrases', '/api/bootstrap', '/app']
+
+
+def normalize_text(value):
+    """NFC-normalize a string and collapse runs of whitespace"""
+    return ' '.join(unicodedata.normalize('NFC', value).split())
+
+
+def normalize_catalog(data):
+    """Copy of the data with every string value normalized; returns (data, strings changed)"""
+    changed = 0
+
+    def normalize(value):
+        nonlocal changed
+        if isinstance(value, str):
+            normalized = normalize_text(value)
+            changed += normalized != value
+            return normalized
+        if isinstance(value, dict):
+            return {key: normalize(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [normalize(item) for item in value]
+        return value
+
+    return normalize(data), changed
+
+
+def _check_record(kind, record, label, problems):
+    schema = SCHEMA[kind]
+    for field, field_type in schema['required'].items():
+        if not isinstance(record.get(field), field_type):
+            problems.append(f"{label} has no {field_type.__name__} '{field}'")
+    for field, value in record.items():
+        field_type = schema['required'].get(field) or schema['optional'].get(field)
+        if field_type is None:
+            problems.append(f"{label} has unknown field '{field}'")
+        elif not isinstance(value, field_type):
+            problems.append(f"{label} field '{field}' is not a {field_type.__name__}")
+
+
+def check_schema(data, required_languages=None):
+    """Check normalized data against SCHEMA, raising CatalogValidationError
+
+    Beyond the structural checks done at load time, every phrase needs
+    text and a phonetic guide in each of `required_languages` (default:
+    every language used in the catalog), at least one category, and no
+    empty or placeholder text; IDs must be lowercase slugs.
+    """
+    validate_catalog_data(data)
+    if required_languages is None:
+        required_languages = list(dict.fromkeys(
+            language for phrase in data['phrases'] for language in phrase['translations']
+        ))
+
+    problems = []
+    for category in data['categories']:
+        label = f"Category '{category['id']}'"
+        _check_record('category', category, label, problems)
+        if not ID_PATTERN.match(category['id']):
+            problems.append(f'{label} id is not a lowercase slug')
+
+    for phrase in data['phrases']:
+        label = f"Phrase '{phrase['id']}'"
+        _check_record('phrase', phrase, label, problems)
+        if not ID_PATTERN.match(phrase['id']):
+            problems.append(f'{label} id is not a lowercase slug')
+        if not phrase.get('categories'):
+            problems.append(f'{label} has no categories')
+        for language in required_languages:
+            if language not in phrase['translations']:
+                problems.append(f"{label} is missing '{language}'")
+        for language, translation in phrase['translations'].items():
+            translation_label = f'{label} {language}'
+            _check_record('translation', translation, translation_label, problems)
+            for field in ('text', 'phonetic'):
+                value = translation.get(field)
+                if isinstance(value, str) and (not value or value.lower() in PLACEHOLDER_TEXT):
+                    problems.append(f"{translation_label} has empty or placeholder {field}")
+
+    if problems:
+        raise CatalogValidationError.from_problems(problems)
+    return data
+
+
+def audio_manifest(data, digest):
+    """Every clip the catalog can play: the text sent to TTS and its cache key"""
+    clips = []
+    for phrase in data['phrases']:
+        for language, translation in phrase['translations'].items():
+            text, gtts_lang = tts_input(translation, language)
+            clips.append({
+                'phrase_id': phrase['id'],
+                'language': language,
+                'tts_language': gtts_lang,
+                'text': text,
+                'key': clip_key(phrase['id'], language, text, gtts_lang)
+            })
+    return {'digest': digest, 'clips': clips}
+
+
+def render_bodies(build_dir, body_dir):
+    """Render the API bodies of a build through the app's own routes
+
+    The build is loaded the way a worker would load it (from its
+    snapshot) and the bodies are taken from the app's body cache, so
+    keys and bytes are exactly what the routes produce. Returns the
+    number of bodies written.
+    """
+    import app as app_module
+    from serialization import BodyCache, PrebuiltBodies, WIRE_FORMATS
+
+    store = CatalogStore(os.path.join(build_dir, 'phrases.json'), None,
+                         snapshot=SnapshotFile(os.path.join(build_dir, 'phrases.snapshot')),
+                         index_files=[os.path.join(build_dir, CONCEPTS_FILE)])
+    catalog = store.get()
+    originals = (app_module.catalog_store, app_module.body_cache, app_module.prebuilt_bodies)
+    app_module.catalog_store = store
+    app_module.body_cache = BodyCache(max_bytes=2 ** 62)
+    # Not written yet, so every body is rendered
+    app_module.prebuilt_bodies = PrebuiltBodies(body_dir)
+    try:
+        urls = PREBUILT_URLS + [f'/api/phrases/category/{category_id}' for category_id in catalog.category_ids]
+        with app_module.app.test_client() as client:
+            for url in urls:
+                for mimetype in ['application/json'] + list(WIRE_FORMATS):
+                    client.get(url, headers={'Accept': mimetype})
+        rendered = app_module.body_cache.items()
+    finally:
+        app_module.catalog_store, app_module.body_cache, app_module.prebuilt_bodies = originals
+
+    prefix = f'{catalog.digest}:'
+    bodies = {}
+    os.makedirs(body_dir)
+    for key, body in rendered:
+        key = key[len(prefix):]
+        filename = f'{hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]}.bin'
+        with open(os.path.join(body_dir, filename), 'wb') as f:
+            f.write(body)
+        bodies[key] = filename
+    _write_json(os.path.join(body_dir, 'index.json'),
+                {'digest': catalog.digest, 'bodies': bodies})
+    return len(bodies)
+
+
+def _write_json(path, data, indent=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        if indent:
+            f.write('\n')
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _artifacts(build_dir):
+    """{relative path: {'bytes', 'sha256'}} of every file in a build"""
+    artifacts = {}
+    for root, _, files in os.walk(build_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, build_dir).replace(os.sep, '/')
+            if relative != MANIFEST_FILE:
+                artifacts[relative] = {'bytes': os.path.getsize(path), 'sha256': _file_sha256(path)}
+    return dict(sorted(artifacts.items()))
+
+
+def publish(build_root, build_id):
+    """Point the `current` link at a build, atomically"""
+    link = os.path.join(build_root, CURRENT_LINK)
+    tmp_link = f'{link}.tmp'
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(build_id, tmp_link)
+    os.replace(tmp_link, link)
+
+
+def current_build(build_root):
+    """Name of the published build, or None"""
+    link = os.path.join(build_root, CURRENT_LINK)
+    return os.readlink(link) if os.path.islink(link) else None
+
+
+def prune(build_root, keep):
+    """Remove all but the `keep` newest builds, never the current one"""
+    current = current_build(build_root)
+    builds = [name for name in os.listdir(build_root)
+              if not os.path.islink(os.path.join(build_root, name))
+              and os.path.isfile(os.path.join(build_root, name, MANIFEST_FILE))]
+    builds.sort(key=lambda name: os.path.getmtime(os.path.join(build_root, name, MANIFEST_FILE)), reverse=True)
+    removed = []
+    for name in builds[keep:]:
+        if name != current:
+            shutil.rmtree(os.path.join(build_root, name))
+            removed.append(name)
+    return removed
+
+
+def build_catalog(json_path, build_root, required_languages=None, keep=3, publish_build=True):
+    """Validate and normalize phrases.json and write a build; returns its manifest
+
+    Rebuilding unchanged data reuses the existing build directory.
+    Raises CatalogValidationError (or SnapshotError) without touching
+    the published build.
+    """
+    steps = {}
+    step_start = time.perf_counter()
+
+    def step(name):
+        nonlocal step_start
+        now = time.perf_counter()
+        steps[name] = round((now - step_start) * 1000, 1)
+        step_start = now
+
+    with open(json_path, 'rb') as f:
+        source = f.read()
+    concepts_path = os.path.join(os.path.dirname(os.path.abspath(json_path)), CONCEPTS_FILE)
+    concepts = None
+    if os.path.isfile(concepts_path):
+        with open(concepts_path, 'rb') as f:
+            concepts = f.read()
+    data, normalized = normalize_catalog(validate_catalog_data(json.loads(source)))
+    check_schema(data, required_languages)
+    raw = (json.dumps(data, ensure_ascii=False, indent=2) + '\n').encode('utf-8')
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    # The concepts feed the semantic index, so editing them makes a new build
+    build_id = digest if concepts is None else hashlib.sha256(raw + concepts).hexdigest()[:16]
+    step('validate')
+
+    os.makedirs(build_root, exist_ok=True)
+    build_dir = os.path.join(build_root, build_id)
+    manifest_path = os.path.join(build_dir, MANIFEST_FILE)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest.setdefault('build', build_id)
+        manifest['reused'] = True
+    else:
+        tmp_dir = os.path.join(build_root, f'.{build_id}.tmp')
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        json_out = os.path.join(tmp_dir, 'phrases.json')
+        with open(json_out, 'wb') as f:
+            f.write(raw)
+        concepts_out = os.path.join(tmp_dir, CONCEPTS_FILE)
+        if concepts is not None:
+            with open(concepts_out, 'wb') as f:
+                f.write(concepts)
+
+        # Index with the build's concepts, not those of the build being served
+        served_concepts, semantic.CONCEPTS_FILE = semantic.CONCEPTS_FILE, concepts_out
+        try:
+            catalog = Catalog(data, digest=digest).build_indexes()
+        finally:
+            semantic.CONCEPTS_FILE = served_concepts
+        step('index')
+        write_snapshot(catalog, os.stat(json_out).st_mtime_ns, os.path.join(tmp_dir, 'phrases.snapshot'))
+        step('snapshot')
+        write_database(data, digest, os.path.join(tmp_dir, 'phrases.db'))
+        step('database')
+        write_shards(data, digest, os.path.join(tmp_dir, 'shards'))
+        step('shards')
+        _write_json(os.path.join(tmp_dir, 'audio_manifest.json'), audio_manifest(data, digest))
+        step('audio_manifest')
+        bodies = render_bodies(tmp_dir, os.path.join(tmp_dir, 'bodies'))
+        step('bodies')
+
+        manifest = {
+            'build': build_id,
+            'digest': digest,
+            'source': os.path.abspath(json_path),
+            'source_sha256': hashlib.sha256(source).hexdigest(),
+            'built_at': time.time(),
+            'phrases': len(data['phrases']),
+            'categories': len(data['categories']),
+            'languages': catalog.languages,
+            'normalized_strings': normalized,
+            'indexes': sorted(catalog_module._snapshot_indexes),
+            'bodies': bodies,
+            'steps_ms': steps,
+            'artifacts': _artifacts(tmp_dir)
+        }
+        _write_json(os.path.join(tmp_dir, MANIFEST_FILE), manifest, indent=2)
+        if os.path.exists(build_dir):
+            # Left over from an interrupted build
+            shutil.rmtree(build_dir)
+        os.replace(tmp_dir, build_dir)
+        manifest['reused'] = False
+
+    if publish_build:
+        publish(build_root, build_id)
+        manifest['pruned'] = prune(build_root, keep)
+    return manifest
@@ -0,0 +1,601 @@
+"""
+SA Health App - Phrase Search
+Multilingual inverted index with BM25 ranking over every language's
+text and phonetic fields.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import chain
+
+import numpy as np
+
+from catalog import register_index
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Fields of each translation that are searchable
+SEARCH_FIELDS = ('text', 'phonetic')
+
+# Fuzzy search also matches the TTS respelling, which is closest to how
+# workers type words they have only heard
+FUZZY_FIELDS = ('text', 'phonetic', 'tts_pronunciation')
+
+# Candidates verified with a full edit-distance check per query word
+FUZZY_CANDIDATES = 64
+
+_TOKEN_RE = re.compile(r"\w+")
+_FUZZY_TOKEN_RE = re.compile(r"\w+(?:-\w+)*")
+
+
+def normalize(text):
+    """Lowercase and strip accents so 'Môre' matches 'more'"""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.casefold()
+
+
+def tokenize(text):
+    """Split normalized text into word tokens"""
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def fuzzy_tokenize(text):
+    """Tokenize for fuzzy matching - hyphenated syllables are joined into one word"""
+    return [token.replace('-', '') for token in _FUZZY_TOKEN_RE.findall(normalize(text))]
+
+
+def trigrams(word):
+    """Padded character trigrams, so word starts weigh more than word ends"""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edit_distance(word):
+    """Edit-distance bound that grows with word length"""
+    if len(word) <= 3:
+        return 0
+    if len(word) <= 5:
+        return 1
+    if len(word) <= 8:
+        return 2
+    return 3
+
+
+def bounded_levenshtein(a, b, bound):
+    """Levenshtein distance, or bound + 1 as soon as it must exceed bound"""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        if min(current) > bound:
+            return bound + 1
+        previous = current
+    return previous[-1]
+
+
+class _PhraseIndex:
+    """Shared layout for indexes where each (language, phrase) pair is one document
+
+    Documents are laid out language-major (doc = lang * n_phrases + phrase)
+    so per-phrase scores are a reshape and max, and language filters are
+    row selections.
+    """
+
+    def __init__(self, catalog):
+        self.phrase_ids = [phrase['id'] for phrase in catalog.phrases]
+        self.languages = list(catalog.languages)
+        self.n_phrases = len(self.phrase_ids)
+        self.n_docs = len(self.languages) * self.n_phrases
+        self.lang_pos = {lang: i for i, lang in enumerate(self.languages)}
+
+        # Category membership as phrase-index arrays for filtering
+        self.category_members = {
+            category_id: np.array(
+                [catalog.position[phrase['id']] for phrase in phrases], dtype=np.int32
+            )
+            for category_id, phrases in catalog.by_category.items()
+        }
+
+    def _documents(self, catalog, fields, positions=None):
+        """Yield (doc, [field texts]) for every translation (or those of the phrases at positions)"""
+        phrases = enumerate(catalog.phrases) if positions is None else \
+            ((int(p_idx), catalog.phrases[p_idx]) for p_idx in positions)
+        for p_idx, phrase in phrases:
+            for lang, translation in phrase.get('translations', {}).items():
+                doc = self.lang_pos[lang] * self.n_phrases + p_idx
+                yield doc, [translation[field] for field in fields if translation.get(field)]
+
+    def _remap_docs(self, docs, remap, n_phrases):
+        """Move docs of this index to a catalog with n_phrases phrases
+
+        remap[old position] is the phrase's new position, or -1 to drop it.
+        Returns (new doc ids, mask of the docs kept).
+        """
+        if self.n_phrases == 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(len(docs), dtype=bool)
+        languages, positions = np.divmod(docs, self.n_phrases)
+        positions = remap[positions]
+        keep = positions >= 0
+        return (languages[keep] * n_phrases + positions[keep]).astype(np.int32), keep
+
+    def _patched(self, catalog):
+        """An empty index of the same class laid out for catalog, or None if languages changed"""
+        index = type(self).__new__(type(self))
+        _PhraseIndex.__init__(index, catalog)
+        return index if index.languages == self.languages else None
+
+    def _rank(self, scores, languages=None, categories=None, limit=20):
+        """Turn per-document scores into (total, [(phrase_id, score, language)])"""
+        scores = scores.reshape(len(self.languages), self.n_phrases)
+
+        if languages:
+            rows = [self.languages.index(lang) for lang in languages if lang in self.languages]
+            if not rows:
+                return 0, []
+            scores = scores[rows]
+            row_languages = [self.languages[row] for row in rows]
+        else:
+            row_languages = self.languages
+
+        best_row = scores.argmax(axis=0)
+        phrase_scores = scores[best_row, np.arange(self.n_phrases)]
+
+        if categories:
+            mask = np.zeros(self.n_phrases, dtype=bool)
+            for category_id in categories:
+                members = self.category_members.get(category_id)
+                if members is not None:
+                    mask[members] = True
+            phrase_scores = np.where(mask, phrase_scores, 0)
+
+        hits = np.flatnonzero(phrase_scores > 0)
+        total = len(hits)
+        if len(hits) > limit:
+            top = np.argpartition(-phrase_scores[hits], limit - 1)[:limit]
+            hits = hits[top]
+        hits = hits[np.argsort(-phrase_scores[hits], kind='stable')]
+
+        return total, [
+            (self.phrase_ids[i], float(phrase_scores[i]), row_languages[best_row[i]])
+            for i in hits
+        ]
+
+
+def _regroup(keys, key_of, *columns):
+    """Sort postings by key id, dropping keys left without postings
+
+    Returns (live keys, new id per old key id or -1, offsets, *columns).
+    """
+    counts = np.bincount(key_of, minlength=len(keys))
+    live = counts > 0
+    new_ids = np.where(live, np.cumsum(live) - 1, -1)
+    order = np.argsort(key_of, kind='stable')
+    offsets = np.concatenate(([0], np.cumsum(counts[live])))
+    return ([key for key, alive in zip(keys, live) if alive], new_ids, offsets,
+            *(column[order] for column in columns))
+
+
+def _flatten_postings(keys, raw):
+    """Pack {key: [ids]} into one int32 array plus offsets, for cheap slicing"""
+    lengths = np.array([len(raw[key]) for key in keys], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    flat = np.fromiter(chain.from_iterable(raw[key] for key in keys),
+                       dtype=np.int32, count=int(offsets[-1]))
+    return flat, offsets
+
+
+class InvertedIndex(_PhraseIndex):
+    """BM25 keyword index over every language's text and phonetic fields
+
+    Each posting stores its precomputed BM25 term weight, so a query is
+    one vectorized scatter-add per query term. Term frequencies and
+    document lengths are kept too, so a reload can patch the postings of
+    changed phrases and recompute the weights without re-tokenizing the
+    rest.
+    """
+
+    def __init__(self, catalog):
+        super().__init__(catalog)
+
+        doc_len = np.zeros(self.n_docs, dtype=np.float32)
+        raw_docs = defaultdict(list)
+        raw_tfs = defaultdict(list)
+
+        for doc, texts in self._documents(catalog, SEARCH_FIELDS):
+            tokens = []
+            for text in texts:
+                tokens.extend(tokenize(text))
+            doc_len[doc] = len(tokens)
+            for token, tf in Counter(tokens).items():
+                raw_docs[token].append(doc)
+                raw_tfs[token].append(tf)
+
+        # Flatten all posting lists so BM25 weights are computed in one pass
+        tokens = list(raw_docs)
+        all_docs, offsets = _flatten_postings(tokens, raw_docs)
+        all_tfs = np.fromiter(chain.from_iterable(raw_tfs[t] for t in tokens),
+                              dtype=np.float32, count=len(all_docs))
+        self._weigh(tokens, all_docs, all_tfs, offsets, doc_len)
+
+    def _weigh(self, tokens, all_docs, all_tfs, offsets, doc_len):
+        present = doc_len > 0
+        n_present = int(present.sum()) or 1
+        avg_len = float(doc_len[present].mean()) if present.any() else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / avg_len)
+
+        df = np.diff(offsets).astype(np.float32)
+        idf = np.log(1 + (n_present - df + 0.5) / (df + 0.5)).astype(np.float32)
+        all_weights = (np.repeat(idf, np.diff(offsets)) * all_tfs * (BM25_K1 + 1)
+                       / (all_tfs + norm[all_docs])).astype(np.float32)
+
+        self.tokens = tokens
+        self.all_docs = all_docs
+        self.all_tfs = all_tfs
+        self.all_weights = all_weights
+        self.offsets = offsets
+        self.doc_len = doc_len
+        self.postings = self._postings()
+
+    def patch(self, catalog, remap, positions):
+        """A copy for catalog, re-indexing only the phrases at positions
+
+        remap maps this index's phrase positions to catalog's (-1 for
+        phrases deleted or modified). Returns None if it cannot patch.
+        """
+        index = self._patched(catalog)
+        if index is None:
+            return None
+
+        token_of = np.repeat(np.arange(len(self.tokens), dtype=np.int32), np.diff(self.offsets))
+        docs, keep = self._remap_docs(self.all_docs, remap, index.n_phrases)
+        token_of, tfs = token_of[keep], self.all_tfs[keep]
+        doc_len = np.zeros(index.n_docs, dtype=np.float32)
+        kept_docs, keep = self._remap_docs(np.arange(self.n_docs), remap, index.n_phrases)
+        doc_len[kept_docs] = self.doc_len[keep]
+
+        tokens = list(self.tokens)
+        token_ids = {token: i for i, token in enumerate(tokens)}
+        new_tokens, new_docs, new_tfs = [], [], []
+        for doc, texts in index._documents(catalog, SEARCH_FIELDS, positions):
+            words = []
+            for text in texts:
+                words.extend(tokenize(text))
+            doc_len[doc] = len(words)
+            for token, tf in Counter(words).items():
+                token_id = token_ids.get(token)
+                if token_id is None:
+                    token_id = token_ids[token] = len(tokens)
+                    tokens.append(token)
+                new_tokens.append(token_id)
+                new_docs.append(doc)
+                new_tfs.append(tf)
+
+        tokens, _, offsets, all_docs, all_tfs = _regroup(
+            tokens,
+            np.concatenate([token_of, np.array(new_tokens, dtype=np.int32)]),
+            np.concatenate([docs, np.array(new_docs, dtype=np.int32)]),
+            np.concatenate([tfs, np.array(new_tfs, dtype=np.float32)])
+        )
+        index._weigh(tokens, all_docs, all_tfs, offsets, doc_len)
+        return index
+
+    def _postings(self):
+        """token -> (doc ids, idf-weighted BM25 impact per posting), as views"""
+        docs, weights, offsets = self.all_docs, self.all_weights, self.offsets
+        return {
+            token: (docs[offsets[i]:offsets[i + 1]], weights[offsets[i]:offsets[i + 1]])
+            for i, token in enumerate(self.tokens)
+        }
+
+    def __getstate__(self):
+        # Postings are views into the flat arrays - rebuilt on restore
+        state = dict(self.__dict__)
+        del state['postings']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.postings = self._postings()
+
+    def search(self, query, languages=None, categories=None, limit=20):
+        """Return (total matches, [(phrase_id, score, best_language)]) ranked by BM25"""
+        terms = [term for term in set(tokenize(query)) if term in self.postings]
+        if not terms or self.n_phrases == 0:
+            return 0, []
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in terms:
+            docs, weights = self.postings[term]
+            # Each (term, doc) pair appears once, so fancy-index add is safe
+            scores[docs] += weights
+
+        return self._rank(scores, languages, categories, limit)
+
+
+class TrigramIndex(_PhraseIndex):
+    """Typo- and pronunciation-tolerant word matching
+
+    Every distinct word in the fuzzy fields is a vocabulary term. A query
+    word is matched against the vocabulary by counting shared trigrams
+    (one bincount), then only the best few candidates are checked with a
+    bounded edit distance. Matched terms map to documents through a
+    second posting list.
+    """
+
+    def __init__(self, catalog):
+        super().__init__(catalog)
+
+        term_ids = {}
+        raw_docs = defaultdict(list)
+        for doc, texts in self._documents(catalog, FUZZY_FIELDS):
+            words = set()
+            for text in texts:
+                words.update(fuzzy_tokenize(text))
+            for word in words:
+                term_id = term_ids.setdefault(word, len(term_ids))
+                raw_docs[term_id].append(doc)
+
+        self.terms = list(term_ids)
+        self.term_lengths = np.array([len(term) for term in self.terms], dtype=np.int32)
+
+        raw_grams = defaultdict(list)
+        for term_id, term in enumerate(self.terms):
+            for gram in trigrams(term):
+                raw_grams[gram].append(term_id)
+        self.gram_postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in raw_grams.items()}
+
+        self.term_docs, self.term_offsets = _flatten_postings(range(len(self.terms)), raw_docs)
+        self._weigh()
+
+    def _weigh(self):
+        df = np.diff(self.term_offsets).astype(np.float32)
+        self.term_idf = np.log(1 + len(self.terms) / np.maximum(df, 1)).astype(np.float32)
+
+    def patch(self, catalog, remap, positions):
+        """A copy for catalog, re-indexing only the phrases at positions (see InvertedIndex.patch)"""
+        index = self._patched(catalog)
+        if index is None:
+            return None
+
+        term_of = np.repeat(np.arange(len(self.terms), dtype=np.int32), np.diff(self.term_offsets))
+        docs, keep = self._remap_docs(self.term_docs, remap, index.n_phrases)
+        term_of = term_of[keep]
+
+        terms = list(self.terms)
+        term_ids = {term: i for i, term in enumerate(terms)}
+        new_terms, new_docs = [], []
+        for doc, texts in index._documents(catalog, FUZZY_FIELDS, positions):
+            words = set()
+            for text in texts:
+                words.update(fuzzy_tokenize(text))
+            for word in words:
+                term_id = term_ids.get(word)
+                if term_id is None:
+                    term_id = term_ids[word] = len(terms)
+                    terms.append(word)
+                new_terms.append(term_id)
+                new_docs.append(doc)
+
+        index.terms, new_ids, index.term_offsets, index.term_docs = _regroup(
+            terms,
+            np.concatenate([term_of, np.array(new_terms, dtype=np.int32)]),
+            np.concatenate([docs, np.array(new_docs, dtype=np.int32)])
+        )
+        index.term_lengths = np.array([len(term) for term in index.terms], dtype=np.int32)
+
+        # Renumber the trigram postings; terms added above sort after the old ones
+        index.gram_postings = {}
+        for gram, ids in self.gram_postings.items():
+            ids = new_ids[ids]
+            ids = ids[ids >= 0]
+            if len(ids):
+                index.gram_postings[gram] = ids.astype(np.int32)
+        raw_grams = defaultdict(list)
+        for term_id in range(len(self.terms), len(terms)):
+            if new_ids[term_id] >= 0:
+                for gram in trigrams(terms[term_id]):
+                    raw_grams[gram].append(new_ids[term_id])
+        for gram, ids in raw_grams.items():
+            existing = index.gram_postings.get(gram, np.zeros(0, dtype=np.int32))
+            index.gram_postings[gram] = np.concatenate([existing, np.array(ids, dtype=np.int32)])
+
+        index._weigh()
+        return index
+
+    def match_word(self, word, bound=None):
+        """Return [(term_id, distance)] for vocabulary terms within the edit bound"""
+        if bound is None:
+            bound = max_edit_distance(word)
+        grams = trigrams(word)
+        arrays = [self.gram_postings[g] for g in grams if g in self.gram_postings]
+        if not arrays:
+            return []
+
+        overlap = np.bincount(np.concatenate(arrays), minlength=len(self.terms))
+        # Each edit destroys at most three trigrams
+        needed = max(1, len(grams) - 3 * bound)
+        candidates = np.flatnonzero(overlap >= needed)
+        candidates = candidates[np.abs(self.term_lengths[candidates] - len(word)) <= bound]
+        if len(candidates) > FUZZY_CANDIDATES:
+            best = np.argpartition(-overlap[candidates], FUZZY_CANDIDATES - 1)[:FUZZY_CANDIDATES]
+            candidates = candidates[best]
+
+        matches = []
+        for term_id in candidates.tolist():
+            distance = bounded_levenshtein(word, self.terms[term_id], bound)
+            if distance <= bound:
+                matches.append((term_id, distance))
+        return matches
+
+    def search(self, query, languages=None, categories=None, limit=20, max_distance=None):
+        """Return (total, [(phrase_id, score, language)], {word: [(term, distance)]})"""
+        words = list(dict.fromkeys(fuzzy_tokenize(query)))
+        if not words or self.n_phrases == 0:
+            return 0, [], {}
+        # Sound-typed words are often split into syllables ("sah woo bona"),
+        # so the joined form is matched too and counts for every part
+        boosts = {word: 1 for word in words}
+        if len(words) > 1:
+            boosts[''.join(words)] = len(words)
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        matched = {}
+        for word, boost in boosts.items():
+            bound = max_edit_distance(word) if max_distance is None else max_distance
+            matches = self.match_word(word, bound)
+            if not matches:
+                continue
+            matched[word] = sorted(((self.terms[t], d) for t, d in matches), key=lambda m: (m[1], m[0]))
+
+            # Best match per document for this word: closer spelling scores higher
+            word_scores = np.zeros(self.n_docs, dtype=np.float32)
+            for term_id, distance in matches:
+                docs = self.term_docs[self.term_offsets[term_id]:self.term_offsets[term_id + 1]]
+                similarity = 1 - distance / (max(len(word), self.term_lengths[term_id]) + 1)
+                weight = np.float32(boost * similarity * self.term_idf[term_id])
+                word_scores[docs] = np.maximum(word_scores[docs], weight)
+            scores += word_scores
+
+        total, hits = self._rank(scores, languages, categories, limit)
+        return total, hits, matched
+
+
+class _SortedPrefixArray:
+    """Sorted normalized keys with parallel weight and category arrays
+
+    A prefix maps to a contiguous slice found with two bisects; the top-K
+    within the slice is a vectorized partial sort.
+    """
+
+    def __init__(self, entries, category_ids):
+        # entries: {key: (label, weight, ref, set of category ids)}
+        self.keys = sorted(entries)
+        self.labels = [entries[key][0] for key in self.keys]
+        self.refs = np.array([entries[key][2] for key in self.keys], dtype=np.int32)
+        self.weights = np.array([entries[key][1] for key in self.keys], dtype=np.float32)
+        cat_pos = {category_id: i for i, category_id in enumerate(category_ids)}
+        rows, cols = [], []
+        for row, key in enumerate(self.keys):
+            for category_id in entries[key][3]:
+                if category_id in cat_pos:
+                    rows.append(row)
+                    cols.append(cat_pos[category_id])
+        self.categories = np.zeros((len(self.keys), len(cat_pos)), dtype=bool)
+        self.categories[rows, cols] = True
+        self.cat_pos = cat_pos
+
+    def top(self, prefix, limit, category=None, boost=None):
+        """Return row numbers of the best `limit` keys starting with prefix"""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        if lo == hi:
+            return []
+
+        weights = self.weights[lo:hi]
+        if boost is not None:
+            weights = weights + boost(lo, hi)
+        if category is not None:
+            if category not in self.cat_pos:
+                return []
+            weights = np.where(self.categories[lo:hi, self.cat_pos[category]], weights, -np.inf)
+
+        if hi - lo > limit:
+            candidates = np.argpartition(-weights, limit - 1)[:limit]
+        else:
+            candidates = np.arange(hi - lo)
+        candidates = candidates[np.isfinite(weights[candidates])]
+        # Stable sort keeps alphabetical order between equal weights
+        candidates = np.sort(candidates)
+        order = candidates[np.argsort(-weights[candidates], kind='stable')]
+        return [lo + int(i) for i in order]
+
+
+class PrefixIndex:
+    """Per-language autocomplete over single words and whole phrase texts
+
+    Words are ranked by how many phrases use them; phrases are ranked by
+    usage (see PhraseUsage), then alphabetically.
+    """
+
+    # Nested objects that compiled snapshots may store
+    snapshot_types = (_SortedPrefixArray,)
+
+    def __init__(self, catalog):
+        self.phrase_ids = [phrase['id'] for phrase in catalog.phrases]
+        self.words = {}
+        self.phrases = {}
+
+        word_entries = defaultdict(dict)
+        phrase_entries = defaultdict(dict)
+        word_keys = {}
+        for p_idx, phrase in enumerate(catalog.phrases):
+            categories = set(phrase.get('categories', []))
+            for lang, translation in phrase.get('translations', {}).items():
+                text = translation.get('text')
+                if not text:
+                    continue
+
+                key = ' '.join(tokenize(text))
+                if key not in phrase_entries[lang]:
+                    phrase_entries[lang][key] = (text, 0.0, p_idx, categories)
+
+                for word in set(_TOKEN_RE.findall(text)):
+                    word_key = word_keys.get(word)
+                    if word_key is None:
+                        word_key = word_keys[word] = normalize(word)
+                    if word_key.isdigit():
+                        continue
+                    entry = word_entries[lang].get(word_key)
+                    if entry is None:
+                        word_entries[lang][word_key] = [word, 1.0, -1, set(categories)]
+                    else:
+                        entry[1] += 1
+                        entry[3].update(categories)
+
+        for lang in catalog.languages:
+            self.words[lang] = _SortedPrefixArray(word_entries[lang], catalog.category_ids)
+            self.phrases[lang] = _SortedPrefixArray(phrase_entries[lang], catalog.category_ids)
+
+    def complete(self, prefix, language, limit=5, category=None, usage=None):
+        """Return ([word labels], [(phrase_id, text)]) completing the prefix
+
+        usage is an optional per-phrase count array aligned with the catalog.
+        """
+        key = ' '.join(tokenize(prefix))
+        if prefix[-1:].isspace():
+            # "how are " should only complete words after the space
+            key += ' '
+        if not key.strip() or language not in self.words:
+            return [], []
+
+        words = []
+        if ' ' not in key:
+            index = self.words[language]
+            words = [index.labels[row] for row in index.top(key, limit, category)]
+
+        index = self.phrases[language]
+        boost = None
+        if usage is not None:
+            boost = lambda lo, hi: np.log1p(usage[index.refs[lo:hi]])
+        phrases = [
+            (self.phrase_ids[int(index.refs[row])], index.labels[row])
+            for row in index.top(key, limit, category, boost)
+        ]
+        return words, phrases
+
+
+register_index('search', InvertedIndex)
+register_index('fuzzy', TrigramIndex)
+register_index('prefix', PrefixIndex)
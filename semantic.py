@@ -0,0 +1,167 @@
+"""
+SA Health App - Situation Finder
+Offline semantic retrieval: "I need to ask about chest pain" -> phrases.
+
+Every phrase is embedded as a hashed TF-IDF vector over its words in all
+languages, 5-letter word stems, concept tags from concepts.json and
+its categories' names and descriptions. Vectors are L2-normalized rows
+of one float32 NumPy matrix, so a query is a single matrix-vector
+product followed by a partial sort. No network or model download needed.
+"""
+
+import json
+import math
+import os
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from catalog import register_index
+from search import tokenize
+
+# Concept groups; app.py points this at the data directory it serves,
+# and the catalog reloads with rebuilt indexes when the file changes
+CONCEPTS_FILE = os.path.join('data', 'concepts.json')
+
+# Embedding width - memory is n_phrases * SEMANTIC_DIM * 4 bytes
+SEMANTIC_DIM = 256
+
+# Relative weights of the feature kinds
+STEM_WEIGHT = 0.5
+CONCEPT_WEIGHT = 1.5
+CATEGORY_WEIGHT = 0.5
+
+# Results scoring below this cosine similarity are dropped
+MIN_SCORE = 0.05
+
+
+def load_concepts(path=None):
+    """Return ({word: [concept, ...]}, {ignored words}) from `path` or CONCEPTS_FILE"""
+    try:
+        with open(path or CONCEPTS_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}, set()
+
+    word_concepts = {}
+    for concept, words in data.get('concepts', {}).items():
+        for word in words:
+            word_concepts.setdefault(word, []).append(concept)
+    return word_concepts, set(data.get('ignore', []))
+
+
+def _hash_feature(feature, dim):
+    """Deterministic (column, sign) for a feature - same in every process"""
+    h = zlib.crc32(feature.encode('utf-8'))
+    return h % dim, 1.0 if (h >> 31) & 1 else -1.0
+
+
+class SemanticIndex:
+    """Dense phrase embedding matrix with vectorized cosine search"""
+
+    def __init__(self, catalog, dim=SEMANTIC_DIM, concepts_path=None):
+        self.dim = dim
+        self.phrase_ids = [phrase['id'] for phrase in catalog.phrases]
+        self.category_ids = list(catalog.category_ids)
+        self.word_concepts, self.ignore = load_concepts(concepts_path)
+        self._word_features = {}
+
+        category_text = {
+            category['id']: ' '.join([category.get('name', ''), category.get('description', '')])
+            for category in catalog.categories
+        }
+        category_features = {
+            category_id: self._features(tokenize(text), CATEGORY_WEIGHT)
+            for category_id, text in category_text.items()
+        }
+
+        # Raw weighted feature counts per phrase, then document frequencies
+        phrase_features = []
+        df = Counter()
+        for phrase in catalog.phrases:
+            words = []
+            for translation in phrase.get('translations', {}).values():
+                if translation.get('text'):
+                    words.extend(tokenize(translation['text']))
+            features = self._features(words)
+            for category_id in phrase.get('categories', []):
+                for feature, weight in category_features.get(category_id, {}).items():
+                    features[feature] = features.get(feature, 0) + weight
+            phrase_features.append(features)
+            df.update(features.keys())
+
+        n = max(len(catalog.phrases), 1)
+        self.idf = {feature: math.log((1 + n) / (1 + count)) + 1 for feature, count in df.items()}
+
+        self.matrix = np.zeros((len(phrase_features), dim), dtype=np.float32)
+        for row, features in enumerate(phrase_features):
+            self.matrix[row] = self._vector(features)
+
+        # Category membership for filtering
+        cat_pos = {category_id: i for i, category_id in enumerate(self.category_ids)}
+        self.categories = np.zeros((len(self.phrase_ids), len(cat_pos)), dtype=bool)
+        for row, phrase in enumerate(catalog.phrases):
+            for category_id in phrase.get('categories', []):
+                if category_id in cat_pos:
+                    self.categories[row, cat_pos[category_id]] = True
+        self.cat_pos = cat_pos
+
+    def _features(self, words, scale=1.0):
+        """Weighted features for a word list: word, stem and concept tags"""
+        features = {}
+        for word in words:
+            cached = self._word_features.get(word)
+            if cached is None:
+                cached = [('w:' + word, 1.0)]
+                if len(word) > 5:
+                    cached.append(('s:' + word[:5], STEM_WEIGHT))
+                for concept in self.word_concepts.get(word, []):
+                    cached.append(('c:' + concept, CONCEPT_WEIGHT))
+                self._word_features[word] = cached
+            for feature, weight in cached:
+                features[feature] = features.get(feature, 0) + weight * scale
+        return features
+
+    def _vector(self, features):
+        """Sublinear TF-IDF, hashed into dim columns and L2-normalized"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, tf in features.items():
+            idf = self.idf.get(feature)
+            if idf is None:
+                continue
+            column, sign = _hash_feature(feature, self.dim)
+            weight = 1 + math.log(tf) if tf >= 1 else tf
+            vector[column] += sign * weight * idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_query(self, query):
+        words = [word for word in tokenize(query) if word not in self.ignore]
+        return self._vector(self._features(words))
+
+    def search(self, query, categories=None, limit=10):
+        """Return [(phrase_id, cosine score)] best first"""
+        vector = self.embed_query(query)
+        if not vector.any() or len(self.phrase_ids) == 0:
+            return []
+
+        scores = self.matrix @ vector
+        if categories:
+            columns = [self.cat_pos[c] for c in categories if c in self.cat_pos]
+            if not columns:
+                return []
+            scores = np.where(self.categories[:, columns].any(axis=1), scores, -1)
+
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [
+            (self.phrase_ids[i], float(scores[i]))
+            for i in top if scores[i] >= MIN_SCORE
+        ]
+
+
+register_index('semantic', SemanticIndex)
@@ -0,0 +1,187 @@
+"""
+SA Health App - Response Shaping
+Language/field projection of phrases, binary wire formats and a cache
+of rendered API bodies.
+
+The UI only shows the worker's and the patient's language, so clients
+can ask for `langs=en,zu` (and `fields=text,phonetic`) instead of every
+language's text, phonetic guide and TTS respelling.
+"""
+
+from collections import OrderedDict
+import json
+import os
+import threading
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional wire format
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - optional wire format
+    cbor2 = None
+
+from cache import LRUCache
+from catalog import register_index
+
+# Translation fields a client may project to
+TRANSLATION_FIELDS = ('text', 'phonetic', 'tts_pronunciation')
+
+# Distinct (langs, fields) projections kept per catalog
+MAX_PROJECTIONS = 32
+
+# Phrases encoded per chunk when streaming NDJSON
+NDJSON_CHUNK_SIZE = 500
+
+
+class ProjectionError(ValueError):
+    """Raised for unknown languages or fields in a projection"""
+
+
+class PhraseProjector:
+    """Projects phrases to a subset of languages/fields, memoized per projection
+
+    Lives on a Catalog, so cached projections are dropped on reload.
+    Catalogs whose phrases are views (compact or sharded storage) are
+    always projected to plain dicts and never memoized, so the cache
+    does not rebuild the dicts they avoid or keep evicted shards alive.
+    """
+
+    def __init__(self, catalog):
+        self.languages = set(catalog.languages)
+        self.memoize = not catalog.lazy_phrases
+        self._variants = OrderedDict()
+        self._lock = threading.Lock()
+
+    def validate(self, langs, fields):
+        """Return a normalized (langs, fields) key, raising ProjectionError"""
+        for lang in langs or ():
+            if lang not in self.languages:
+                raise ProjectionError(f'Unknown language: {lang}')
+        for field in fields or ():
+            if field not in TRANSLATION_FIELDS:
+                raise ProjectionError(f'Unknown field: {field}')
+        return (tuple(langs) if langs else None, tuple(fields) if fields else None)
+
+    def _variant(self, key):
+        with self._lock:
+            variant = self._variants.get(key)
+            if variant is None:
+                variant = self._variants[key] = {}
+                if len(self._variants) > MAX_PROJECTIONS:
+                    self._variants.popitem(last=False)
+            else:
+                self._variants.move_to_end(key)
+            return variant
+
+    def project(self, phrases, langs=None, fields=None):
+        """Return projected copies of phrases (the originals when nothing is projected)"""
+        key = self.validate(langs, fields)
+        if key == (None, None) and self.memoize:
+            return phrases
+
+        langs, fields = key
+        variant = self._variant(key) if self.memoize else {}
+        projected = []
+        for phrase in phrases:
+            item = variant.get(phrase['id'])
+            if item is None:
+                translations = phrase.get('translations', {})
+                selected = langs if langs is not None else translations.keys()
+                item = {
+                    'id': phrase['id'],
+                    'categories': phrase.get('categories', []),
+                    'translations': {
+                        lang: (
+                            {f: translations[lang][f] for f in fields if f in translations[lang]}
+                            if fields is not None else translations[lang]
+                        )
+                        for lang in selected if lang in translations
+                    }
+                }
+                variant[phrase['id']] = item
+            projected.append(item)
+        return projected
+
+
+# Binary response formats offered through the Accept header, by mimetype
+WIRE_FORMATS = {}
+if msgpack is not None:
+    WIRE_FORMATS['application/msgpack'] = lambda data: msgpack.packb(data, use_bin_type=True)
+    WIRE_FORMATS['application/x-msgpack'] = WIRE_FORMATS['application/msgpack']
+if cbor2 is not None:
+    WIRE_FORMATS['application/cbor'] = cbor2.dumps
+
+
+def ndjson_chunks(phrases, project, chunk_size=NDJSON_CHUNK_SIZE):
+    """Yield newline-delimited JSON, one phrase per line, a chunk at a time
+
+    Only one chunk is projected and encoded at once, so memory use does
+    not grow with the number of phrases.
+    """
+    for start in range(0, len(phrases), chunk_size):
+        chunk = project(phrases[start:start + chunk_size])
+        yield ''.join(
+            json.dumps(phrase, ensure_ascii=False, separators=(',', ':')) + '\n' for phrase in chunk
+        ).encode('utf-8')
+
+
+class BodyCache(LRUCache):
+    """LRU cache of rendered response bodies; keys include the catalog digest"""
+
+
+class PrebuiltBodies:
+    """Response bodies rendered ahead of time by the build pipeline (see pipeline.py)
+
+    `index.json` in the directory maps body cache keys, minus their
+    catalog prefix, to files. Bodies are only served to a catalog with
+    the digest they were rendered from, so a reload never serves stale
+    ones; they carry nothing specific to a process, so every worker
+    serves them whatever its reload count.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.served = 0
+        self._index = {'digest': None, 'bodies': {}}
+
+    def _read_index(self, digest):
+        try:
+            with open(os.path.join(self.directory, 'index.json'), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+        if not isinstance(index, dict) or index.get('digest') != digest:
+            # Remember the miss so requests don't keep reading the index
+            return {'digest': digest, 'bodies': {}}
+        return index
+
+    def get(self, catalog, key):
+        """The prebuilt body for `key`, or None"""
+        index = self._index
+        if index['digest'] != catalog.digest:
+            index = self._index = self._read_index(catalog.digest)
+        filename = index['bodies'].get(key)
+        if filename is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, filename), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        self.served += 1
+        return body
+
+    def stats(self):
+        index = self._index
+        return {
+            'digest': index['digest'] if index['bodies'] else None,
+            'bodies': len(index['bodies']),
+            'served': self.served
+        }
+
+
+# Holds a lock and per-request memos, and is cheap to build, so not snapshotted
+register_index('projection', PhraseProjector, snapshot=False)
@@ -0,0 +1,305 @@
+"""
+SA Health App - Per-Language Catalog Shards
+Optional storage backend: phrases.json is split into a core file (phrase
+IDs, categories, content hashes and which languages each phrase has)
+plus one shard per language holding the translations.
+
+Layout of the shard directory:
+    core.json              digest, languages, categories, one entry per phrase
+    <digest>/<lang>.json   digest and {phrase id: translation} for one language
+
+Each catalog's shards get their own directory, renamed into place
+before core.json points at it, so a catalog still being served (by
+another worker, or until a reload finishes) keeps reading its own
+shards. The shards of the last KEEP_VERSIONS catalogs are kept.
+
+ShardedCatalog has the same interface as catalog.Catalog, but each
+phrase's 'translations' is a read-only mapping that loads a language's
+shard the first time one of its translations is read. With a limit on
+loaded languages, the least recently used shard is dropped when another
+one is needed. Indexes are built from every shard at load time; the
+shards are released again afterwards, so a worker only keeps the
+languages its clients actually ask for.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+from catalog import Catalog, CatalogStore, content_hash, temp_path, validate_catalog_data
+
+CORE_FILE = 'core.json'
+# Shard directories kept for catalogs other workers may still be serving
+KEEP_VERSIONS = 3
+
+
+class ShardError(ValueError):
+    """Raised when a language shard is missing or belongs to another catalog version"""
+
+
+def _write_json(path, data):
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def split_json(json_path, shard_dir):
+    """Validate phrases.json and write the core file and language shards
+
+    Returns the digest of the JSON. Shards are written before the core
+    file, and shards of older catalogs are pruned.
+    """
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    data = validate_catalog_data(json.loads(raw))
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    write_shards(data, digest, shard_dir)
+    return digest
+
+
+def write_shards(data, digest, shard_dir):
+    """Write the core file and language shards for validated catalog data"""
+    by_language = {}
+    phrases = []
+    for phrase in data['phrases']:
+        phrases.append({
+            'phrase': {key: value for key, value in phrase.items() if key != 'translations'},
+            'languages': list(phrase['translations']),
+            'hash': content_hash(phrase)
+        })
+        for language, translation in phrase['translations'].items():
+            by_language.setdefault(language, {})[phrase['id']] = translation
+
+    os.makedirs(shard_dir, exist_ok=True)
+    version_dir = os.path.join(shard_dir, digest)
+    if not os.path.isdir(version_dir):
+        tmp_dir = tempfile.mkdtemp(dir=shard_dir, prefix=f'.{digest}.', suffix='.tmp')
+        try:
+            os.chmod(tmp_dir, 0o755)
+            for language, translations in by_language.items():
+                _write_json(os.path.join(tmp_dir, f'{language}.json'),
+                            {'digest': digest, 'language': language, 'translations': translations})
+            try:
+                os.replace(tmp_dir, version_dir)
+            except OSError:
+                # Another worker published the same digest first; its shards are identical
+                if not os.path.isdir(version_dir):
+                    raise
+        finally:
+            if os.path.isdir(tmp_dir):
+                shutil.rmtree(tmp_dir)
+    _write_json(os.path.join(shard_dir, CORE_FILE), {
+        'digest': digest,
+        'languages': list(by_language),
+        'categories': data['categories'],
+        'phrases': phrases
+    })
+    prune_shards(shard_dir, digest)
+
+
+def prune_shards(shard_dir, current, keep=KEEP_VERSIONS):
+    """Remove all but the `keep` newest shard directories, never the current one"""
+    versions = [name for name in os.listdir(shard_dir)
+                if not name.startswith('.') and os.path.isdir(os.path.join(shard_dir, name))]
+    versions.sort(key=lambda name: os.path.getmtime(os.path.join(shard_dir, name)), reverse=True)
+    for name in versions[keep:]:
+        if name != current:
+            shutil.rmtree(os.path.join(shard_dir, name), ignore_errors=True)
+    # Shards written next to core.json by earlier releases
+    for name in os.listdir(shard_dir):
+        if name.endswith('.json') and name != CORE_FILE:
+            os.remove(os.path.join(shard_dir, name))
+
+
+class LanguageShards:
+    """Loads language shards on demand, keeping at most `max_loaded` (0 = no limit)"""
+
+    def __init__(self, shard_dir, digest, max_loaded=0):
+        self.shard_dir = shard_dir
+        self.digest = digest
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._scans = 0
+        self._before_scan = set()
+        self.loads = 0
+        self.evictions = 0
+
+    def _read(self, language):
+        path = os.path.join(self.shard_dir, self.digest, f'{language}.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                shard = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ShardError(f"Cannot load '{language}' shard: {e}")
+        if shard.get('digest') != self.digest:
+            raise ShardError(f"The '{language}' shard belongs to another catalog version")
+        return shard['translations']
+
+    def get(self, language):
+        """{phrase id: translation} for one language, loading its shard if needed"""
+        with self._lock:
+            translations = self._loaded.get(language)
+            if translations is not None:
+                self._loaded.move_to_end(language)
+                return translations
+
+        # Read outside the lock so other languages stay available meanwhile
+        translations = self._read(language)
+        with self._lock:
+            self._loaded[language] = translations
+            self.loads += 1
+            self._evict()
+        return translations
+
+    def _evict(self):
+        if self._scans or not self.max_loaded:
+            return
+        while len(self._loaded) > self.max_loaded:
+            self._loaded.popitem(last=False)
+            self.evictions += 1
+
+    @contextmanager
+    def scan(self):
+        """Allow every shard to load inside the block, dropping the extra ones after
+
+        Used while building indexes, which read every translation once.
+        """
+        with self._lock:
+            if not self._scans:
+                self._before_scan = set(self._loaded)
+            self._scans += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._scans -= 1
+                if not self._scans:
+                    for language in [l for l in self._loaded if l not in self._before_scan]:
+                        del self._loaded[language]
+                    self._evict()
+
+    def loaded(self):
+        with self._lock:
+            return list(self._loaded)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': list(self._loaded),
+                'max_loaded': self.max_loaded,
+                'loads': self.loads,
+                'evictions': self.evictions
+            }
+
+
+class LazyTranslations(Mapping):
+    """A phrase's translations, read from the language shards on access
+
+    Listing and membership tests use the languages recorded in the core
+    file, so they never load a shard.
+    """
+
+    __slots__ = ('_shards', '_phrase_id', '_languages')
+
+    def __init__(self, shards, phrase_id, languages):
+        self._shards = shards
+        self._phrase_id = phrase_id
+        self._languages = languages
+
+    def __getitem__(self, language):
+        if language not in self._languages:
+            raise KeyError(language)
+        return self._shards.get(language)[self._phrase_id]
+
+    def __contains__(self, language):
+        return language in self._languages
+
+    def __iter__(self):
+        return iter(self._languages)
+
+    def __len__(self):
+        return len(self._languages)
+
+    def __repr__(self):
+        return f'LazyTranslations({self._phrase_id!r}, {list(self._languages)!r})'
+
+
+class ShardedCatalog(Catalog):
+    """A Catalog whose translations live in per-language shards"""
+
+    lazy_phrases = True
+
+    def __init__(self, shard_dir, core, max_languages=0, version=1):
+        self.shards = LanguageShards(shard_dir, core['digest'], max_languages)
+        languages = {}
+        phrases = []
+        for entry in core['phrases']:
+            phrase = dict(entry['phrase'])
+            key = tuple(entry['languages'])
+            phrase['translations'] = LazyTranslations(self.shards, phrase['id'], languages.setdefault(key, key))
+            phrases.append(phrase)
+        super().__init__({'categories': core['categories'], 'phrases': phrases},
+                         version=version, digest=core['digest'], source='shards')
+        # Content hashes are computed when splitting, so diffs never load shards
+        self._phrase_hashes = {entry['phrase']['id']: entry['hash'] for entry in core['phrases']}
+
+    def build_indexes(self):
+        with self.shards.scan():
+            return super().build_indexes()
+
+    def index(self, name):
+        if name in self.indexes:
+            return self.indexes[name]
+        with self.shards.scan():
+            return super().index(name)
+
+
+class ShardedCatalogStore(CatalogStore):
+    """CatalogStore backed by per-language shards
+
+    The JSON file stays the source of truth: when it is newer than the
+    core file (or the shards are missing) it is split again on reload.
+    If that split fails the current shards keep being served.
+    """
+
+    def __init__(self, json_path, shard_dir, max_languages=0, history_size=50, index_files=()):
+        super().__init__(json_path, loader=None, history_size=history_size, index_files=index_files)
+        self.shard_dir = shard_dir
+        self.max_languages = max_languages
+
+    def _core_mtime(self):
+        try:
+            return os.stat(os.path.join(self.shard_dir, CORE_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _file_mtime(self):
+        return (self._json_mtime(), self._core_mtime())
+
+    def watched_paths(self):
+        return [self.path, os.path.join(self.shard_dir, CORE_FILE)]
+
+    def _read_source(self):
+        lock_path = f'{os.path.normpath(self.shard_dir)}.lock'
+        os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+        self._import_if_stale(self._core_mtime, lambda: split_json(self.path, self.shard_dir), lock_path)
+
+        with open(os.path.join(self.shard_dir, CORE_FILE), 'r', encoding='utf-8') as f:
+            core = json.load(f)
+
+        def load(version, digest):
+            return ShardedCatalog(self.shard_dir, core, self.max_languages, version=version).build_indexes()
+
+        return core['digest'], load
@@ -0,0 +1,451 @@
+"""
+SA Health App - Shared Caches
+Caches of audio clips and rendered bodies shared by every node of a
+multi-node deployment, so a clip synthesized (or a body rendered) by one
+node is served by all of them:
+
+    FileCache   - one file per entry in a directory, e.g. on a shared mount
+    RedisCache  - a key-value server speaking the Redis protocol (RESP)
+
+Both expire entries after a TTL and skip values over a size limit;
+FileCache also evicts its oldest entries to stay under a total size,
+while a Redis server is bounded by its own maxmemory policy. fill()
+protects against stampedes: the first node to miss a key takes a lock
+entry next to it and computes the value, the others wait for it to
+appear instead of computing it too.
+
+A shared cache that fails (server down, disk full) behaves as a miss, so
+requests fall back to computing the value. TieredCache keeps a node's
+in-memory cache in front of the shared one.
+"""
+
+import hashlib
+import os
+import socket
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+
+from cache import CacheBackend
+
+
+class SharedCacheError(OSError):
+    """Raised when a shared cache server rejects a command"""
+
+
+class SharedCache(CacheBackend):
+    """Base of the shared caches: counting, error handling and stampede protection
+
+    Subclasses implement _read, _write, _remove, _exists, _acquire,
+    _release and _locked, raising OSError when the cache is unavailable.
+    """
+
+    def __init__(self, ttl=0, max_entry_bytes=8 * 1024 * 1024, lock_timeout=10.0, poll_interval=0.05):
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.computed = 0
+        self.waited = 0
+        self.errors = 0
+        # Threads of one process wait here rather than on the shared lock
+        self._stripes = [threading.Lock() for _ in range(64)]
+
+    def _safely(self, operation, key, *args, default=None):
+        try:
+            return operation(key, *args)
+        except OSError:
+            self.errors += 1
+            return default
+
+    def get(self, key):
+        value = self._safely(self._read, key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if len(value) > self.max_entry_bytes:
+            return
+        if self._safely(self._write, key, value, default=False) is not False:
+            self.stores += 1
+
+    def delete(self, key):
+        return self._safely(self._remove, key, default=False)
+
+    def __contains__(self, key):
+        return self._safely(self._exists, key, default=False)
+
+    def _wait(self, key):
+        """The value another node is computing, or None if it gave up or took too long"""
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = self._safely(self._read, key)
+            if value is not None:
+                return value
+            if not self._safely(self._locked, key, default=False):
+                return None
+        return None
+
+    def fill(self, key, compute):
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._stripes[hash(key) % len(self._stripes)]:
+            # '' when the lock could not be taken because the cache is down
+            token = self._safely(self._acquire, key, default='')
+            try:
+                if token is None:
+                    value = self._wait(key)
+                    if value is not None:
+                        self.waited += 1
+                        return value
+                    # The other node failed or is stuck - compute here rather than fail
+                else:
+                    # Filled between our miss and the lock (or by a thread of ours)
+                    value = self._safely(self._read, key)
+                    if value is not None:
+                        return value
+                value = compute()
+                self.computed += 1
+                self.put(key, value)
+                return value
+            finally:
+                if token:
+                    self._safely(self._release, key, token)
+
+    def stats(self):
+        return {
+            'ttl': self.ttl,
+            'max_entry_bytes': self.max_entry_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'computed': self.computed,
+            'waited': self.waited,
+            'errors': self.errors
+        }
+
+
+class FileCache(SharedCache):
+    """Entries as files named by the hash of their key, written atomically
+
+    An entry expires `ttl` seconds after it was written. Every time about
+    a tenth of `max_bytes` has been written, the directory is scanned and
+    the oldest entries removed until it is back under 90% of `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes=1024 * 1024 * 1024, **options):
+        super().__init__(**options)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evicted = 0
+        self._written = 0
+        self._bytes = None
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _expired(self, mtime):
+        return self.ttl and time.time() - mtime > self.ttl
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                if not self._expired(os.fstat(f.fileno()).st_mtime):
+                    return f.read()
+        except FileNotFoundError:
+            return None
+        self._remove(key)
+        return None
+
+    def _write(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+        self._written += len(value)
+        if self._written > self.max_bytes // 10:
+            self.evict()
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _exists(self, key):
+        try:
+            return not self._expired(os.stat(self._path(key)).st_mtime)
+        except FileNotFoundError:
+            return False
+
+    def _acquire(self, key):
+        lock_path = self._path(key) + '.lock'
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        token = os.urandom(8).hex()
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                if self._locked(key):
+                    return None
+                # Left behind by a node that died while computing
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(token)
+            return token
+        return None
+
+    def _release(self, key, token):
+        lock_path = self._path(key) + '.lock'
+        try:
+            with open(lock_path, 'r') as f:
+                if f.read() == token:
+                    os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+
+    def _locked(self, key):
+        try:
+            return time.time() - os.stat(self._path(key) + '.lock').st_mtime < self.lock_timeout
+        except FileNotFoundError:
+            return False
+
+    def evict(self):
+        """Remove expired entries, then the oldest ones while over 90% of max_bytes"""
+        self._written = 0
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if '.' in name:
+                    continue  # locks and partial writes
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if total <= self.max_bytes * 0.9 and not self._expired(mtime):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evicted += 1
+        self._bytes = total
+
+    def stats(self):
+        return dict(super().stats(), backend='file', directory=self.directory,
+                    max_bytes=self.max_bytes, bytes=self._bytes, evicted=self.evicted)
+
+
+class RedisCache(SharedCache):
+    """Entries in a Redis (or Redis-protocol) server, one connection per thread
+
+    After a connection error the server is not contacted again for
+    `retry_interval` seconds, so an outage costs one timeout, not one per
+    request.
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, prefix='',
+                 timeout=1.0, retry_interval=5.0, **options):
+        super().__init__(**options)
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._down_until = 0
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._local.sock = sock
+        self._local.reader = sock.makefile('rb')
+        # Connections are never shared with a forked child
+        self._local.pid = os.getpid()
+        if self.password:
+            self._send('AUTH', self.password)
+        if self.db:
+            self._send('SELECT', self.db)
+
+    def _disconnect(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            try:
+                self._local.reader.close()
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    def _send(self, *args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            elif isinstance(arg, int):
+                arg = str(arg).encode('ascii')
+            parts.append(b'$%d\r\n' % len(arg))
+            parts.append(arg)
+            parts.append(b'\r\n')
+        self._local.sock.sendall(b''.join(parts))
+        return self._reply()
+
+    def _reply(self):
+        reader = self._local.reader
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('Connection closed by the cache server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode('utf-8')
+        if kind == b'-':
+            raise SharedCacheError(rest.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError('Connection closed by the cache server')
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._reply() for _ in range(length)]
+        raise SharedCacheError(f'Unexpected reply from the cache server: {line[:40]!r}')
+
+    def command(self, *args):
+        """Run one command and return its reply; raises OSError if the server is unavailable"""
+        if time.monotonic() < self._down_until:
+            raise ConnectionError(f'Cache server {self.host}:{self.port} unavailable')
+        try:
+            if getattr(self._local, 'sock', None) is None or self._local.pid != os.getpid():
+                self._connect()
+            return self._send(*args)
+        except SharedCacheError:
+            raise
+        except OSError:
+            self._disconnect()
+            self._down_until = time.monotonic() + self.retry_interval
+            raise
+
+    def _read(self, key):
+        return self.command('GET', self.prefix + key)
+
+    def _write(self, key, value):
+        if self.ttl:
+            self.command('SET', self.prefix + key, bytes(value), 'PX', int(self.ttl * 1000))
+        else:
+            self.command('SET', self.prefix + key, bytes(value))
+
+    def _remove(self, key):
+        return self.command('DEL', self.prefix + key) > 0
+
+    def _exists(self, key):
+        return self.command('EXISTS', self.prefix + key) > 0
+
+    def _acquire(self, key):
+        token = os.urandom(8).hex()
+        reply = self.command('SET', f'{self.prefix}lock:{key}', token, 'NX', 'PX', int(self.lock_timeout * 1000))
+        return token if reply == 'OK' else None
+
+    def _release(self, key, token):
+        # Not atomic (that takes a server-side script), but the lock expires
+        # on its own, so the worst case is one extra computation
+        lock_key = f'{self.prefix}lock:{key}'
+        if self.command('GET', lock_key) == token.encode('ascii'):
+            self.command('DEL', lock_key)
+
+    def _locked(self, key):
+        return self.command('EXISTS', f'{self.prefix}lock:{key}') > 0
+
+    def stats(self):
+        return dict(super().stats(), backend='redis', server=f'{self.host}:{self.port}/{self.db}',
+                    available=time.monotonic() >= self._down_until)
+
+
+class TieredCache(CacheBackend):
+    """A node-local cache in front of a shared one"""
+
+    def __init__(self, local, shared):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.put(key, value)
+        return value
+
+    def put(self, key, value):
+        self.local.put(key, value)
+        self.shared.put(key, value)
+
+    def delete(self, key):
+        removed = self.local.delete(key)
+        return self.shared.delete(key) or removed
+
+    def __contains__(self, key):
+        return key in self.local or key in self.shared
+
+    def __len__(self):
+        return len(self.local)
+
+    def fill(self, key, compute):
+        value = self.local.get(key)
+        if value is None:
+            value = self.shared.fill(key, compute)
+            self.local.put(key, value)
+        return value
+
+    def stats(self):
+        return dict(self.local.stats(), shared=self.shared.stats())
+
+
+def open_shared_cache(url, namespace, max_bytes=1024 * 1024 * 1024, **options):
+    """The shared cache at `url` (redis://[:password@]host[:port][/db] or a directory path)
+
+    `namespace` keeps the entries of different caches apart: a key prefix
+    on a Redis server, a subdirectory on disk.
+    """
+    parts = urlsplit(url)
+    if parts.scheme == 'redis':
+        return RedisCache(host=parts.hostname or 'localhost', port=parts.port or 6379,
+                          db=int(parts.path.strip('/') or 0),
+                          password=unquote(parts.password) if parts.password else None,
+                          prefix=f'sa-health:{namespace}:', **options)
+    if parts.scheme == 'file':
+        return FileCache(os.path.join(unquote(parts.path), namespace), max_bytes=max_bytes, **options)
+    if not parts.scheme or len(parts.scheme) == 1:
+        # A plain path (or a Windows drive letter)
+        return FileCache(os.path.join(url, namespace),
+                         max_bytes=max_bytes, **options)
+    raise ValueError(f'Unsupported shared cache URL: {url}')
@@ -0,0 +1,229 @@
+"""
+SA Health App - Compiled Catalog Snapshots
+Compiles phrases.json into a validated binary file holding the data and
+every prebuilt index, so workers start without parsing JSON or building
+indexes.
+
+File layout:
+    MAGIC | header length (4 bytes, big-endian) | header | body
+
+The header and body are MessagePack. NumPy arrays, sets, tuples and
+the registered index classes are stored as extension types. Only index
+classes registered with the catalog (and the nested types they declare
+in `snapshot_types`) can be restored, so loading never runs arbitrary
+code the way unpickling would. The body carries a SHA-256 checksum in
+the header, and the header records the digest of the JSON it was
+compiled from.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - snapshots need msgpack
+    msgpack = None
+
+import catalog as catalog_module
+from catalog import Catalog, validate_catalog_data
+
+MAGIC = b'SAHSNAP\x00'
+FORMAT_VERSION = 2
+
+_EXT_ARRAY = 1
+_EXT_TUPLE = 2
+_EXT_SET = 3
+_EXT_OBJECT = 4
+
+
+class SnapshotError(ValueError):
+    """Raised for missing, corrupt or incompatible snapshot files"""
+
+
+def _snapshot_types():
+    """{'module.Class': class} for every class a snapshot may contain"""
+    types = {}
+    pending = [catalog_module._index_builders[name] for name in catalog_module._snapshot_indexes]
+    while pending:
+        cls = pending.pop()
+        name = f'{cls.__module__}.{cls.__qualname__}'
+        if name not in types:
+            types[name] = cls
+            pending.extend(getattr(cls, 'snapshot_types', ()))
+    return types
+
+
+def _packer(types):
+    names = {cls: name for name, cls in types.items()}
+
+    def default(obj):
+        if isinstance(obj, np.ndarray):
+            array = np.ascontiguousarray(obj)
+            return msgpack.ExtType(_EXT_ARRAY, pack([array.dtype.str, list(array.shape), array.tobytes()]))
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, tuple):
+            return msgpack.ExtType(_EXT_TUPLE, pack(list(obj)))
+        if isinstance(obj, (set, frozenset)):
+            return msgpack.ExtType(_EXT_SET, pack(sorted(obj, key=repr)))
+        if isinstance(obj, dict):
+            # defaultdict, Counter, OrderedDict...
+            return dict(obj)
+        if isinstance(obj, list):
+            return list(obj)
+        name = names.get(type(obj))
+        if name is None:
+            raise TypeError(f'Cannot snapshot {type(obj).__name__} objects')
+        custom = type(obj).__getstate__ is not object.__getstate__
+        state = obj.__getstate__() if custom else obj.__dict__
+        return msgpack.ExtType(_EXT_OBJECT, pack([name, state]))
+
+    def pack(obj):
+        return msgpack.packb(obj, use_bin_type=True, strict_types=True, default=default)
+
+    return pack
+
+
+def _unpacker(types):
+    def ext_hook(code, data):
+        if code == _EXT_ARRAY:
+            dtype, shape, buffer = unpack(data)
+            # Read-only view over the file bytes - no copy
+            return np.frombuffer(buffer, dtype=np.dtype(dtype)).reshape(shape)
+        if code == _EXT_TUPLE:
+            return tuple(unpack(data))
+        if code == _EXT_SET:
+            return set(unpack(data))
+        if code == _EXT_OBJECT:
+            name, state = unpack(data)
+            cls = types.get(name)
+            if cls is None:
+                raise SnapshotError(f'Snapshot contains unknown type {name}')
+            obj = cls.__new__(cls)
+            if hasattr(cls, '__setstate__'):
+                obj.__setstate__(state)
+            else:
+                obj.__dict__.update(state)
+            return obj
+        return msgpack.ExtType(code, data)
+
+    def unpack(data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False, ext_hook=ext_hook)
+
+    return unpack
+
+
+def compile_snapshot(json_path, snapshot_path):
+    """Validate phrases.json, build every index and write the snapshot
+
+    Returns the snapshot header. The file is written next to its final
+    path and renamed into place, so readers never see a partial file.
+    """
+    if msgpack is None:
+        raise SnapshotError('Compiling snapshots requires the msgpack package')
+
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    data = validate_catalog_data(json.loads(raw))
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+
+    catalog = Catalog(data, digest=digest).build_indexes()
+    return write_snapshot(catalog, os.stat(json_path).st_mtime_ns, snapshot_path)
+
+
+def write_snapshot(catalog, source_mtime_ns, snapshot_path):
+    """Write the snapshot of an indexed Catalog built from validated data"""
+    if msgpack is None:
+        raise SnapshotError('Compiling snapshots requires the msgpack package')
+
+    data = catalog.data
+    indexes = {name: catalog.index(name) for name in sorted(catalog_module._snapshot_indexes)}
+    body = _packer(_snapshot_types())({'data': data, 'indexes': indexes})
+    header = {
+        'format': FORMAT_VERSION,
+        'digest': catalog.digest,
+        'source_mtime_ns': source_mtime_ns,
+        'created': time.time(),
+        'phrases': len(catalog.phrases),
+        'indexes': sorted(indexes),
+        'body_sha256': hashlib.sha256(body).hexdigest()
+    }
+    header_bytes = msgpack.packb(header, use_bin_type=True)
+
+    tmp_path = f'{snapshot_path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('>I', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(body)
+    os.replace(tmp_path, snapshot_path)
+    return header
+
+
+class SnapshotFile:
+    """A compiled snapshot on disk, used by CatalogStore in place of the JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def read_header(self):
+        """Return (header, body offset), raising SnapshotError if invalid"""
+        if msgpack is None:
+            raise SnapshotError('Loading snapshots requires the msgpack package')
+        try:
+            with open(self.path, 'rb') as f:
+                prefix = f.read(len(MAGIC) + 4)
+                if len(prefix) < len(MAGIC) + 4 or prefix[:len(MAGIC)] != MAGIC:
+                    raise SnapshotError(f'{self.path} is not a catalog snapshot')
+                (length,) = struct.unpack('>I', prefix[len(MAGIC):])
+                header = msgpack.unpackb(f.read(length), raw=False)
+        except OSError as e:
+            raise SnapshotError(f'Cannot read snapshot: {e}')
+        except (ValueError, TypeError, struct.error) as e:
+            raise SnapshotError(f'Corrupt snapshot header: {e}')
+        if not isinstance(header, dict) or header.get('format') != FORMAT_VERSION:
+            raise SnapshotError('Snapshot format version mismatch - recompile it')
+        return header, len(MAGIC) + 4 + length
+
+    def fresh_header(self, json_mtime):
+        """Header of the snapshot if it exists, is valid and is not older than the JSON file"""
+        snapshot_mtime = self.mtime()
+        if snapshot_mtime is None or (json_mtime is not None and snapshot_mtime < json_mtime):
+            return None
+        try:
+            header, _ = self.read_header()
+        except SnapshotError:
+            return None
+        return header
+
+    def load(self, header=None):
+        """Return (data, {index name: prebuilt index}), raising SnapshotError if corrupt"""
+        current, offset = self.read_header()
+        if header is not None and current != header:
+            raise SnapshotError('Snapshot changed while loading')
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            body = f.read()
+        if hashlib.sha256(body).hexdigest() != current['body_sha256']:
+            raise SnapshotError('Snapshot checksum mismatch')
+
+        types = _snapshot_types()
+        try:
+            payload = _unpacker(types)(body)
+            data, indexes = payload['data'], payload['indexes']
+        except (ValueError, TypeError, KeyError) as e:
+            raise SnapshotError(f'Corrupt snapshot body: {e}')
+        # Indexes registered since the snapshot was compiled are built on load
+        indexes = {name: index for name, index in indexes.items() if name in catalog_module._snapshot_indexes}
+        return data, indexes
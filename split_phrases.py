@@ -0,0 +1,28 @@
+"""
+Split phrases.json into per-language shards
+Validates the JSON and (re)writes the core file and language shards used
+when the app runs with CATALOG_BACKEND=sharded. The app also re-splits on
+its own when the JSON is newer than the shards.
+
+Usage: python split_phrases.py [phrases.json] [shard directory]
+"""
+
+import sys
+import time
+
+import app
+from catalog import CatalogValidationError
+from shards import split_json
+
+if __name__ == '__main__':
+    json_path = sys.argv[1] if len(sys.argv) > 1 else app.DATA_FILE
+    shard_dir = sys.argv[2] if len(sys.argv) > 2 else app.CATALOG_SHARDS
+
+    start = time.perf_counter()
+    try:
+        digest = split_json(json_path, shard_dir)
+    except CatalogValidationError as e:
+        print(f"[FAIL] {e}")
+        sys.exit(1)
+
+    print(f"[OK] Split {json_path} into {shard_dir} in {time.perf_counter() - start:.1f}s (digest {digest})")
@@ -0,0 +1,471 @@
+"""
+SA Health App - SQLite Phrase Store
+Optional storage backend: phrases.json is imported into an indexed
+SQLite database and the app reads from it instead of holding every
+phrase in each worker's heap.
+
+Tables:
+    phrases            position (primary key), id, content hash, phrase JSON
+    translations       one row per (phrase, language) with text/phonetic/respelling
+    phrase_categories  category membership, keyed by (category, phrase)
+    categories         position, id, category JSON
+    translations_fts   FTS5 full-text index over text and phonetic guide
+    meta               source digest, language order, format version
+
+SQLiteCatalog has the same interface as catalog.Catalog. Lookups,
+category lists, paging, category expressions and keyword search run as
+indexed SQL. Fuzzy, autocomplete and semantic indexes are built from
+the database the first time they are used.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from catalog import Catalog, CatalogStore, _index_builders, content_hash, temp_path, validate_catalog_data
+from category_query import CategoryQueryError, parse
+from search import SEARCH_FIELDS, tokenize
+
+FORMAT_VERSION = 1
+
+# Phrases decoded per query when iterating a lazy phrase list
+ROW_CHUNK_SIZE = 1000
+
+# Bound parameters per IN (...) list, below SQLite's variable limit
+MAX_SQL_VARIABLES = 900
+
+# Nested subqueries per category expression, within SQLite's parser stack
+MAX_SUBQUERY_DEPTH = 8
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE categories (
+    position INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    body TEXT NOT NULL
+);
+CREATE TABLE phrases (
+    position INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    hash TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE TABLE translations (
+    phrase_position INTEGER NOT NULL REFERENCES phrases(position),
+    language TEXT NOT NULL,
+    text TEXT NOT NULL,
+    phonetic TEXT,
+    tts_pronunciation TEXT,
+    PRIMARY KEY (phrase_position, language)
+) WITHOUT ROWID;
+CREATE INDEX translations_by_language ON translations (language, phrase_position);
+CREATE TABLE phrase_categories (
+    category_id TEXT NOT NULL,
+    phrase_position INTEGER NOT NULL REFERENCES phrases(position),
+    PRIMARY KEY (category_id, phrase_position)
+) WITHOUT ROWID;
+CREATE INDEX phrase_categories_by_phrase ON phrase_categories (phrase_position);
+CREATE VIRTUAL TABLE translations_fts USING fts5(
+    content,
+    language UNINDEXED,
+    phrase_position UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _encode(item):
+    return json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+
+
+def import_json(json_path, db_path):
+    """Validate phrases.json and (re)build the SQLite database from it
+
+    The database is written to a temporary file and renamed into place,
+    so running workers keep reading the old file until they reload.
+    """
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    data = validate_catalog_data(json.loads(raw))
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    write_database(data, digest, db_path)
+    return digest
+
+
+def write_database(data, digest, db_path):
+    """Write validated catalog data to a SQLite database, replacing db_path atomically"""
+    languages = []
+    for phrase in data['phrases']:
+        for language in phrase['translations']:
+            if language not in languages:
+                languages.append(language)
+
+    tmp_path = temp_path(db_path)
+    try:
+        _write_tables(data, digest, languages, tmp_path)
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _write_tables(data, digest, languages, path):
+    db = sqlite3.connect(path)
+    try:
+        db.executescript(SCHEMA)
+        with db:
+            db.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('format', str(FORMAT_VERSION)),
+                ('digest', digest),
+                ('languages', json.dumps(languages)),
+                ('imported_at', str(time.time()))
+            ])
+            db.executemany('INSERT INTO categories VALUES (?, ?, ?)', (
+                (position, category['id'], _encode(category))
+                for position, category in enumerate(data['categories'])
+            ))
+            db.executemany('INSERT INTO phrases VALUES (?, ?, ?, ?)', (
+                (position, phrase['id'], content_hash(phrase), _encode(phrase))
+                for position, phrase in enumerate(data['phrases'])
+            ))
+            db.executemany('INSERT INTO translations VALUES (?, ?, ?, ?, ?)', (
+                (position, language, translation['text'],
+                 translation.get('phonetic'), translation.get('tts_pronunciation'))
+                for position, phrase in enumerate(data['phrases'])
+                for language, translation in phrase['translations'].items()
+            ))
+            db.executemany('INSERT OR IGNORE INTO phrase_categories VALUES (?, ?)', (
+                (category_id, position)
+                for position, phrase in enumerate(data['phrases'])
+                for category_id in phrase.get('categories', [])
+            ))
+            db.executemany('INSERT INTO translations_fts VALUES (?, ?, ?)', (
+                (' '.join(translation[field] for field in SEARCH_FIELDS if translation.get(field)),
+                 language, position)
+                for position, phrase in enumerate(data['phrases'])
+                for language, translation in phrase['translations'].items()
+            ))
+        db.execute('ANALYZE')
+    finally:
+        db.close()
+
+
+class PhraseRows:
+    """Lazy, read-only list of phrases selected by SQL, ordered by catalog position
+
+    Supports len(), indexing, slicing and iteration; rows are decoded a
+    chunk at a time, so walking the whole list never holds it all.
+    """
+
+    def __init__(self, catalog, category_id=None):
+        self.catalog = catalog
+        self.category_id = category_id
+        self._length = None
+
+    def __len__(self):
+        if self._length is None:
+            if self.category_id is None:
+                sql, params = 'SELECT COUNT(*) FROM phrases', ()
+            else:
+                sql, params = 'SELECT COUNT(*) FROM phrase_categories WHERE category_id = ?', (self.category_id,)
+            self._length = self.catalog._query(sql, params)[0][0]
+        return self._length
+
+    def _slice(self, start, stop):
+        if stop <= start:
+            return []
+        if self.category_id is None:
+            # Positions are 0..n-1, so a slice is a primary-key range
+            rows = self.catalog._query(
+                'SELECT body FROM phrases WHERE position >= ? AND position < ? ORDER BY position',
+                (start, stop)
+            )
+        else:
+            rows = self.catalog._query(
+                'SELECT p.body FROM phrase_categories pc JOIN phrases p ON p.position = pc.phrase_position '
+                'WHERE pc.category_id = ? ORDER BY pc.phrase_position LIMIT ? OFFSET ?',
+                (self.category_id, stop - start, start)
+            )
+        return [json.loads(body) for (body,) in rows]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            return self._slice(start, stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('phrase index out of range')
+        return self._slice(index, index + 1)[0]
+
+    def __iter__(self):
+        for start in range(0, len(self), ROW_CHUNK_SIZE):
+            yield from self._slice(start, start + ROW_CHUNK_SIZE)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __eq__(self, other):
+        if isinstance(other, (list, PhraseRows)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+
+class _LazyCategoryMap(dict):
+    """{category_id: PhraseRows}, the SQLite stand-in for Catalog.by_category"""
+
+    def __init__(self, catalog):
+        super().__init__((category_id, PhraseRows(catalog, category_id)) for category_id in catalog.category_ids)
+        self.catalog = catalog
+
+    def __missing__(self, category_id):
+        return []
+
+
+class SQLiteSearchIndex:
+    """Keyword search through the FTS5 index, ranked by SQLite's BM25"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def search(self, query, languages=None, categories=None, limit=20):
+        """Return (total matches, [(phrase_id, score, best_language)]) like search.InvertedIndex"""
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return 0, []
+
+        match = ' OR '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        sql = ('WITH matches AS MATERIALIZED (SELECT phrase_position, language, -rank AS score '
+               'FROM translations_fts WHERE translations_fts MATCH ?')
+        params = [match]
+        if languages:
+            sql += f" AND language IN ({','.join('?' * len(languages))})"
+            params.extend(languages)
+        # COUNT(*) OVER () is taken before LIMIT, so one statement gives the page and the total
+        sql += (') SELECT p.id, m.language, MAX(m.score) AS best, COUNT(*) OVER () '
+                'FROM matches m JOIN phrases p ON p.position = m.phrase_position')
+        if categories:
+            sql += (' WHERE m.phrase_position IN (SELECT phrase_position FROM phrase_categories '
+                    f"WHERE category_id IN ({','.join('?' * len(categories))}))")
+            params.extend(categories)
+        sql += ' GROUP BY m.phrase_position ORDER BY best DESC, m.phrase_position LIMIT ?'
+        # At least one row, which carries the total
+        params.append(max(limit, 1))
+
+        rows = self.catalog._query(sql, params)
+        total = rows[0][3] if rows else 0
+        return total, [(phrase_id, float(score), language) for phrase_id, language, score, _ in rows[:limit]]
+
+
+class SQLiteCategoryQuery:
+    """Category expressions (see category_query.py) translated to SQL"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.category_ids = set(catalog.category_ids)
+
+    def _select(self, tree, params, depth=0):
+        """SELECT of matching phrase positions, built from set operations
+
+        A chain of one operator becomes a single compound SELECT and only
+        compound operands are wrapped in subqueries, so SQLite's parser
+        stack grows with the expression's nesting, not its length.
+        Nesting beyond what the parser takes is rejected.
+        """
+        kind = tree[0]
+        if kind == 'cat':
+            if tree[1] not in self.category_ids:
+                raise CategoryQueryError(f'Unknown category: {tree[1]}')
+            params.append(tree[1])
+            return 'SELECT phrase_position FROM phrase_categories WHERE category_id = ?'
+        if kind == 'not':
+            return f'SELECT position FROM phrases EXCEPT {self._operand(tree[1], params, depth)}'
+        operands = []
+        pending = [tree]
+        while pending:
+            node = pending.pop()
+            if node[0] == kind:
+                pending.extend((node[2], node[1]))
+            else:
+                operands.append(node)
+        operator = ' INTERSECT ' if kind == 'and' else ' UNION '
+        return operator.join(self._operand(node, params, depth) for node in operands)
+
+    def _operand(self, tree, params, depth):
+        if tree[0] == 'cat':
+            return self._select(tree, params, depth)
+        if depth >= MAX_SUBQUERY_DEPTH:
+            raise CategoryQueryError('Category expression nested too deeply')
+        return f'SELECT * FROM ({self._select(tree, params, depth + 1)})'
+
+    def query(self, expression):
+        """Return catalog positions of phrases matching the expression"""
+        params = []
+        select = self._select(parse(expression), params)
+        rows = self.catalog._query(f'SELECT * FROM ({select}) ORDER BY 1', params)
+        return np.array([position for (position,) in rows], dtype=np.int64)
+
+
+# Indexes answered by SQL instead of the in-memory builders
+SQL_INDEXES = {
+    'search': SQLiteSearchIndex,
+    'category_bits': SQLiteCategoryQuery
+}
+
+
+class SQLiteCatalog(Catalog):
+    """A catalog version read from the SQLite database
+
+    Holds one connection for its lifetime (reopened once in a child
+    forked by a preloading server). The connection keeps the imported
+    file open, so a catalog keeps reading the same data even after a
+    re-import replaces the file.
+    """
+
+    def __init__(self, db_path, version=1, digest='', loaded_at=None):
+        self.db_path = db_path
+        self._connect()
+
+        meta = dict(self._query('SELECT key, value FROM meta'))
+        if meta.get('format') != str(FORMAT_VERSION):
+            raise ValueError(f'{db_path} has an unsupported format - re-import it')
+
+        self.data = None
+        self.version = version
+        self.digest = digest or meta['digest']
+        self.loaded_at = loaded_at or time.time()
+        self.source = 'sqlite'
+        self.load_seconds = None
+        self.incremental = False
+
+        # Categories are small - keep them in memory
+        self.categories = [json.loads(body) for (body,) in self._query('SELECT body FROM categories ORDER BY position')]
+        self.category_ids = [category['id'] for category in self.categories]
+        self.languages = json.loads(meta['languages'])
+        self.phrases = PhraseRows(self)
+        self.by_category = _LazyCategoryMap(self)
+
+        self.indexes = {}
+        self._position = None
+        self._phrase_hashes = None
+        self._category_hashes = None
+
+    def _connect(self):
+        self._db = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _query(self, sql, params=()):
+        if self._pid != os.getpid():
+            # Forked from a preloading server - SQLite connections must not cross fork()
+            self._connect()
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def build_indexes(self):
+        """Only the SQL-backed indexes are built up front; the rest on first use"""
+        for name, builder in SQL_INDEXES.items():
+            self.indexes[name] = builder(self)
+        return self
+
+    def index(self, name):
+        if name not in self.indexes:
+            builder = SQL_INDEXES.get(name) or _index_builders[name]
+            self.indexes[name] = builder(self)
+        return self.indexes[name]
+
+    @property
+    def position(self):
+        """{phrase_id: position}, loaded on first use (IDs only)"""
+        if self._position is None:
+            self._position = dict(self._query('SELECT id, position FROM phrases'))
+        return self._position
+
+    @property
+    def by_id(self):
+        return {phrase['id']: phrase for phrase in self.phrases}
+
+    @property
+    def phrase_hashes(self):
+        if self._phrase_hashes is None:
+            self._phrase_hashes = dict(self._query('SELECT id, hash FROM phrases ORDER BY position'))
+        return self._phrase_hashes
+
+    def get_phrase(self, phrase_id):
+        rows = self._query('SELECT body FROM phrases WHERE id = ?', (phrase_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def get_phrases(self, phrase_ids):
+        """Look up many IDs at once; missing IDs give None, order is kept"""
+        found = {}
+        unique = list(dict.fromkeys(phrase_ids))
+        for start in range(0, len(unique), MAX_SQL_VARIABLES):
+            chunk = unique[start:start + MAX_SQL_VARIABLES]
+            rows = self._query(
+                f"SELECT id, body FROM phrases WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((phrase_id, json.loads(body)) for phrase_id, body in rows)
+        return [found.get(phrase_id) for phrase_id in phrase_ids]
+
+    def get_category_phrases(self, category_id):
+        return self.by_category.get(category_id, [])
+
+    def phrases_at(self, positions):
+        """Phrases at the given catalog positions, in that order"""
+        positions = [int(position) for position in positions]
+        found = {}
+        for start in range(0, len(positions), MAX_SQL_VARIABLES):
+            chunk = positions[start:start + MAX_SQL_VARIABLES]
+            rows = self._query(
+                f"SELECT position, body FROM phrases WHERE position IN ({','.join('?' * len(chunk))})", chunk
+            )
+            found.update((position, json.loads(body)) for position, body in rows)
+        return [found[position] for position in positions]
+
+
+class SQLiteCatalogStore(CatalogStore):
+    """CatalogStore backed by the SQLite database
+
+    The JSON file stays the source of truth: when it is newer than the
+    database (or the database is missing) it is re-imported on reload.
+    If that import fails the current database keeps being served.
+    """
+
+    def __init__(self, json_path, db_path, history_size=50, index_files=()):
+        super().__init__(json_path, loader=None, history_size=history_size, index_files=index_files)
+        self.db_path = db_path
+
+    def _db_mtime(self):
+        try:
+            return os.stat(self.db_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _file_mtime(self):
+        return (self._json_mtime(), self._db_mtime())
+
+    def watched_paths(self):
+        return [self.path, self.db_path]
+
+    def _read_source(self):
+        self._import_if_stale(self._db_mtime, lambda: import_json(self.path, self.db_path),
+                              f'{self.db_path}.lock')
+
+        def load(version, digest):
+            return SQLiteCatalog(self.db_path, version=version, digest=digest).build_indexes()
+
+        db = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+        try:
+            digest = db.execute("SELECT value FROM meta WHERE key = 'digest'").fetchone()[0]
+        finally:
+            db.close()
+        return digest, load
@@ -0,0 +1,371 @@
+"""
+Admission Control Verification Tests
+Tests the synthesis limiter: per-client and global limits, the bounded
+wait queue, limits shared by forked workers (even when one dies holding
+the lock), and the audio route's
+429/503 responses while cache hits and phrase lists stay unaffected
+"""
+
+import os
+import sys
+import threading
+import time
+
+
+def hold(limiter, client, acquired, release, errors):
+    """Take a slot in a thread and keep it until `release` is set"""
+    try:
+        with limiter.slot(client):
+            acquired.set()
+            release.wait(10)
+    except Exception as e:
+        errors.append(e)
+        acquired.set()
+
+
+def test_limits_and_queue():
+    """Test per-client 429s, queueing for a slot, and 503s when the queue is full or times out"""
+    try:
+        from admission import AdmissionRejected, SynthesisLimiter
+
+        limiter = SynthesisLimiter(max_concurrent=2, max_per_client=2, max_queue=2, queue_timeout=0.5)
+        release = threading.Event()
+        errors = []
+        holders = []
+        for _ in range(2):
+            acquired = threading.Event()
+            thread = threading.Thread(target=hold, args=(limiter, '10.0.0.1', acquired, release, errors))
+            thread.start()
+            acquired.wait(5)
+            holders.append(thread)
+
+        try:
+            limiter.acquire('10.0.0.1')
+            print("[FAIL] Third slot for the same client was admitted")
+            return False
+        except AdmissionRejected as e:
+            if e.status != 429 or e.retry_after < 1:
+                print(f"[FAIL] Expected 429 with Retry-After, got {e.status} / {e.retry_after}")
+                return False
+
+        # Two other clients queue; a third finds the queue full
+        queued = [threading.Event() for _ in range(2)]
+        waiters = [threading.Thread(target=hold, args=(limiter, f'10.0.1.{n}', queued[n], release, errors))
+                   for n in range(2)]
+        for waiter in waiters:
+            waiter.start()
+        time.sleep(0.1)
+        start = time.perf_counter()
+        try:
+            limiter.acquire('10.0.2.1')
+            print("[FAIL] Admitted with every slot and the queue taken")
+            return False
+        except AdmissionRejected as e:
+            rejected_in = time.perf_counter() - start
+            if e.status != 503 or rejected_in > 0.05:
+                print(f"[FAIL] Full queue: {e.status} after {rejected_in * 1000:.0f} ms")
+                return False
+
+        stats = limiter.stats()
+        if stats['running'] != 2 or stats['waiting'] != 2:
+            print(f"[FAIL] Expected 2 running and 2 waiting: {stats}")
+            return False
+
+        # Nobody releases in time: both waiters time out with 503
+        for waiter in waiters:
+            waiter.join(5)
+        if len(errors) != 2 or any(e.status != 503 for e in errors):
+            print(f"[FAIL] Expected both waiters to time out with 503: {errors}")
+            return False
+
+        release.set()
+        for thread in holders:
+            thread.join(5)
+        with limiter.slot('10.0.0.1'):
+            pass
+        stats = limiter.stats()
+        if stats['running'] or stats['waiting'] or stats['timed_out'] != 2 or stats['rejected_client'] != 1:
+            print(f"[FAIL] Slots not returned or counters wrong: {stats}")
+            return False
+
+        print(f"[PASS] 429 per client, 503 in {rejected_in * 1000:.1f} ms when full, "
+              f"queued requests time out, slots returned")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Limits test error: {e}")
+        return False
+
+
+def test_queued_request_admitted():
+    """Test that a queued request gets the slot as soon as one is released"""
+    try:
+        from admission import SynthesisLimiter
+
+        limiter = SynthesisLimiter(max_concurrent=1, max_per_client=1, max_queue=1, queue_timeout=5)
+        release = threading.Event()
+        acquired = threading.Event()
+        errors = []
+        holder = threading.Thread(target=hold, args=(limiter, 'a', acquired, release, errors))
+        holder.start()
+        acquired.wait(5)
+
+        threading.Timer(0.2, release.set).start()
+        start = time.perf_counter()
+        with limiter.slot('b'):
+            waited = time.perf_counter() - start
+        holder.join(5)
+
+        if errors or not 0.15 < waited < 1.0:
+            print(f"[FAIL] Queued request waited {waited:.2f}s ({errors})")
+            return False
+
+        print(f"[PASS] Queued request admitted {waited * 1000:.0f} ms later, when the slot was released")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Queue test error: {e}")
+        return False
+
+
+def test_shared_across_workers():
+    """Test that forked workers share the limits and slots of dead workers are reclaimed"""
+    try:
+        from admission import AdmissionRejected, SynthesisLimiter
+
+        limiter = SynthesisLimiter(max_concurrent=1, max_per_client=1, max_queue=1, queue_timeout=3)
+
+        # A worker holds the only slot
+        ready_r, ready_w = os.pipe()
+        done_r, done_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            limiter.acquire('worker')
+            os.write(ready_w, b'1')
+            os.read(done_r, 1)
+            # Killed while holding the slot - never released
+            os._exit(0)
+        os.read(ready_r, 1)
+
+        try:
+            limiter.acquire('worker')
+            print("[FAIL] Per-client limit not shared with the other worker")
+            return False
+        except AdmissionRejected as e:
+            if e.status != 429:
+                print(f"[FAIL] Expected 429 across workers, got {e.status}")
+                return False
+        if limiter.stats()['running'] != 1:
+            print("[FAIL] Other worker's slot not visible")
+            return False
+
+        os.write(done_w, b'1')
+        os.waitpid(pid, 0)
+        start = time.perf_counter()
+        with limiter.slot('other'):
+            waited = time.perf_counter() - start
+        stats = limiter.stats()
+        if stats['reaped'] != 1 or stats['running'] or waited > 2.5:
+            print(f"[FAIL] Dead worker's slot not reclaimed ({waited:.2f}s): {stats}")
+            return False
+
+        print(f"[PASS] Limits shared by forked workers, dead worker's slot reclaimed in {waited:.2f}s")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Cross-process test error: {e}")
+        return False
+
+
+def test_lock_holder_killed():
+    """Test that a worker killed while holding the shared lock blocks neither admission nor stats"""
+    try:
+        import signal
+        from admission import SynthesisLimiter
+
+        limiter = SynthesisLimiter(max_concurrent=1, max_per_client=1, max_queue=1, queue_timeout=3)
+
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            with limiter._locked():
+                os.write(ready_w, b'1')
+                time.sleep(60)
+            os._exit(0)
+        os.read(ready_r, 1)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+        start = time.perf_counter()
+        stats = limiter.stats()
+        stats_in = time.perf_counter() - start
+        if stats_in > 0.1:
+            print(f"[FAIL] Stats waited {stats_in:.2f}s for the dead worker's lock")
+            return False
+
+        start = time.perf_counter()
+        with limiter.slot('client'):
+            waited = time.perf_counter() - start
+        with limiter.slot('client'):
+            pass
+        stats = limiter.stats()
+        if waited > 2.5 or stats['locks_recovered'] != 1 or stats['admitted'] != 2 or stats['running']:
+            print(f"[FAIL] Lock not recovered ({waited:.2f}s): {stats}")
+            return False
+
+        print(f"[PASS] Dead worker's lock recovered in {waited:.2f}s, stats in {stats_in * 1000:.1f} ms")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Dead lock holder test error: {e}")
+        return False
+
+
+def test_queued_request_lock_unavailable():
+    """Test that a queued request that cannot get the lock by its deadline leaves no queue entry behind"""
+    try:
+        import admission
+        from admission import SynthesisLimiter
+
+        limiter = SynthesisLimiter(max_concurrent=1, max_per_client=1, max_queue=1, queue_timeout=0.2)
+        running = limiter.acquire('a')
+        results = []
+        queued = threading.Thread(target=lambda: results.append(limiter.acquire('b')))
+
+        original_timeout = admission.LOCK_TIMEOUT
+        admission.LOCK_TIMEOUT = 0.05
+        try:
+            queued.start()
+            while not limiter.stats()['waiting']:
+                time.sleep(0.005)
+            # Another worker holds the lock past the queue deadline
+            with limiter._locked():
+                queued.join(5)
+        finally:
+            admission.LOCK_TIMEOUT = original_timeout
+        limiter.release(running, 0.1)
+
+        stats = limiter.stats()
+        if results != [None] or stats['bypassed'] != 1 or stats['waiting'] or stats['running']:
+            print(f"[FAIL] Queue entry left behind: {results}, {stats}")
+            return False
+        with limiter.slot('b'):
+            pass
+
+        print("[PASS] Queue entry freed when the lock could not be had")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Unavailable lock test error: {e}")
+        return False
+
+
+def test_audio_route_backpressure():
+    """Test that a saturated audio endpoint answers 429/503 fast while hits and phrase lists still work"""
+    try:
+        import app as app_module
+        from admission import SynthesisLimiter
+        from audio import AudioCache, CircuitBreaker
+
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow_synthesizer(text, gtts_lang):
+            started.set()
+            release.wait(10)
+            return b'ID3' + text.encode('utf-8')
+
+        original = (app_module.audio_service.cache, app_module.audio_service.breaker,
+                    app_module.audio_service.synthesizer, app_module.audio_service.limiter)
+        service = app_module.audio_service
+        service.cache = AudioCache()
+        service.breaker = CircuitBreaker()
+        service.synthesizer = slow_synthesizer
+        service.limiter = SynthesisLimiter(max_concurrent=1, max_per_client=1, max_queue=0)
+        app_module.warmup_state.update(started=True)
+        try:
+            phrase = app_module.get_catalog().get_phrase('phrase_002')
+            service.cache.put(service.key_for(phrase, 'en'), b'ID3 cached clip')
+
+            def get(address, path):
+                return app_module.app.test_client().get(path, environ_base={'REMOTE_ADDR': address})
+
+            responses = {}
+            busy = threading.Thread(target=lambda: responses.update(
+                first=get('10.0.0.1', '/api/audio/phrase_001/en')))
+            busy.start()
+            started.wait(5)
+
+            start = time.perf_counter()
+            same_client = get('10.0.0.1', '/api/audio/phrase_001/zu')
+            other_client = get('10.0.0.2', '/api/audio/phrase_001/af')
+            rejected_in = time.perf_counter() - start
+            hit = get('10.0.0.2', '/api/audio/phrase_002/en')
+            phrases = get('10.0.0.3', '/api/phrases?limit=5')
+            stats = get('10.0.0.3', '/api/ready').get_json()['audio_admission']
+            release.set()
+            busy.join(10)
+        finally:
+            release.set()
+            (service.cache, service.breaker, service.synthesizer, service.limiter) = original
+
+        if same_client.status_code != 429 or other_client.status_code != 503:
+            print(f"[FAIL] Expected 429 and 503, got {same_client.status_code} and {other_client.status_code}")
+            return False
+        if not same_client.headers.get('Retry-After') or not other_client.headers.get('Retry-After'):
+            print("[FAIL] Rejections carry no Retry-After")
+            return False
+        if rejected_in > 0.5:
+            print(f"[FAIL] Rejections took {rejected_in:.2f}s")
+            return False
+        if hit.status_code != 200 or hit.data != b'ID3 cached clip' or phrases.status_code != 200:
+            print(f"[FAIL] Cache hit ({hit.status_code}) or phrase list ({phrases.status_code}) affected")
+            return False
+        if responses['first'].status_code != 200 or stats['rejected_client'] != 1 or stats['rejected_busy'] != 1:
+            print(f"[FAIL] Admitted request failed or stats wrong: {responses['first'].status_code} {stats}")
+            return False
+
+        print(f"[PASS] Saturated endpoint: 429 and 503 with Retry-After in {rejected_in * 1000:.0f} ms, "
+              f"cache hit and phrase list unaffected")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Audio route test error: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("ADMISSION CONTROL VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Limits and Queue', test_limits_and_queue),
+        ('Queued Request Admitted', test_queued_request_admitted),
+        ('Shared Across Workers', test_shared_across_workers),
+        ('Lock Holder Killed', test_lock_holder_killed),
+        ('Queued Request Lock Unavailable', test_queued_request_lock_unavailable),
+        ('Audio Route Backpressure', test_audio_route_backpressure)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL ADMISSION CONTROL TESTS PASSED")
+    else:
+        print("[FAILURE] SOME ADMISSION CONTROL TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,352 @@
+"""
+ASGI Verification Tests
+Tests the async entry point: audio misses awaited without a thread per
+request, shared syntheses, TTS errors and every other route passed
+through to Flask unchanged
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault('WSGI_PRELOAD', '0')
+os.environ.setdefault('AUDIO_WARMUP_CATEGORIES', '')
+
+
+async def call(application, path, query='', headers=()):
+    """(status, headers, body) of one request driven straight through the ASGI app"""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': query.encode(), 'headers': [(k.lower().encode(), v.encode()) for k, v in headers],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 8000)
+    }
+    await application(scope, receive, send)
+    response_headers = {k.decode().lower(): v.decode() for k, v in messages[0].get('headers', [])}
+    return messages[0]['status'], response_headers, b''.join(m.get('body', b'') for m in messages[1:])
+
+
+def reset_audio(app_module, synthesizer):
+    from audio import AudioCache, CircuitBreaker
+    app_module.audio_service.cache = AudioCache()
+    app_module.audio_service.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    app_module.audio_service.synthesizer = synthesizer
+    # Admission control is covered by test_admission.py
+    app_module.audio_service.limiter = None
+
+
+def test_concurrent_misses():
+    """Test that concurrent misses are synthesized in parallel, once per clip"""
+    try:
+        import app as app_module
+        import asgi
+
+        calls = []
+
+        def slow_synthesizer(text, gtts_lang):
+            calls.append(text)
+            time.sleep(0.3)
+            return b'ID3' + text.encode('utf-8')
+
+        reset_audio(app_module, slow_synthesizer)
+        paths = [f'/api/audio/phrase_00{n}/{language}' for n in range(1, 6) for language in ('en', 'zu')] * 10
+
+        async def burst():
+            return await asyncio.gather(*[call(asgi.application, path) for path in paths])
+
+        start = time.perf_counter()
+        responses = asyncio.run(burst())
+        elapsed = time.perf_counter() - start
+
+        if any(status != 200 for status, _, _ in responses):
+            print(f"[FAIL] Statuses: {sorted(set(status for status, _, _ in responses))}")
+            return False
+        if len(calls) != 10:
+            print(f"[FAIL] Expected one synthesis per clip (10), got {len(calls)}")
+            return False
+        if elapsed > 1.5:
+            print(f"[FAIL] 10 syntheses of 0.3 s took {elapsed:.2f}s - not concurrent")
+            return False
+        if any(not body.startswith(b'ID3') for _, _, body in responses):
+            print("[FAIL] Clip body not served")
+            return False
+
+        print(f"[PASS] {len(paths)} concurrent requests, {len(calls)} syntheses, {elapsed:.2f}s")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Concurrent miss test error: {e}")
+        return False
+
+
+def test_routes_pass_through():
+    """Test that other routes, 404s and Range requests behave as under WSGI"""
+    try:
+        import app as app_module
+        import asgi
+
+        reset_audio(app_module, lambda text, gtts_lang: b'ID3' + b'\x01' * 1000)
+
+        async def requests():
+            return await asyncio.gather(
+                call(asgi.application, '/api/phrases', 'limit=2&langs=en'),
+                call(asgi.application, '/api/audio/not_a_phrase/en'),
+                call(asgi.application, '/api/audio/phrase_001/xx'),
+                call(asgi.application, '/api/audio/phrase_001/af', headers=[('Range', 'bytes=0-9')])
+            )
+
+        phrases, missing, language, partial = asyncio.run(requests())
+        with app_module.app.test_client() as client:
+            expected = client.get('/api/phrases?limit=2&langs=en').data
+
+        if phrases[0] != 200 or phrases[2] != expected:
+            print(f"[FAIL] Phrase list differs from the WSGI response ({phrases[0]})")
+            return False
+        if missing[0] != 404 or language[0] != 404:
+            print(f"[FAIL] Expected 404s, got {missing[0]} and {language[0]}")
+            return False
+        if partial[0] != 206 or partial[2] != b'ID3' + b'\x01' * 7:
+            print(f"[FAIL] Range request: {partial[0]} {partial[2]!r}")
+            return False
+
+        print("[PASS] Phrase list, 404s and Range request identical to the WSGI app")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Pass-through test error: {e}")
+        return False
+
+
+def test_client_behind_proxy():
+    """Test that admission sees the same client address as the Flask route behind TRUSTED_PROXIES"""
+    try:
+        import app as app_module
+        import asgi
+        from admission import SynthesisLimiter
+
+        clients = []
+
+        class RecordingLimiter(SynthesisLimiter):
+            def join(self, client=None):
+                clients.append(client)
+                return super().join(client)
+
+        reset_audio(app_module, lambda text, gtts_lang: b'ID3' + text.encode('utf-8'))
+        app_module.audio_service.limiter = RecordingLimiter()
+        forwarded = [('X-Forwarded-For', '203.0.113.5'), ('X-Forwarded-For', '198.51.100.2, 10.0.0.7')]
+        scope = {'client': ('127.0.0.1', 50000), 'headers': [(k.lower().encode(), v.encode()) for k, v in forwarded]}
+
+        original = app_module.app.config['TRUSTED_PROXIES']
+        try:
+            resolved = {}
+            for trusted in (0, 1, 3, 4):
+                app_module.app.config['TRUSTED_PROXIES'] = trusted
+                resolved[trusted] = asgi._client_address(scope)
+            app_module.app.config['TRUSTED_PROXIES'] = 1
+            status = asyncio.run(call(asgi.application, '/api/audio/phrase_005/en', headers=forwarded))[0]
+        finally:
+            app_module.app.config['TRUSTED_PROXIES'] = original
+            app_module.audio_service.limiter = None
+
+        expected = {0: '127.0.0.1', 1: '10.0.0.7', 3: '203.0.113.5', 4: '127.0.0.1'}
+        if resolved != expected:
+            print(f"[FAIL] Client addresses {resolved}, expected {expected}")
+            return False
+        if status != 200 or clients != ['10.0.0.7']:
+            print(f"[FAIL] Synthesis admitted for {clients} ({status}), expected the forwarded client")
+            return False
+
+        print("[PASS] Forwarded client address used for admission, as by ProxyFix")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Proxy client test error: {e}")
+        return False
+
+
+def test_queued_misses_hold_no_thread():
+    """Test that misses queued by admission control wait on the event loop, leaving TTS threads free"""
+    try:
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        import app as app_module
+        import asgi
+        from admission import SynthesisLimiter
+
+        release = threading.Event()
+
+        def slow_synthesizer(text, gtts_lang):
+            release.wait(10)
+            return b'ID3' + text.encode('utf-8')
+
+        reset_audio(app_module, slow_synthesizer)
+        limiter = SynthesisLimiter(max_concurrent=1, max_per_client=5, max_queue=4, queue_timeout=10)
+        app_module.audio_service.limiter = limiter
+        original_executor = asgi.tts_executor
+        asgi.tts_executor = ThreadPoolExecutor(2, thread_name_prefix='tts')
+
+        async def scenario():
+            tasks = [asyncio.ensure_future(call(asgi.application, f'/api/audio/phrase_00{n}/en')) for n in (1, 2, 3)]
+            deadline = time.monotonic() + 2
+            while limiter.stats()['waiting'] < 2 and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            waiting = limiter.stats()['waiting']
+            # One thread synthesizes; the other must still be free for new work
+            try:
+                await asyncio.wait_for(asyncio.wrap_future(asgi.tts_executor.submit(lambda: None)), 1)
+                thread_free = True
+            except asyncio.TimeoutError:
+                thread_free = False
+            release.set()
+            return waiting, thread_free, await asyncio.gather(*tasks)
+
+        try:
+            waiting, thread_free, responses = asyncio.run(scenario())
+        finally:
+            release.set()
+            asgi.tts_executor.shutdown(wait=True)
+            asgi.tts_executor = original_executor
+            app_module.audio_service.limiter = None
+
+        if waiting != 2 or not thread_free:
+            print(f"[FAIL] {waiting} request(s) queued, TTS thread free: {thread_free}")
+            return False
+        if any(status != 200 for status, _, _ in responses) or limiter.stats()['admitted'] != 3:
+            print(f"[FAIL] Queued misses not served: {[status for status, _, _ in responses]}")
+            return False
+
+        print("[PASS] 2 queued misses waited on the event loop, TTS thread left free")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Queued miss test error: {e}")
+        return False
+
+
+def test_uncached_clip_served():
+    """Test that a clip the cache does not keep is served from the synthesis, not synthesized again"""
+    try:
+        import app as app_module
+        import asgi
+        from audio import AudioCache
+
+        calls = []
+
+        def counting_synthesizer(text, gtts_lang):
+            calls.append(text)
+            # Long enough for all three requests to join this synthesis
+            time.sleep(0.2)
+            return b'ID3' + b'\x02' * 100
+
+        reset_audio(app_module, counting_synthesizer)
+        # Every clip is larger than the cache, so none is kept
+        app_module.audio_service.cache = AudioCache(max_bytes=10)
+        plays = app_module.phrase_usage.counts['phrase_006']
+
+        async def requests():
+            return await asyncio.gather(*[call(asgi.application, '/api/audio/phrase_006/en') for _ in range(3)])
+
+        responses = asyncio.run(requests())
+        if any(status != 200 or body != b'ID3' + b'\x02' * 100 for status, _, body in responses):
+            print(f"[FAIL] Uncached clip not served: {[status for status, _, _ in responses]}")
+            return False
+        headers = responses[0][1]
+        if headers.get('content-type') != 'audio/mp3' or headers.get('content-length') != '103':
+            print(f"[FAIL] Unexpected headers: {headers}")
+            return False
+        if len(calls) != 1:
+            print(f"[FAIL] Expected one synthesis for three requests, got {len(calls)}")
+            return False
+        if app_module.phrase_usage.counts['phrase_006'] != plays + 3:
+            print("[FAIL] Plays of the uncached clip not recorded")
+            return False
+
+        print("[PASS] Clip the cache dropped served from its one synthesis")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Uncached clip test error: {e}")
+        return False
+
+
+def test_tts_errors():
+    """Test that TTS failures give a 500 without a retry, then 503 with Retry-After once the breaker opens"""
+    try:
+        import app as app_module
+        import asgi
+
+        calls = []
+
+        def failing_synthesizer(text, gtts_lang):
+            calls.append(text)
+            raise RuntimeError('upstream down')
+
+        reset_audio(app_module, failing_synthesizer)
+
+        async def requests():
+            first = await call(asgi.application, '/api/audio/phrase_003/en')
+            second = await call(asgi.application, '/api/audio/phrase_003/af')
+            third = await call(asgi.application, '/api/audio/phrase_004/en')
+            return first, second, third
+
+        first, second, third = asyncio.run(requests())
+
+        if first[0] != 500 or b'upstream down' not in first[2] or len(calls) != 2:
+            print(f"[FAIL] Expected 500 and one call per request, got {first[0]} with {len(calls)} calls")
+            return False
+        if third[0] != 503 or int(third[1].get('retry-after', 0)) < 1 or len(calls) != 2:
+            print(f"[FAIL] Open breaker: {third[0]} {third[1]}, {len(calls)} calls")
+            return False
+
+        print("[PASS] TTS failure returns 500 once, open breaker returns 503 with Retry-After")
+        return True
+    except Exception as e:
+        print(f"[FAIL] TTS error test error: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("ASGI VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Concurrent Misses', test_concurrent_misses),
+        ('Routes Pass Through', test_routes_pass_through),
+        ('Client Behind Proxy', test_client_behind_proxy),
+        ('Queued Misses Hold No Thread', test_queued_misses_hold_no_thread),
+        ('Uncached Clip Served', test_uncached_clip_served),
+        ('TTS Errors', test_tts_errors)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL ASGI TESTS PASSED")
+    else:
+        print("[FAILURE] SOME ASGI TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,215 @@
+"""
+Audio Pack Verification Tests
+Tests the shared audio pack: appends from several processes, clips served
+from the mmap without copies, compaction and Range requests
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+
+WORKERS = 4
+CLIPS_PER_WORKER = 50
+
+
+def clip_bytes(worker, n):
+    return f'ID3 worker {worker} clip {n} '.encode() * (20 + n)
+
+
+def append_clips(path, worker):
+    from audio_pack import AudioPack
+    pack = AudioPack(path)
+    for n in range(CLIPS_PER_WORKER):
+        pack.put(f'w{worker}/{n}', clip_bytes(worker, n))
+        # Every worker also races to store the same shared clips
+        pack.put(f'shared/{n}', b'shared clip ' * (n + 1))
+
+
+def test_concurrent_appends():
+    """Test that clips appended by several processes are all readable by each of them"""
+    try:
+        from audio_pack import AudioPack
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'audio.pack')
+            reader = AudioPack(path)
+            context = multiprocessing.get_context('fork')
+            processes = [context.Process(target=append_clips, args=(path, w)) for w in range(WORKERS)]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join(60)
+
+            for worker in range(WORKERS):
+                for n in range(CLIPS_PER_WORKER):
+                    clip = reader.get(f'w{worker}/{n}')
+                    if clip is None or bytes(clip) != clip_bytes(worker, n):
+                        print(f"[FAIL] Clip w{worker}/{n} missing or garbled")
+                        return False
+            stats = reader.stats()
+            expected = WORKERS * CLIPS_PER_WORKER + CLIPS_PER_WORKER
+            if stats['entries'] != expected or stats['corrupt']:
+                print(f"[FAIL] Expected {expected} clean entries: {stats}")
+                return False
+
+        print(f"[PASS] {WORKERS} processes appended {stats['entries']} clips without interleaving")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Concurrent append test error: {e}")
+        return False
+
+
+def test_zero_copy_and_torn_tail():
+    """Test that clips are views of the mmap and that a torn record is ignored, then overwritten"""
+    try:
+        import mmap
+        from audio_pack import AudioPack
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'audio.pack')
+            pack = AudioPack(path)
+            pack.put('a', b'ID3 first clip')
+            view = pack.get('a')
+            if not isinstance(view, memoryview) or not isinstance(view.obj, mmap.mmap) or not view.readonly:
+                print(f"[FAIL] Clip is not a read-only view of the pack's mmap: {type(view)}")
+                return False
+
+            # A writer that crashed half-way through a record
+            with open(path, 'ab') as f:
+                f.write(b'SAC1\x00\x05')
+            if AudioPack(path).get('a') != b'ID3 first clip':
+                print("[FAIL] Torn tail broke reading the clips before it")
+                return False
+
+            pack.put('b', b'ID3 second clip')
+            fresh = AudioPack(path)
+            if fresh.get('b') != b'ID3 second clip' or fresh.stats()['file_bytes'] != os.path.getsize(path):
+                print("[FAIL] Torn tail was not truncated before the next append")
+                return False
+
+        print("[PASS] Clips are read-only mmap views and torn records are recovered")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Zero-copy test error: {e}")
+        return False
+
+
+def test_compaction():
+    """Test that compaction drops deleted clips and other processes follow the new file"""
+    try:
+        from audio_pack import AudioPack
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'audio.pack')
+            worker = AudioPack(path)
+            for n in range(20):
+                worker.put(f'clip/{n}', b'x' * 1000)
+            held = worker.get('clip/0')
+            for n in range(10):
+                worker.delete(f'clip/{n}')
+
+            compactor = AudioPack(path)
+            kept, freed = compactor.compact(keep={f'clip/{n}' for n in range(15)})
+            if kept != 5 or freed < 15 * 1000:
+                print(f"[FAIL] Expected 5 clips kept and 15 freed, got {kept} kept, {freed:,} bytes freed")
+                return False
+
+            # The old worker still holds a view of the replaced file
+            if held != b'x' * 1000:
+                print("[FAIL] View handed out before compaction changed")
+                return False
+            worker.put('clip/new', b'y' * 10)
+            if 'clip/15' in worker or worker.get('clip/12') != b'x' * 1000 or compactor.get('clip/new') != b'y' * 10:
+                print("[FAIL] Worker did not follow the compacted file")
+                return False
+
+        print(f"[PASS] Compaction kept {kept} of 20 clips, freed {freed:,} bytes, workers followed it")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Compaction test error: {e}")
+        return False
+
+
+def test_audio_route_serves_pack():
+    """Test that /api/audio serves clips from the pack, including Range requests"""
+    try:
+        import app as app_module
+        from audio import CircuitBreaker
+        from audio_pack import AudioPack
+
+        clip = b'ID3' + bytes(range(256)) * 400
+        original = (app_module.audio_service.cache, app_module.audio_service.synthesizer,
+                    app_module.audio_service.breaker)
+        with tempfile.TemporaryDirectory() as tmp:
+            try:
+                app_module.audio_service.cache = AudioPack(os.path.join(tmp, 'audio.pack'))
+                app_module.audio_service.synthesizer = lambda text, gtts_lang: clip
+                app_module.audio_service.breaker = CircuitBreaker()
+
+                with app_module.app.test_client() as client:
+                    full = client.get('/api/audio/phrase_001/en')
+                    partial = client.get('/api/audio/phrase_001/en', headers={'Range': 'bytes=100-199'})
+                stats = app_module.audio_service.cache.stats()
+            finally:
+                (app_module.audio_service.cache, app_module.audio_service.synthesizer,
+                 app_module.audio_service.breaker) = original
+
+        if full.status_code != 200 or full.data != clip or full.mimetype != 'audio/mp3' or \
+                full.headers.get('Accept-Ranges') != 'bytes':
+            print(f"[FAIL] Full response: {full.status_code} {full.headers}")
+            return False
+        if partial.status_code != 206 or partial.data != clip[100:200] or \
+                partial.headers.get('Content-Range') != f'bytes 100-199/{len(clip)}':
+            print(f"[FAIL] Range response: {partial.status_code} {partial.headers}")
+            return False
+        if stats['appends'] != 1 or stats['hits'] != 1:
+            print(f"[FAIL] Second request should be served from the pack: {stats}")
+            return False
+
+        print(f"[PASS] Audio route serves {len(clip):,}-byte clip from the pack, Range gives 206")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Audio route test error: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("AUDIO PACK VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Concurrent Appends', test_concurrent_appends),
+        ('Zero Copy and Torn Tail', test_zero_copy_and_torn_tail),
+        ('Compaction', test_compaction),
+        ('Audio Route Serves Pack', test_audio_route_serves_pack)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL AUDIO PACK TESTS PASSED")
+    else:
+        print("[FAILURE] SOME AUDIO PACK TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
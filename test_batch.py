@@ -0,0 +1,133 @@
+"""
+Batch Lookup Verification Tests
+Tests /api/phrases/batch for GET and POST requests
+"""
+
+import sys
+
+def test_batch_get_order():
+    """Test GET batch returns phrases in request order with not-found markers"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            data = client.get('/api/phrases/batch?ids=phrase_005,missing_id,phrase_002,phrase_005').get_json()
+
+            if [r['id'] for r in data['results']] != ['phrase_005', 'missing_id', 'phrase_002', 'phrase_005']:
+                print("[FAIL] Results not in request order")
+                return False
+
+            if data['total'] != 4 or data['found'] != 3:
+                print(f"[FAIL] Expected total 4/found 3, got {data['total']}/{data['found']}")
+                return False
+
+            missing = data['results'][1]
+            if missing['found'] != False or 'phrase' in missing or not missing.get('error'):
+                print(f"[FAIL] Bad not-found marker: {missing}")
+                return False
+
+            if data['results'][2]['phrase']['id'] != 'phrase_002':
+                print("[FAIL] Wrong phrase returned")
+                return False
+
+        print("[PASS] GET batch keeps order and marks missing IDs")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Batch GET test error: {e}")
+        return False
+
+def test_batch_post_and_projection():
+    """Test POST batch and langs projection"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            response = client.post('/api/phrases/batch?langs=xh', json={'ids': ['phrase_010', 'phrase_001']})
+            data = response.get_json()
+
+            if response.status_code != 200 or data['found'] != 2:
+                print(f"[FAIL] POST batch returned {response.status_code}")
+                return False
+
+            for result in data['results']:
+                if set(result['phrase']['translations']) != {'xh'}:
+                    print("[FAIL] Projection not applied to batch")
+                    return False
+
+        print("[PASS] POST batch with projection")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Batch POST test error: {e}")
+        return False
+
+def test_batch_limits_and_errors():
+    """Test maximum batch size and malformed requests"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            max_ids = app.config['BATCH_MAX_IDS']
+
+            response = client.post('/api/phrases/batch', json={'ids': ['phrase_001'] * max_ids})
+            if response.status_code != 200:
+                print("[FAIL] Batch at the maximum size should succeed")
+                return False
+
+            bad_requests = [
+                client.post('/api/phrases/batch', json={'ids': ['phrase_001'] * (max_ids + 1)}),
+                client.post('/api/phrases/batch', json={'ids': 'phrase_001'}),
+                client.post('/api/phrases/batch', data='not json'),
+                client.post('/api/phrases/batch', json=['phrase_001']),
+                client.post('/api/phrases/batch', json='phrase_001'),
+                client.post('/api/phrases/batch', json=None),
+                client.get('/api/phrases/batch')
+            ]
+            for response in bad_requests:
+                if response.status_code != 400 or response.get_json()['success'] != False:
+                    print(f"[FAIL] Expected 400, got {response.status_code}")
+                    return False
+
+        print(f"[PASS] Batch size limit ({max_ids}) and errors enforced")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Batch limit test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("BATCH LOOKUP VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Batch GET Order', test_batch_get_order),
+        ('Batch POST and Projection', test_batch_post_and_projection),
+        ('Batch Limits and Errors', test_batch_limits_and_errors)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL BATCH LOOKUP TESTS PASSED")
+    else:
+        print("[FAILURE] SOME BATCH LOOKUP TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,167 @@
+"""
+Bootstrap Verification Tests
+Tests /api/bootstrap and the bootstrap data embedded in /app
+"""
+
+import json
+import re
+import sys
+
+EMBED_RE = re.compile(r'<script id="bootstrap-data" type="application/json">(.*?)</script>', re.S)
+
+def test_bootstrap_endpoint():
+    """Test that one request returns categories, languages, version and the first page"""
+    try:
+        from app import app, load_phrases_data
+        data = load_phrases_data()
+
+        with app.test_client() as client:
+            bootstrap = client.get('/api/bootstrap').get_json()
+
+            if bootstrap['categories'] != data['categories']:
+                print("[FAIL] Categories missing from bootstrap")
+                return False
+
+            expected = [p['id'] for p in data['phrases'][:app.config['BOOTSTRAP_PAGE_SIZE']]]
+            if [p['id'] for p in bootstrap['phrases']] != expected or bootstrap['total'] != len(data['phrases']):
+                print("[FAIL] Bootstrap first page wrong")
+                return False
+
+            languages = bootstrap['languages']
+            if languages['en']['audio'] != 'native' or languages['zu']['audio'] != 'fallback':
+                print(f"[FAIL] Wrong language capabilities: {languages}")
+                return False
+
+            if not bootstrap['catalog_version'] or 'version' in bootstrap:
+                print("[FAIL] Catalog digest missing, or a per-process version included")
+                return False
+
+            # The cursor continues on the regular phrase list endpoint
+            if bootstrap['next_cursor']:
+                rest = client.get(f"/api/phrases?limit=500&cursor={bootstrap['next_cursor']}").get_json()
+                if [p['id'] for p in rest['phrases']] != [p['id'] for p in data['phrases'][len(expected):]]:
+                    print("[FAIL] Bootstrap cursor does not continue the list")
+                    return False
+
+        print(f"[PASS] Bootstrap returns {len(bootstrap['phrases'])} phrases, {len(languages)} languages")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Bootstrap endpoint test error: {e}")
+        return False
+
+def test_app_embeds_bootstrap():
+    """Test that /app embeds the same payload as /api/bootstrap"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            html = client.get('/app').data.decode('utf-8')
+            match = EMBED_RE.search(html)
+            if not match:
+                print("[FAIL] /app does not embed bootstrap data")
+                return False
+
+            embedded = json.loads(match.group(1))
+            if embedded != client.get('/api/bootstrap').get_json():
+                print("[FAIL] Embedded data differs from /api/bootstrap")
+                return False
+
+            if client.get('/app').data.decode('utf-8') != html:
+                print("[FAIL] Repeat render differs")
+                return False
+
+        print("[PASS] /app embeds bootstrap data")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Embedded bootstrap test error: {e}")
+        return False
+
+def test_query_does_not_shape_cached_page():
+    """Test that a projected /app visit does not change the page cached for everyone"""
+    try:
+        import app as app_module
+        from serialization import BodyCache
+
+        original = app_module.body_cache
+        app_module.body_cache = BodyCache()
+        try:
+            with app_module.app.test_client() as client:
+                first = client.get('/app?langs=en&fields=text').data.decode('utf-8')
+                embedded = json.loads(EMBED_RE.search(client.get('/app').data.decode('utf-8')).group(1))
+        finally:
+            app_module.body_cache = original
+
+        translations = embedded['phrases'][0]['translations']
+        if len(translations) < 2 or any('text' not in t or len(t) < 2 for t in translations.values()):
+            print(f"[FAIL] Cached page was projected by the first visitor's query: {translations}")
+            return False
+        if json.loads(EMBED_RE.search(first).group(1)) != embedded:
+            print("[FAIL] Projected visit served a different page")
+            return False
+
+        print(f"[PASS] /app?langs=en&fields=text leaves the cached page complete ({len(translations)} languages)")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Cached page test error: {e}")
+        return False
+
+def test_embedding_can_be_disabled():
+    """Test that EMBED_BOOTSTRAP off leaves the client to fetch /api/bootstrap"""
+    try:
+        from app import app
+
+        app.config['EMBED_BOOTSTRAP'] = False
+        try:
+            with app.test_client() as client:
+                html = client.get('/app').data.decode('utf-8')
+                if 'bootstrap-data" type=' in html or '/api/bootstrap' not in html:
+                    print("[FAIL] Page should fetch bootstrap instead of embedding it")
+                    return False
+        finally:
+            app.config['EMBED_BOOTSTRAP'] = True
+
+        print("[PASS] Embedding can be disabled")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Embedding toggle test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("BOOTSTRAP VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Bootstrap Endpoint', test_bootstrap_endpoint),
+        ('App Embeds Bootstrap', test_app_embeds_bootstrap),
+        ('Query Does Not Shape Cached Page', test_query_does_not_shape_cached_page),
+        ('Embedding Can Be Disabled', test_embedding_can_be_disabled)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL BOOTSTRAP TESTS PASSED")
+    else:
+        print("[FAILURE] SOME BOOTSTRAP TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
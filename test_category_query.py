@@ -0,0 +1,125 @@
+"""
+Category Query Verification Tests
+Tests boolean category expressions on /api/phrases/query
+"""
+
+import sys
+
+def expected_ids(predicate):
+    """Phrase IDs selected by a plain Python predicate over category sets"""
+    from app import load_phrases_data
+    data = load_phrases_data()
+    return [p['id'] for p in data['phrases'] if predicate(set(p['categories']))]
+
+def test_parser_precedence():
+    """Test NOT > AND > OR precedence and implicit AND"""
+    try:
+        from category_query import parse
+
+        checks = [
+            ('a OR b AND c', ('or', ('cat', 'a'), ('and', ('cat', 'b'), ('cat', 'c')))),
+            ('a OR b NOT c', ('or', ('cat', 'a'), ('and', ('cat', 'b'), ('not', ('cat', 'c'))))),
+            ('(a OR b) AND c', ('and', ('or', ('cat', 'a'), ('cat', 'b')), ('cat', 'c'))),
+            ('NOT NOT a', ('not', ('not', ('cat', 'a')))),
+            ('a and b', ('and', ('cat', 'a'), ('cat', 'b')))
+        ]
+        for expression, tree in checks:
+            if parse(expression) != tree:
+                print(f"[FAIL] '{expression}' parsed as {parse(expression)}")
+                return False
+
+        print("[PASS] Operator precedence and implicit AND")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Parser test error: {e}")
+        return False
+
+def test_boolean_queries():
+    """Test that expressions match a plain Python evaluation"""
+    try:
+        from app import app
+
+        checks = [
+            ('examination AND instructions', lambda c: 'examination' in c and 'instructions' in c),
+            ('examination AND pain_assessment', lambda c: 'examination' in c and 'pain_assessment' in c),
+            ('emergency OR symptoms NOT greeting',
+             lambda c: 'emergency' in c or ('symptoms' in c and 'greeting' not in c)),
+            ('(symptoms OR examination) AND NOT instructions',
+             lambda c: ('symptoms' in c or 'examination' in c) and 'instructions' not in c),
+            ('NOT greeting', lambda c: 'greeting' not in c)
+        ]
+
+        with app.test_client() as client:
+            for expression, predicate in checks:
+                data = client.get(f'/api/phrases/query?q={expression}').get_json()
+                ids = [p['id'] for p in data['phrases']]
+                if ids != expected_ids(predicate) or data['total'] != len(ids):
+                    print(f"[FAIL] '{expression}' returned {ids}")
+                    return False
+
+        print(f"[PASS] {len(checks)} boolean category expressions")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Boolean query test error: {e}")
+        return False
+
+def test_query_errors():
+    """Test malformed expressions and unknown categories return 400"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            # Over-deep, over-long and over-wide expressions are malformed too, not a RecursionError
+            too_big = ['(' * 5000 + 'emergency' + ')' * 5000, 'NOT ' * 20 + 'emergency',
+                       ' OR '.join(['emergency'] * 40), 'emergency ' * 100]
+            for expression in ['', 'examination AND', '(emergency', 'emergency )', 'no_such_category', 'a!b'] + too_big:
+                response = client.get(f'/api/phrases/query?q={expression}')
+                data = response.get_json()
+                if response.status_code != 400 or data['success'] != False or not data.get('error'):
+                    print(f"[FAIL] '{expression[:40]}' should be 400, got {response.status_code}")
+                    return False
+
+        print("[PASS] Invalid expressions rejected with 400")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Query error test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("CATEGORY QUERY VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Parser Precedence', test_parser_precedence),
+        ('Boolean Queries', test_boolean_queries),
+        ('Query Errors', test_query_errors)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL CATEGORY QUERY TESTS PASSED")
+    else:
+        print("[FAILURE] SOME CATEGORY QUERY TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,206 @@
+"""
+Compact Storage Verification Tests
+Tests the columnar phrase table: round trip to the JSON form, shared
+strings, memory use and API parity with the dict-based catalog
+"""
+
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+URLS = [
+    '/api/categories',
+    '/api/phrases',
+    '/api/phrases?limit=3&langs=en,zu',
+    '/api/phrases/category/emergency',
+    '/api/phrases/query?q=emergency%20OR%20symptoms&fields=text',
+    '/api/phrases/batch?ids=phrase_003,missing,phrase_001',
+    '/api/phrase/phrase_002?langs=xh',
+    '/api/search?q=pain%20where&lang=en,zu',
+    '/api/search?q=sawubona&mode=fuzzy',
+    '/api/autocomplete?q=he&lang=en',
+    '/api/bootstrap'
+]
+
+class CompactApp:
+    """Point the app at a compact catalog loaded from a copy of phrases.json"""
+
+    def __init__(self, app_module):
+        from catalog import CatalogStore
+        from compact import CompactCatalog
+        from serialization import BodyCache
+        self.app_module = app_module
+        # Same digest as the in-memory catalog, so start with an empty body cache
+        self.original_body_cache = app_module.body_cache
+        app_module.body_cache = BodyCache()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmp.name, 'phrases.json')
+        shutil.copyfile(app_module.DATA_FILE, self.json_path)
+        self.original_store = app_module.catalog_store
+        self.store = CatalogStore(self.json_path, self.load, catalog_class=CompactCatalog)
+        app_module.catalog_store = self.store
+
+    def load(self):
+        with open(self.json_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def close(self):
+        self.app_module.catalog_store = self.original_store
+        self.app_module.body_cache = self.original_body_cache
+        self.tmp.cleanup()
+
+def strip_versions(data):
+    if isinstance(data, dict):
+        return {k: strip_versions(v) for k, v in data.items() if k != 'version'}
+    return data
+
+def test_api_parity():
+    """Test that routes answer the same from the compact catalog as from dicts"""
+    try:
+        import app as app_module
+
+        with app_module.app.test_client() as client:
+            expected = [(client.get(url).status_code, strip_versions(client.get(url).get_json())) for url in URLS]
+
+            compact_app = CompactApp(app_module)
+            try:
+                from compact import CompactCatalog
+                if not isinstance(app_module.get_catalog(), CompactCatalog):
+                    print("[FAIL] Compact catalog not in use")
+                    return False
+
+                for url, (status, data) in zip(URLS, expected):
+                    response = client.get(url)
+                    if response.status_code != status or strip_versions(response.get_json()) != data:
+                        print(f"[FAIL] {url} differs between backends")
+                        return False
+            finally:
+                compact_app.close()
+
+        print(f"[PASS] {len(URLS)} requests answered the same from the compact catalog")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Parity test error: {e}")
+        return False
+
+def test_round_trip():
+    """Test that every compact phrase reads back exactly as its JSON dict"""
+    try:
+        from catalog import Catalog
+        from compact import CompactCatalog, CompactPhrase
+
+        with open(os.path.join('data', 'phrases.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        # A phrase with an extra key is kept as-is
+        odd = dict(data['phrases'][0], id='phrase_odd', notes={'reviewed': True})
+        data['phrases'].append(odd)
+
+        reference = Catalog(json.loads(json.dumps(data)))
+        compact = CompactCatalog(data)
+
+        if list(compact.phrases) != reference.phrases or compact.get_phrase('phrase_odd') is not odd:
+            print("[FAIL] Phrases differ from the JSON form")
+            return False
+        if json.dumps(compact.get_phrase('phrase_001')['translations']['zu'], ensure_ascii=False) != \
+                json.dumps(reference.get_phrase('phrase_001')['translations']['zu'], ensure_ascii=False):
+            print("[FAIL] Translation field order not kept")
+            return False
+        if compact.languages != reference.languages or compact.phrase_hashes != reference.phrase_hashes:
+            print("[FAIL] Languages or content hashes differ")
+            return False
+        for category_id, phrases in reference.by_category.items():
+            if compact.get_category_phrases(category_id) != phrases:
+                print(f"[FAIL] Category {category_id} differs")
+                return False
+
+        first = compact.phrases[0]
+        shared = {}
+        for categories in compact.table.categories:
+            if shared.setdefault(categories, categories) is not categories:
+                print("[FAIL] Equal category lists are not shared")
+                return False
+        if not isinstance(first, CompactPhrase) or compact.table.shapes[0] is not compact.table.shapes[1]:
+            print("[FAIL] Layouts are not shared between phrases")
+            return False
+        if compact.get_phrase('missing') is not None or 'xx' in first['translations']:
+            print("[FAIL] Missing lookups should behave like dicts")
+            return False
+
+        print(f"[PASS] {len(reference.phrases)} phrases read back identically")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Round-trip test error: {e}")
+        return False
+
+def test_smaller_than_dicts():
+    """Test that the phrase table uses far less memory than the parsed dicts"""
+    try:
+        from bench_common import make_catalog_data
+        from compact import PhraseTable
+
+        text = json.dumps(make_catalog_data(2000), ensure_ascii=False)
+
+        def traced(build):
+            gc.collect()
+            tracemalloc.start()
+            result = build()
+            gc.collect()
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            return result, size
+
+        phrases, dict_bytes = traced(lambda: json.loads(text)['phrases'])
+        table, table_bytes = traced(lambda: PhraseTable(json.loads(text)['phrases']))
+
+        if table_bytes * 2 > dict_bytes:
+            print(f"[FAIL] Table is {table_bytes} bytes vs {dict_bytes} for dicts")
+            return False
+
+        print(f"[PASS] {table_bytes // len(table)} vs {dict_bytes // len(phrases)} bytes per phrase")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Memory test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("COMPACT STORAGE VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('API Parity', test_api_parity),
+        ('Round Trip', test_round_trip),
+        ('Smaller Than Dicts', test_smaller_than_dicts)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL COMPACT STORAGE TESTS PASSED")
+    else:
+        print("[FAILURE] SOME COMPACT STORAGE TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
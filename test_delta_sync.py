@@ -0,0 +1,261 @@
+"""
+Delta Sync Verification Tests
+Tests per-phrase hashes, change history and the /api/changes endpoint
+"""
+
+import copy
+import json
+import os
+import sys
+import tempfile
+
+class TempCatalog:
+    """Point the app at a temporary copy of phrases.json that tests can edit"""
+
+    def __init__(self, app_module, history_size=50):
+        from catalog import CatalogStore
+        self.app_module = app_module
+        self.data = copy.deepcopy(app_module.load_phrases_data())
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'phrases.json')
+        self.write()
+        self.original_store = app_module.catalog_store
+        app_module.catalog_store = CatalogStore(self.path, self.load, history_size=history_size)
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write(self):
+        mtime = os.stat(self.path).st_mtime_ns if os.path.exists(self.path) else 0
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+        os.utime(self.path, ns=(0, max(mtime + 1_000_000, os.stat(self.path).st_mtime_ns)))
+
+    def close(self):
+        self.app_module.catalog_store = self.original_store
+        self.tmp.cleanup()
+
+def test_no_changes_at_current_version():
+    """Test that asking from the current version returns empty change lists"""
+    try:
+        import app as app_module
+        temp = TempCatalog(app_module)
+        try:
+            with app_module.app.test_client() as client:
+                listing = client.get('/api/phrases').get_json()
+                data = client.get(f"/api/changes?digest={listing['catalog_version']}").get_json()
+
+                if data['digest'] != listing['catalog_version']:
+                    print("[FAIL] Catalog changed without a reload")
+                    return False
+
+                if 'version' in data:
+                    print("[FAIL] Per-process version number exposed to clients")
+                    return False
+
+                for kind in ['phrases', 'categories']:
+                    if any(data[kind].values()):
+                        print(f"[FAIL] Unexpected {kind} changes: {data[kind]}")
+                        return False
+        finally:
+            temp.close()
+
+        print("[PASS] No changes reported at the current version")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Current version test error: {e}")
+        return False
+
+def test_changes_across_reloads():
+    """Test added/modified/deleted phrases and categories merged over two reloads"""
+    try:
+        import app as app_module
+        temp = TempCatalog(app_module)
+        try:
+            with app_module.app.test_client() as client:
+                listing = client.get('/api/phrases').get_json()
+                start_digest = listing['catalog_version']
+                old_hash = app_module.catalog_store.get().phrase_hashes['phrase_001']
+
+                # Reload 1: fix a translation, delete a phrase, add two phrases and a category
+                phrases = temp.data['phrases']
+                phrases[0]['translations']['zu']['text'] = 'Sawubona (fixed)'
+                deleted = phrases.pop()['id']
+                for new_id in ['phrase_new_a', 'phrase_new_b']:
+                    extra = copy.deepcopy(phrases[1])
+                    extra['id'] = new_id
+                    phrases.append(extra)
+                temp.data['categories'].append({'id': 'new_category', 'name': 'New'})
+                temp.write()
+                middle_digest = client.get('/api/phrases').get_json()['catalog_version']
+
+                # Reload 2: edit one of the new phrases, drop the other again
+                phrases[-2]['translations']['en']['text'] = 'Edited'
+                phrases.pop()
+                temp.write()
+
+                data = client.get(f'/api/changes?digest={start_digest}&langs=zu').get_json()
+
+                if data['digest'] != app_module.catalog_store.get().digest or data['digest'] == start_digest:
+                    print(f"[FAIL] Expected the current digest, got {data['digest']}")
+                    return False
+
+                added = [p['id'] for p in data['phrases']['added']]
+                modified = [p['id'] for p in data['phrases']['modified']]
+                if added != ['phrase_new_a'] or modified != ['phrase_001'] or data['phrases']['deleted'] != [deleted]:
+                    print(f"[FAIL] Wrong phrase changes: {added} / {modified} / {data['phrases']['deleted']}")
+                    return False
+
+                if data['phrases']['modified'][0]['translations'] != {'zu': phrases[0]['translations']['zu']}:
+                    print("[FAIL] Projection not applied to changed phrases")
+                    return False
+
+                if [c['id'] for c in data['categories']['added']] != ['new_category']:
+                    print(f"[FAIL] Wrong category changes: {data['categories']}")
+                    return False
+
+                if set(data['hashes']) != {'phrase_new_a', 'phrase_001'} or data['hashes']['phrase_001'] == old_hash:
+                    print(f"[FAIL] Wrong content hashes: {data['hashes']}")
+                    return False
+
+                # Asking from the intermediate catalog only shows the second reload
+                data = client.get(f'/api/changes?digest={middle_digest}').get_json()
+                if [p['id'] for p in data['phrases']['modified']] != ['phrase_new_a'] or data['phrases']['deleted'] != ['phrase_new_b']:
+                    print(f"[FAIL] Wrong changes from intermediate version: {data['phrases']}")
+                    return False
+        finally:
+            temp.close()
+
+        print("[PASS] Changes merged correctly across reloads")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Reload changes test error: {e}")
+        return False
+
+def test_expired_and_invalid_versions():
+    """Test 410 for digests outside the bounded history and 400 without a digest"""
+    try:
+        import app as app_module
+        temp = TempCatalog(app_module, history_size=2)
+        try:
+            with app_module.app.test_client() as client:
+                digests = [client.get('/api/phrases').get_json()['catalog_version']]
+                for i in range(3):
+                    temp.data['phrases'][0]['translations']['en']['text'] = f'Hello {i}'
+                    temp.write()
+                    digests.append(client.get('/api/phrases').get_json()['catalog_version'])
+
+                if len(app_module.catalog_store.history) != 2:
+                    print("[FAIL] History not bounded")
+                    return False
+
+                checks = [
+                    (f'/api/changes?digest={digests[0]}', 410),
+                    (f'/api/changes?digest={digests[1]}', 200),
+                    (f'/api/changes?digest={digests[3]}', 200),
+                    ('/api/changes?digest=0123456789abcdef', 410),
+                    ('/api/changes?since=1', 400),
+                    ('/api/changes', 400)
+                ]
+                for url, expected in checks:
+                    response = client.get(url)
+                    if response.status_code != expected:
+                        print(f"[FAIL] {url} returned {response.status_code}, expected {expected}")
+                        return False
+        finally:
+            temp.close()
+
+        print("[PASS] Expired, unknown and missing digests rejected")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Expired version test error: {e}")
+        return False
+
+def test_changes_from_another_worker():
+    """Test that a digest seen on one worker gives the right changes on a worker that numbers versions differently"""
+    try:
+        import app as app_module
+        from catalog import CatalogStore
+        temp = TempCatalog(app_module)
+        try:
+            with app_module.app.test_client() as client:
+                # This worker has reloaded twice before the client's first visit
+                for text in ['Hello once', 'Hello twice']:
+                    temp.data['phrases'][1]['translations']['en']['text'] = text
+                    temp.write()
+                    client.get('/api/phrases')
+                seen_here = client.get('/api/phrases').get_json()
+
+                # A worker started just now sees the same data as version 1
+                other = CatalogStore(temp.path, temp.load)
+                if other.get().version == app_module.catalog_store.get().version or \
+                        other.get().digest != seen_here['catalog_version']:
+                    print("[FAIL] Workers should number the same data differently")
+                    return False
+
+                temp.data['phrases'][2]['translations']['en']['text'] = 'Edited after the visit'
+                temp.write()
+                original = app_module.catalog_store
+                app_module.catalog_store = other
+                try:
+                    data = client.get(f"/api/changes?digest={seen_here['catalog_version']}").get_json()
+                    version_only = client.get(f"/api/changes?since={other.get().version}")
+                finally:
+                    app_module.catalog_store = original
+
+                modified = [p['id'] for p in data['phrases']['modified']]
+                if modified != [temp.data['phrases'][2]['id']] or data['phrases']['added'] or data['phrases']['deleted']:
+                    print(f"[FAIL] Wrong changes on the other worker: {data['phrases']}")
+                    return False
+                if version_only.status_code != 400:
+                    print(f"[FAIL] Version without a digest answered {version_only.status_code}")
+                    return False
+        finally:
+            temp.close()
+
+        print("[PASS] Digest gives the same changes on a worker with other version numbers")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Cross-worker test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("DELTA SYNC VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('No Changes At Current Version', test_no_changes_at_current_version),
+        ('Changes Across Reloads', test_changes_across_reloads),
+        ('Expired And Invalid Versions', test_expired_and_invalid_versions),
+        ('Changes From Another Worker', test_changes_from_another_worker)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL DELTA SYNC TESTS PASSED")
+    else:
+        print("[FAILURE] SOME DELTA SYNC TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,351 @@
+"""
+Incremental Reload Verification Tests
+Tests that small catalog edits patch the previous catalog's indexes,
+giving the same results as a full rebuild, and drop stale audio clips
+"""
+
+import copy
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+SEARCH_QUERIES = ['hurt', 'where does it hurt', 'sawubona', 'breathe', 'emergency quickly', 'extra words']
+FUZZY_QUERIES = ['sawubona', 'hurts', 'sah woo bona', 'brethe', 'emergancy', 'examin']
+CATEGORY_QUERIES = ['emergency', 'symptoms OR greeting', 'NOT emergency', 'examination AND NOT symptoms']
+
+def edited(data):
+    """Edit, delete, add and move a few phrases (under the incremental threshold)"""
+    data = copy.deepcopy(data)
+    phrases = data['phrases']
+    phrases[3]['translations']['en']['text'] = 'Where exactly does it hurt today?'
+    phrases[10]['translations']['zu']['text'] = 'Sawubona kakhulu'
+    phrases[20]['categories'] = ['emergency']
+    del phrases[40]
+    del phrases[7]
+    added = copy.deepcopy(phrases[0])
+    added['id'] = 'phrase_added'
+    added['translations']['en']['text'] = 'Please breathe slowly into the extra mask'
+    phrases.insert(5, added)
+    phrases.append(phrases.pop(50))
+    return data
+
+def catalogs(n=300):
+    """(patched catalog, fully rebuilt catalog) for the same edited data"""
+    import app  # noqa: F401 - registers every index with the catalog
+    from bench_common import make_catalog_data
+    from catalog import Catalog
+
+    data = make_catalog_data(n)
+    old = Catalog(copy.deepcopy(data)).build_indexes()
+    new_data = edited(data)
+    patched = Catalog(copy.deepcopy(new_data))
+    if not patched.patch_indexes(old):
+        raise AssertionError('Small edit was not patched')
+    return patched, Catalog(new_data).build_indexes()
+
+def test_patched_indexes_match_rebuild():
+    """Test that patched search, fuzzy and category indexes answer like rebuilt ones"""
+    try:
+        from category_query import parse
+        patched, rebuilt = catalogs()
+
+        for query in SEARCH_QUERIES:
+            for languages in [None, ['en'], ['zu', 'xh']]:
+                got = patched.index('search').search(query, languages, ['emergency', 'symptoms'] if languages else None)
+                want = rebuilt.index('search').search(query, languages, ['emergency', 'symptoms'] if languages else None)
+                if got != want:
+                    print(f"[FAIL] Search '{query}' ({languages}) differs: {got[:2]} vs {want[:2]}")
+                    return False
+
+        for query in FUZZY_QUERIES:
+            if patched.index('fuzzy').search(query, limit=50) != rebuilt.index('fuzzy').search(query, limit=50):
+                print(f"[FAIL] Fuzzy search '{query}' differs")
+                return False
+
+        for query in CATEGORY_QUERIES:
+            tree = parse(query)
+            if not (patched.index('category_bits').evaluate(tree) == rebuilt.index('category_bits').evaluate(tree)).all():
+                print(f"[FAIL] Category query '{query}' differs")
+                return False
+
+        # Same postings, whatever their order
+        for name, tokens, docs, offsets in [('search', 'tokens', 'all_docs', 'offsets'),
+                                            ('fuzzy', 'terms', 'term_docs', 'term_offsets')]:
+            def postings(index):
+                keys, flat, bounds = getattr(index, tokens), getattr(index, docs), getattr(index, offsets)
+                return {key: sorted(flat[bounds[i]:bounds[i + 1]].tolist()) for i, key in enumerate(keys)}
+            if postings(patched.index(name)) != postings(rebuilt.index(name)):
+                print(f"[FAIL] {name} postings differ from a rebuild")
+                return False
+
+        print(f"[PASS] {len(SEARCH_QUERIES) * 3 + len(FUZZY_QUERIES) + len(CATEGORY_QUERIES)} queries match a full rebuild")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Patched index test error: {e}")
+        return False
+
+class TempStore:
+    """A CatalogStore over a temporary JSON file that tests can rewrite"""
+
+    def __init__(self, data):
+        from catalog import CatalogStore
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'phrases.json')
+        self.write(data)
+        self.store = CatalogStore(self.path, self.load)
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write(self, data):
+        mtime = os.stat(self.path).st_mtime_ns if os.path.exists(self.path) else 0
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.utime(self.path, ns=(0, max(mtime + 1_000_000, os.stat(self.path).st_mtime_ns)))
+
+    def close(self):
+        self.tmp.cleanup()
+
+def test_store_patches_small_reloads():
+    """Test that the store patches small edits and rebuilds large or structural ones"""
+    try:
+        import app  # noqa: F401
+        from bench_common import make_catalog_data
+
+        data = make_catalog_data(100)
+        temp = TempStore(data)
+        try:
+            first = temp.store.get()
+            if first.incremental:
+                print("[FAIL] First load cannot be incremental")
+                return False
+
+            data['phrases'][0]['translations']['en']['text'] = 'Good morning'
+            temp.write(data)
+            second = temp.store.get()
+            record = temp.store.history[-1]
+            if not second.incremental or not record['incremental'] or record['load_ms'] is None:
+                print(f"[FAIL] One-phrase edit should be patched: {record}")
+                return False
+            if second.index('search').search('morning')[1][0][0] != data['phrases'][0]['id']:
+                print("[FAIL] Patched search index misses the edit")
+                return False
+
+            # A quarter of the phrases changed - rebuilt
+            for phrase in data['phrases'][:25]:
+                phrase['translations']['en']['text'] += ' now'
+            temp.write(data)
+            if temp.store.get().incremental:
+                print("[FAIL] Large edit should rebuild")
+                return False
+
+            # Categories changed - rebuilt
+            data['categories'][0]['name'] = 'Renamed'
+            temp.write(data)
+            if temp.store.get().incremental:
+                print("[FAIL] Category edit should rebuild")
+                return False
+
+            # Untouched old catalogs keep answering from their own indexes
+            if first.index('search').search('morning')[0] != 0:
+                print("[FAIL] Patching changed the previous catalog's index")
+                return False
+        finally:
+            temp.close()
+
+        print("[PASS] Small edits patched, large and category edits rebuilt")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Store test error: {e}")
+        return False
+
+def test_stale_clips_dropped():
+    """Test that reloads drop cached clips of edited and deleted phrases only"""
+    try:
+        from audio import AudioCache, AudioService
+        from bench_common import make_catalog_data
+
+        data = make_catalog_data(100)
+        temp = TempStore(data)
+        try:
+            service = AudioService(cache=AudioCache(), synthesizer=lambda text, lang: text.encode('utf-8'))
+            temp.store.listeners.append(lambda old, new, record: service.forget_changed(old, new, record['phrases']))
+
+            catalog = temp.store.get()
+            clips = [(phrase_id, language) for phrase_id in ['phrase_000001', 'phrase_000002', 'phrase_000003', 'phrase_000004']
+                     for language in ['en', 'zu']]
+            for phrase_id, language in clips:
+                service.get_clip(catalog.get_phrase(phrase_id), language)
+
+            data['phrases'][0]['translations']['en']['text'] = 'Good morning'  # en clip stale, zu kept
+            data['phrases'][1]['categories'] = ['emergency']                    # text unchanged - kept
+            del data['phrases'][2]                                              # both clips dropped
+            temp.write(data)
+            catalog = temp.store.get()
+
+            if len(service.cache) != 5:
+                print(f"[FAIL] Expected 5 clips left, got {len(service.cache)}")
+                return False
+            if not service.is_cached(catalog.get_phrase('phrase_000001'), 'zu') or \
+                    service.is_cached(catalog.get_phrase('phrase_000001'), 'en') or \
+                    not service.is_cached(catalog.get_phrase('phrase_000002'), 'en'):
+                print("[FAIL] Wrong clips dropped")
+                return False
+        finally:
+            temp.close()
+
+        print("[PASS] Stale clips dropped on reload, unchanged ones kept")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Audio cache test error: {e}")
+        return False
+
+def test_slow_reload_does_not_block():
+    """Test that requests keep getting the previous catalog while a slow reload builds"""
+    try:
+        import app  # noqa: F401
+        from bench_common import make_catalog_data
+
+        data = make_catalog_data(100)
+        temp = TempStore(data)
+        loader = temp.store.loader
+        release = threading.Event()
+
+        def slow_loader():
+            release.wait(10)  # stands in for rebuilding every index of a large catalog
+            return loader()
+
+        try:
+            first = temp.store.get()
+            temp.store.loader = slow_loader
+            temp.store.reload_wait = 0.2
+            data['phrases'][0]['translations']['en']['text'] = 'Good morning'
+            temp.write(data)
+
+            start = time.perf_counter()
+            noticed = temp.store.get()
+            noticed_in = time.perf_counter() - start
+            # Other requests meanwhile: no waiting at all
+            start = time.perf_counter()
+            others = [temp.store.get() for _ in range(20)]
+            others_in = time.perf_counter() - start
+
+            if noticed is not first or any(other is not first for other in others):
+                print("[FAIL] Previous catalog not served during the reload")
+                return False
+            if noticed_in > 1.0 or others_in > 0.1:
+                print(f"[FAIL] Requests blocked on the reload: {noticed_in:.2f}s, {others_in:.2f}s")
+                return False
+
+            release.set()
+            temp.store._reloader.join(10)
+            current = temp.store.get()
+            if current is first or current.get_phrase(data['phrases'][0]['id'])['translations']['en']['text'] != 'Good morning':
+                print("[FAIL] Reloaded catalog not swapped in")
+                return False
+        finally:
+            release.set()
+            temp.close()
+
+        print(f"[PASS] Slow reload: noticing request waited {noticed_in:.2f}s, "
+              f"20 others {others_in * 1000:.1f} ms, new catalog swapped in after")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Slow reload test error: {e}")
+        return False
+
+def test_invalid_file_keeps_catalog():
+    """Test that a truncated or invalid phrases.json leaves the live catalog, history and clips alone"""
+    try:
+        import app as app_module
+        from bench_common import make_catalog_data
+
+        data = make_catalog_data(100)
+        temp = TempStore(data)
+        original_file = app_module.DATA_FILE
+        app_module.DATA_FILE = temp.path
+        try:
+            # The app's own loader, as used by the memory and compact backends
+            temp.store.loader = app_module.load_phrases_data
+            calls = []
+            temp.store.listeners.append(lambda old, new, record: calls.append(record))
+            first = temp.store.get()
+
+            text = json.dumps(data)
+            mtime = os.stat(temp.path).st_mtime_ns
+            for bad in [text[:len(text) // 2], json.dumps({'phrases': []}), json.dumps({'categories': [], 'phrases': [{}]})]:
+                with open(temp.path, 'w', encoding='utf-8') as f:
+                    f.write(bad)
+                mtime += 1_000_000
+                os.utime(temp.path, ns=(0, mtime))
+                if temp.store.reload() is not first or temp.store.get() is not first:
+                    print(f"[FAIL] Invalid file replaced the catalog: {bad[:40]!r}")
+                    return False
+                if calls or temp.store.history or not temp.store.load_error:
+                    print(f"[FAIL] Failed load recorded as a change ({len(calls)} listener calls, "
+                          f"{len(temp.store.history)} records, error {temp.store.load_error!r})")
+                    return False
+
+            data['phrases'][0]['translations']['en']['text'] = 'Good morning'
+            temp.write(data)
+            current = temp.store.reload()
+            if current is first or temp.store.load_error or len(calls) != 1:
+                print("[FAIL] Fixed file not loaded after the failures")
+                return False
+            if calls[0]['phrases']['deleted'] or calls[0]['phrases']['modified'] != [data['phrases'][0]['id']]:
+                print(f"[FAIL] Change record after recovery: {calls[0]['phrases']}")
+                return False
+        finally:
+            app_module.DATA_FILE = original_file
+            temp.close()
+
+        print("[PASS] Truncated and invalid files keep the previous catalog, no changes recorded")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Invalid file test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("INCREMENTAL RELOAD VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Patched Indexes Match Rebuild', test_patched_indexes_match_rebuild),
+        ('Store Patches Small Reloads', test_store_patches_small_reloads),
+        ('Stale Clips Dropped', test_stale_clips_dropped),
+        ('Slow Reload Does Not Block', test_slow_reload_does_not_block),
+        ('Invalid File Keeps Catalog', test_invalid_file_keeps_catalog)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL INCREMENTAL RELOAD TESTS PASSED")
+    else:
+        print("[FAILURE] SOME INCREMENTAL RELOAD TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
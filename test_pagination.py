@@ -0,0 +1,167 @@
+"""
+Pagination Verification Tests
+Tests limit/cursor pagination on the phrase list endpoints
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+def walk(client, url):
+    """Follow 'next' links from url, returning (phrase IDs, pages)"""
+    ids = []
+    pages = 0
+    while url:
+        data = client.get(url).get_json()
+        ids.extend(p['id'] for p in data['phrases'])
+        url = data['next']
+        pages += 1
+    return ids, pages
+
+def test_unpaginated_unchanged():
+    """Test that requests without limit/cursor still return everything"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            data = client.get('/api/phrases').get_json()
+            if data['total'] != len(data['phrases']) or 'next' in data:
+                print("[FAIL] Unpaginated response changed shape")
+                return False
+
+        print("[PASS] Unpaginated responses unchanged")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Unpaginated test error: {e}")
+        return False
+
+def test_page_walk():
+    """Test that following next links returns every phrase exactly once"""
+    try:
+        from app import app, load_phrases_data
+        expected = [p['id'] for p in load_phrases_data()['phrases']]
+
+        with app.test_client() as client:
+            first = client.get('/api/phrases?limit=3').get_json()
+            if len(first['phrases']) != 3 or first['total'] != len(expected) or not first['next_cursor']:
+                print("[FAIL] First page malformed")
+                return False
+
+            ids, pages = walk(client, '/api/phrases?limit=3')
+            if ids != expected or pages != -(-len(expected) // 3):
+                print(f"[FAIL] Page walk returned {ids} in {pages} pages")
+                return False
+
+            ids, _ = walk(client, '/api/phrases/category/instructions?limit=1')
+            category_ids = [p['id'] for p in load_phrases_data()['phrases'] if 'instructions' in p['categories']]
+            if ids != category_ids:
+                print(f"[FAIL] Category page walk returned {ids}")
+                return False
+
+        print("[PASS] Page walks return every phrase exactly once")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Page walk test error: {e}")
+        return False
+
+def test_invalid_cursor():
+    """Test malformed cursors return 400"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            response = client.get('/api/phrases?cursor=not-a-cursor')
+            if response.status_code != 400 or response.get_json()['success'] != False:
+                print(f"[FAIL] Bad cursor should be 400, got {response.status_code}")
+                return False
+
+        print("[PASS] Invalid cursor rejected")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Invalid cursor test error: {e}")
+        return False
+
+def test_cursor_rejected_after_reload():
+    """Test that cursors from an older catalog version return 409"""
+    try:
+        import app as app_module
+        from catalog import CatalogStore
+
+        data = app_module.load_phrases_data()
+        original_store = app_module.catalog_store
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'phrases.json')
+
+            def loader():
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            app_module.catalog_store = CatalogStore(path, loader)
+
+            try:
+                with app_module.app.test_client() as client:
+                    first = client.get('/api/phrases?limit=2').get_json()
+
+                    data['phrases'].pop()
+                    with open(path, 'w', encoding='utf-8') as f:
+                        json.dump(data, f)
+                    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+
+                    response = client.get(first['next'])
+                    if response.status_code != 409:
+                        print(f"[FAIL] Stale cursor should be 409, got {response.status_code}")
+                        return False
+                    if response.get_json()['catalog_version'] == first['catalog_version']:
+                        print("[FAIL] 409 should report the new catalog version")
+                        return False
+            finally:
+                app_module.catalog_store = original_store
+
+        print("[PASS] Stale cursors rejected after catalog reload")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Reload cursor test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("PAGINATION VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Unpaginated Unchanged', test_unpaginated_unchanged),
+        ('Page Walk', test_page_walk),
+        ('Invalid Cursor', test_invalid_cursor),
+        ('Cursor After Reload', test_cursor_rejected_after_reload)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL PAGINATION TESTS PASSED")
+    else:
+        print("[FAILURE] SOME PAGINATION TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
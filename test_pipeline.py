@@ -0,0 +1,307 @@
+"""
+Build Pipeline Verification Tests
+Tests the catalog build: schema checks, text normalization, versioned
+build directories and serving a build's prebuilt artifacts
+"""
+
+import copy
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+URLS = ['/api/categories', '/api/phrases', '/api/bootstrap', '/api/phrases/category/emergency']
+
+def load_data():
+    with open(os.path.join('data', 'phrases.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+def test_schema_and_normalization():
+    """Test that the schema rejects incomplete phrases and text is normalized"""
+    try:
+        from catalog import CatalogValidationError
+        from pipeline import check_schema, normalize_catalog
+
+        data = load_data()
+        broken = copy.deepcopy(data)
+        broken['phrases'][0]['translations']['zu']['text'] = 'TODO'
+        del broken['phrases'][1]['translations']['xh']
+        broken['phrases'][2]['translations']['en']['notes'] = 'check this'
+        broken['phrases'][3]['id'] = 'Phrase 4'
+        broken['phrases'][4]['categories'] = []
+        try:
+            check_schema(broken)
+            print("[FAIL] Broken catalog passed the schema")
+            return False
+        except CatalogValidationError as e:
+            message = str(e)
+        for expected in ["'phrase_001' zu has empty or placeholder text", "'phrase_002' is missing 'xh'",
+                         "unknown field 'notes'", "'Phrase 4' id is not a lowercase slug", "has no categories"]:
+            if expected not in message:
+                print(f"[FAIL] Schema error missing {expected!r}: {message}")
+                return False
+
+        messy = copy.deepcopy(data)
+        messy['phrases'][0]['translations']['af']['text'] = '  Hallo,\n hoe   gaan dit?  '
+        messy['categories'][0]['name'] = 'Gréetings'  # combining accent
+        normalized, changed = normalize_catalog(messy)
+        if changed != 2 or normalized['phrases'][0]['translations']['af']['text'] != 'Hallo, hoe gaan dit?' \
+                or normalized['categories'][0]['name'] != 'Gréetings':
+            print(f"[FAIL] Text not normalized ({changed} changed)")
+            return False
+        if messy['phrases'][0]['translations']['af']['text'].startswith('Hallo'):
+            print("[FAIL] Normalization changed its input")
+            return False
+
+        check_schema(data)
+        print("[PASS] Schema problems reported together, text normalized")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Schema test error: {e}")
+        return False
+
+def test_versioned_builds():
+    """Test build directories, the current link, reuse, pruning and failed builds"""
+    try:
+        from catalog import CatalogValidationError
+        from pipeline import build_catalog, current_build
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'phrases.json')
+            root = os.path.join(tmp, 'build')
+            data = load_data()
+            write_json(json_path, data)
+
+            first = build_catalog(json_path, root)
+            build_dir = os.path.join(root, first['digest'])
+            expected = {'phrases.json', 'phrases.snapshot', 'phrases.db', 'audio_manifest.json',
+                        'bodies/index.json', 'shards/core.json', f"shards/{first['digest']}/zu.json"}
+            if current_build(root) != first['digest'] or not expected <= set(first['artifacts']):
+                print(f"[FAIL] Unexpected build: {current_build(root)}, {sorted(first['artifacts'])[:8]}")
+                return False
+            with open(os.path.join(build_dir, 'audio_manifest.json'), encoding='utf-8') as f:
+                clips = json.load(f)['clips']
+            if len(clips) != sum(len(p['translations']) for p in data['phrases']):
+                print("[FAIL] Audio manifest does not list every clip")
+                return False
+
+            if not build_catalog(json_path, root)['reused']:
+                print("[FAIL] Unchanged data was built again")
+                return False
+
+            data['phrases'][0]['translations']['en']['text'] = 'Good morning'
+            write_json(json_path, data)
+            second = build_catalog(json_path, root, keep=1)
+            if current_build(root) != second['digest'] or second['pruned'] != [first['digest']]:
+                print(f"[FAIL] Expected {first['digest']} pruned, got {second['pruned']}")
+                return False
+
+            data['phrases'][0]['translations']['en']['text'] = ''
+            write_json(json_path, data)
+            try:
+                build_catalog(json_path, root)
+                print("[FAIL] Invalid data was built")
+                return False
+            except CatalogValidationError:
+                pass
+            if current_build(root) != second['digest'] or sorted(os.listdir(root)) != sorted([second['digest'], 'current']):
+                print(f"[FAIL] Failed build touched the build root: {os.listdir(root)}")
+                return False
+
+        print("[PASS] Builds versioned by digest, reused, pruned; failures leave current alone")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Versioned build test error: {e}")
+        return False
+
+def test_concepts_in_build():
+    """Test that concepts.json is copied into the build and an edit to it makes a new build"""
+    try:
+        import shutil
+        import semantic
+        from pipeline import build_catalog, current_build
+        from snapshot import SnapshotFile
+
+        served_concepts = semantic.CONCEPTS_FILE
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'phrases.json')
+            concepts_path = os.path.join(tmp, 'concepts.json')
+            root = os.path.join(tmp, 'build')
+            write_json(json_path, load_data())
+            shutil.copyfile(os.path.join('data', 'concepts.json'), concepts_path)
+
+            first = build_catalog(json_path, root)
+            with open(concepts_path, 'r', encoding='utf-8') as f:
+                concepts = json.load(f)
+            concepts['concepts']['examine'].append('stethoscope')
+            write_json(concepts_path, concepts)
+            second = build_catalog(json_path, root)
+
+            if first['build'] == first['digest'] or 'concepts.json' not in first['artifacts']:
+                print(f"[FAIL] Concepts not part of the build: {first['build']}")
+                return False
+            if second['reused'] or second['digest'] != first['digest'] or second['build'] == first['build'] \
+                    or current_build(root) != second['build']:
+                print(f"[FAIL] Concepts edit did not publish a new build: {second['build']}")
+                return False
+            _, indexes = SnapshotFile(os.path.join(root, second['build'], 'phrases.snapshot')).load()
+            if not indexes['semantic'].search('stethoscope') or semantic.CONCEPTS_FILE != served_concepts:
+                print("[FAIL] Build not indexed with its own concepts")
+                return False
+
+        print(f"[PASS] Concepts edit built and published {second['build']} for catalog {second['digest']}")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Concepts build test error: {e}")
+        return False
+
+SERVE_SCRIPT = '''
+import json, sys
+import app
+with app.app.test_client() as client:
+    bodies = {url: client.get(url).get_json() for url in sys.argv[1:]}
+    ready = client.get('/api/ready').get_json()
+print(json.dumps({'data_file': app.DATA_FILE, 'bodies': bodies, 'catalog': ready['catalog'],
+                  'prebuilt': ready['prebuilt_bodies']}))
+'''
+
+def test_app_serves_build():
+    """Test that the app serves a published build's snapshot and prebuilt bodies"""
+    try:
+        from pipeline import build_catalog
+
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = build_catalog(os.path.join('data', 'phrases.json'), tmp)
+            env = dict(os.environ, CATALOG_BUILD=os.path.join(tmp, 'current'))
+            env.pop('CATALOG_SNAPSHOT', None)
+            result = subprocess.run([sys.executable, '-c', SERVE_SCRIPT] + URLS,
+                                    env=env, capture_output=True, text=True, timeout=120)
+            if result.returncode != 0:
+                print(f"[FAIL] App failed to serve the build: {result.stderr[-300:]}")
+                return False
+            served = json.loads(result.stdout.strip().splitlines()[-1])
+
+            if served['catalog']['source'] != 'snapshot' or served['catalog']['digest'] != manifest['digest']:
+                print(f"[FAIL] Build snapshot not loaded: {served['catalog']}")
+                return False
+            if served['prebuilt']['served'] != len(URLS):
+                print(f"[FAIL] Expected {len(URLS)} prebuilt bodies served: {served['prebuilt']}")
+                return False
+
+        import app
+        with app.app.test_client() as client:
+            for url in URLS:
+                expected = client.get(url).get_json()
+                got = served['bodies'][url]
+                for body in (expected, got):
+                    body.pop('catalog_version', None)
+                if got != expected:
+                    print(f"[FAIL] {url} differs between the build and data/phrases.json")
+                    return False
+
+        print(f"[PASS] Build served from its snapshot with {len(URLS)} prebuilt bodies")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Serve test error: {e}")
+        return False
+
+SWITCH_SCRIPT = '''
+import json, sys
+import app
+from pipeline import build_catalog
+json_path, root, urls = sys.argv[1], sys.argv[2], sys.argv[3:]
+with app.app.test_client() as client:
+    for url in urls:
+        client.get(url)
+    before = client.get('/api/ready').get_json()['prebuilt_bodies']['served']
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['phrases'][0]['translations']['en']['text'] = 'Good morning'
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    build_catalog(json_path, root)
+    app.catalog_store.reload()
+    bodies = {url: client.get(url).get_json() for url in urls}
+    ready = client.get('/api/ready').get_json()
+print(json.dumps({'before': before, 'after': ready['prebuilt_bodies']['served'], 'version': ready['catalog']['version'],
+                  'text': bodies['/api/phrases']['phrases'][0]['translations']['en']['text']}))
+'''
+
+def test_new_build_served_prebuilt():
+    """Test that a worker switching to a newly published build serves its prebuilt bodies too"""
+    try:
+        import shutil
+        from pipeline import build_catalog
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'phrases.json')
+            shutil.copyfile(os.path.join('data', 'phrases.json'), json_path)
+            root = os.path.join(tmp, 'build')
+            build_catalog(json_path, root)
+            env = dict(os.environ, CATALOG_BUILD=os.path.join(root, 'current'))
+            env.pop('CATALOG_SNAPSHOT', None)
+            result = subprocess.run([sys.executable, '-c', SWITCH_SCRIPT, json_path, root] + URLS,
+                                    env=env, capture_output=True, text=True, timeout=120)
+            if result.returncode != 0:
+                print(f"[FAIL] App failed to switch builds: {result.stderr[-300:]}")
+                return False
+            switched = json.loads(result.stdout.strip().splitlines()[-1])
+
+        if switched['version'] != 2 or switched['text'] != 'Good morning':
+            print(f"[FAIL] New build not loaded: {switched}")
+            return False
+        if switched['before'] != len(URLS) or switched['after'] != 2 * len(URLS):
+            print(f"[FAIL] Prebuilt bodies not served after the reload: {switched}")
+            return False
+
+        print(f"[PASS] Worker at version {switched['version']} serves the new build's prebuilt bodies")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Build switch test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("BUILD PIPELINE VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Schema And Normalization', test_schema_and_normalization),
+        ('Versioned Builds', test_versioned_builds),
+        ('Concepts In Build', test_concepts_in_build),
+        ('App Serves Build', test_app_serves_build),
+        ('New Build Served Prebuilt', test_new_build_served_prebuilt)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL BUILD PIPELINE TESTS PASSED")
+    else:
+        print("[FAILURE] SOME BUILD PIPELINE TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,218 @@
+"""
+Preload Verification Tests
+Tests the production WSGI entry point: everything loaded before the fork,
+frozen out of the garbage collector, and served by forked workers
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PRELOAD_SCRIPT = '''
+import gc, json, os, time
+import wsgi
+import app
+
+catalog = app.catalog_store.get()
+state = {
+    'frozen': gc.get_freeze_count(),
+    'loaded': app.catalog_store.loaded,
+    'indexes': sorted(catalog.indexes),
+    'hashes': catalog._phrase_hashes is not None,
+    'warmup_started': app.warmup_state['started'],
+    'warmup_done': app.warmup_state['done'],
+    'bodies': len(app.body_cache),
+    'gc_enabled': gc.isenabled()
+}
+
+read_fd, write_fd = os.pipe()
+pid = os.fork()
+if pid == 0:
+    os.close(read_fd)
+    # The worker warms up its audio in the background, started at fork
+    started = app.warmup_state['started']
+    deadline = time.time() + 10
+    while not app.warmup_state['done'] and time.time() < deadline:
+        time.sleep(0.05)
+    with wsgi.application.test_client() as client:
+        statuses = [client.get(url).status_code for url in
+                    ['/api/phrases?limit=5', '/api/search?q=pain', '/api/categories', '/api/ready']]
+        same_catalog = app.get_catalog() is catalog
+    os.write(write_fd, json.dumps({'statuses': statuses, 'same_catalog': same_catalog,
+                                   'warmup_started': started}).encode())
+    os._exit(0)
+os.close(write_fd)
+child = json.loads(os.read(read_fd, 65536))
+os.waitpid(pid, 0)
+print(json.dumps({'master': state, 'worker': child}))
+'''
+
+def run_preloaded(script=PRELOAD_SCRIPT, **overrides):
+    env = dict(os.environ, WSGI_PRELOAD='1', AUDIO_WARMUP_CATEGORIES='', CATALOG_WATCH='0')
+    env.update(overrides)
+    result = subprocess.run([sys.executable, '-c', script], env=env,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-300:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_preload_before_fork():
+    """Test that wsgi preloads the catalog, indexes and bodies and freezes them"""
+    try:
+        master = run_preloaded()['master']
+        if not master['loaded'] or not master['hashes'] or master['warmup_started']:
+            print(f"[FAIL] Catalog not preloaded, or warm-up started in the master: {master}")
+            return False
+        if 'search' not in master['indexes'] or 'semantic' not in master['indexes']:
+            print(f"[FAIL] Indexes not preloaded: {master['indexes']}")
+            return False
+        if master['bodies'] < 3:
+            print(f"[FAIL] Expected pre-rendered bodies in the cache, got {master['bodies']}")
+            return False
+        if master['frozen'] < 10000 or not master['gc_enabled']:
+            print(f"[FAIL] Preloaded objects not frozen ({master['frozen']}) or GC left off")
+            return False
+
+        print(f"[PASS] Catalog, {len(master['indexes'])} indexes and {master['bodies']} bodies preloaded, "
+              f"{master['frozen']:,} objects frozen")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Preload test error: {e}")
+        return False
+
+def test_forked_worker_serves():
+    """Test that a forked worker serves from the master's catalog without reloading"""
+    try:
+        worker = run_preloaded()['worker']
+        if worker['statuses'] != [200, 200, 200, 200]:
+            print(f"[FAIL] Worker responses: {worker['statuses']}")
+            return False
+        if not worker['same_catalog']:
+            print("[FAIL] Worker reloaded the catalog instead of using the preloaded one")
+            return False
+        if not worker['warmup_started']:
+            print("[FAIL] Worker did not start its audio warm-up when forked")
+            return False
+
+        print("[PASS] Forked worker serves the preloaded catalog and warms up its audio")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Forked worker test error: {e}")
+        return False
+
+SLOW_TTS_SCRIPT = '''
+import json, time
+import app
+from audio import AudioCache
+
+def slow_synthesizer(text, gtts_lang):
+    time.sleep(1)
+    return b'ID3'
+
+app.audio_service.synthesizer = slow_synthesizer
+app.audio_service.cache = AudioCache()
+start = time.perf_counter()
+import wsgi
+print(json.dumps({'import_seconds': time.perf_counter() - start,
+                  'warmup_done': app.warmup_state['done'], 'clips': app.warmup_state['total']}))
+'''
+
+def test_slow_tts_does_not_stall_boot():
+    """Test that the import does not wait for text-to-speech unless WSGI_WARMUP_AUDIO=1"""
+    try:
+        background = run_preloaded(SLOW_TTS_SCRIPT, AUDIO_WARMUP_CATEGORIES='emergency')
+        if background['warmup_done'] or background['import_seconds'] > 10:
+            print(f"[FAIL] Import waited for the audio warm-up: {background}")
+            return False
+
+        synchronous = run_preloaded(SLOW_TTS_SCRIPT, AUDIO_WARMUP_CATEGORIES='emergency',
+                                    WSGI_WARMUP_AUDIO='1')
+        if not synchronous['warmup_done'] or synchronous['import_seconds'] < synchronous['clips']:
+            print(f"[FAIL] WSGI_WARMUP_AUDIO=1 did not warm up in the master: {synchronous}")
+            return False
+
+        print(f"[PASS] Import took {background['import_seconds']:.1f}s with TTS at 1s per clip; "
+              f"{synchronous['import_seconds']:.1f}s warming {synchronous['clips']} clips with WSGI_WARMUP_AUDIO=1")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Slow TTS boot test error: {e}")
+        return False
+
+def test_sqlite_reconnects_after_fork():
+    """Test that a preloaded SQLite catalog opens its own connection in a worker"""
+    try:
+        from sqlite_store import SQLiteCatalog, import_json
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'phrases.db')
+            import_json(os.path.join('data', 'phrases.json'), db_path)
+            catalog = SQLiteCatalog(db_path)
+            parent_db = catalog._db
+
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                try:
+                    phrase = catalog.get_phrase('phrase_001')
+                    ok = phrase['translations']['en']['text'] == 'Hello, how are you today?' \
+                        and catalog._db is not parent_db
+                except Exception:
+                    ok = False
+                os.write(write_fd, b'1' if ok else b'0')
+                os._exit(0)
+            os.close(write_fd)
+            ok = os.read(read_fd, 1) == b'1'
+            os.waitpid(pid, 0)
+
+            if not ok or catalog._db is not parent_db or catalog.get_phrase('phrase_002') is None:
+                print("[FAIL] Worker reused the parent's SQLite connection or failed to read")
+                return False
+
+        print("[PASS] SQLite catalog reconnects in a forked worker")
+        return True
+    except Exception as e:
+        print(f"[FAIL] SQLite fork test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("PRELOAD VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Preload Before Fork', test_preload_before_fork),
+        ('Forked Worker Serves', test_forked_worker_serves),
+        ('Slow TTS Does Not Stall Boot', test_slow_tts_does_not_stall_boot),
+        ('SQLite Reconnects After Fork', test_sqlite_reconnects_after_fork)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL PRELOAD TESTS PASSED")
+    else:
+        print("[FAILURE] SOME PRELOAD TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,139 @@
+"""
+Projection Verification Tests
+Tests 'langs' and 'fields' projection on the phrase endpoints
+"""
+
+import sys
+
+def test_language_projection():
+    """Test that langs=en,zu keeps only those languages"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            full = client.get('/api/phrases')
+            projected = client.get('/api/phrases?langs=en,zu')
+            data = projected.get_json()
+
+            for phrase in data['phrases']:
+                if set(phrase['translations']) != {'en', 'zu'}:
+                    print(f"[FAIL] {phrase['id']} has languages {set(phrase['translations'])}")
+                    return False
+                if 'categories' not in phrase or 'id' not in phrase:
+                    print("[FAIL] Projection dropped id/categories")
+                    return False
+
+            if len(projected.data) >= len(full.data):
+                print("[FAIL] Projected payload is not smaller")
+                return False
+
+        print(f"[PASS] Language projection ({len(full.data)} -> {len(projected.data)} bytes)")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Language projection test error: {e}")
+        return False
+
+def test_field_projection_all_endpoints():
+    """Test that langs/fields apply to every endpoint returning phrases"""
+    try:
+        from app import app
+
+        def check(phrase):
+            return set(phrase['translations']) == {'zu'} and set(phrase['translations']['zu']) == {'text'}
+
+        with app.test_client() as client:
+            projection = 'langs=zu&fields=text'
+            lists = [
+                f'/api/phrases?{projection}',
+                f'/api/phrases?limit=2&{projection}',
+                f'/api/phrases/category/instructions?{projection}',
+                f'/api/phrases/query?q=symptoms&{projection}'
+            ]
+            for url in lists:
+                if not all(check(p) for p in client.get(url).get_json()['phrases']):
+                    print(f"[FAIL] Projection not applied on {url}")
+                    return False
+
+            results = [
+                f'/api/search?q=please&{projection}',
+                f'/api/suggest?q=pain&{projection}'
+            ]
+            for url in results:
+                if not all(check(r['phrase']) for r in client.get(url).get_json()['results']):
+                    print(f"[FAIL] Projection not applied on {url}")
+                    return False
+
+            phrase = client.get(f'/api/phrase/phrase_001?{projection}').get_json()['phrase']
+            if not check(phrase):
+                print("[FAIL] Projection not applied on single phrase")
+                return False
+
+        print("[PASS] Field projection on all phrase endpoints")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Field projection test error: {e}")
+        return False
+
+def test_projection_errors_and_cache():
+    """Test unknown languages/fields and cached projected bodies"""
+    try:
+        import app as app_module
+
+        with app_module.app.test_client() as client:
+            for url in ['/api/phrases?langs=en,klingon', '/api/phrase/phrase_001?fields=colour']:
+                response = client.get(url)
+                if response.status_code != 400 or response.get_json()['success'] != False:
+                    print(f"[FAIL] {url} should be 400, got {response.status_code}")
+                    return False
+
+            first = client.get('/api/phrases?langs=af,en')
+            hits_before = app_module.body_cache.hits
+            second = client.get('/api/phrases?langs=af,en')
+            if app_module.body_cache.hits != hits_before + 1 or first.data != second.data:
+                print("[FAIL] Repeated projection not served from body cache")
+                return False
+
+        print("[PASS] Projection errors and body cache")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Projection error/cache test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("PROJECTION VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Language Projection', test_language_projection),
+        ('Field Projection on All Endpoints', test_field_projection_all_endpoints),
+        ('Projection Errors and Cache', test_projection_errors_and_cache)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL PROJECTION TESTS PASSED")
+    else:
+        print("[FAILURE] SOME PROJECTION TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
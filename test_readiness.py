@@ -0,0 +1,279 @@
+"""
+Readiness Verification Tests
+Tests the /api/ready endpoint, audio warm-up, clip cache and TTS breaker
+"""
+
+import sys
+import time
+
+FAKE_MP3 = b'ID3' + b'\x00' * 2048
+
+def fake_synthesizer(text, gtts_lang):
+    """Offline stand-in for gTTS"""
+    return FAKE_MP3
+
+def failing_synthesizer(text, gtts_lang):
+    raise RuntimeError('upstream down')
+
+def reset_audio(app_module, synthesizer):
+    """Give the app a fresh cache, breaker and warm-up state"""
+    from audio import AudioCache, CircuitBreaker
+    app_module.audio_service.cache = AudioCache()
+    app_module.audio_service.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    app_module.audio_service.synthesizer = synthesizer
+    # Mark warm-up as started so readiness probes don't spawn a background thread
+    app_module.warmup_state.update(started=True, done=False, passes=0, total=0, generated=0, failed=0,
+                                   retry_in=None)
+
+def test_catalog_indexes():
+    """Test that the catalog is loaded with ID and category indexes"""
+    try:
+        import app as app_module
+        catalog = app_module.get_catalog()
+
+        if len(catalog.by_id) != len(catalog.phrases):
+            print("[FAIL] ID index does not cover every phrase")
+            return False
+
+        emergency = catalog.get_category_phrases('emergency')
+        expected = [p for p in catalog.phrases if 'emergency' in p['categories']]
+        if emergency != expected:
+            print("[FAIL] Category index does not match a linear scan")
+            return False
+
+        if catalog.version < 1 or not catalog.digest:
+            print("[FAIL] Catalog missing version or digest")
+            return False
+
+        print(f"[PASS] Catalog v{catalog.version} indexed ({len(catalog.phrases)} phrases)")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Catalog index test error: {e}")
+        return False
+
+def test_not_ready_before_warmup():
+    """Test that readiness is 503 while the audio warm-up set is cold"""
+    try:
+        import app as app_module
+        reset_audio(app_module, fake_synthesizer)
+
+        with app_module.app.test_client() as client:
+            response = client.get('/api/ready')
+            data = response.get_json()
+
+            if response.status_code != 503:
+                print(f"[FAIL] Cold app should be 503, got {response.status_code}")
+                return False
+
+            if data['status'] != 'warming_up' or data['warmup']['cached'] != 0:
+                print(f"[FAIL] Unexpected warm-up report: {data['warmup']}")
+                return False
+
+        print("[PASS] Readiness is 503 before warm-up")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Cold readiness test error: {e}")
+        return False
+
+def test_ready_after_warmup():
+    """Test that readiness goes green after warm-up and reports state"""
+    try:
+        import app as app_module
+        reset_audio(app_module, fake_synthesizer)
+        app_module.warm_up()
+
+        with app_module.app.test_client() as client:
+            response = client.get('/api/ready')
+            data = response.get_json()
+
+            if response.status_code != 200 or data['status'] != 'ready':
+                print(f"[FAIL] Warm app should be ready, got {response.status_code}: {data}")
+                return False
+
+            for key in ['catalog', 'warmup', 'audio_cache', 'tts_breaker']:
+                if key not in data:
+                    print(f"[FAIL] Readiness report missing '{key}'")
+                    return False
+
+            if data['catalog']['phrases'] == 0 or data['catalog']['version'] is None:
+                print("[FAIL] Catalog version/count not reported")
+                return False
+
+            if data['warmup']['total'] == 0 or data['warmup']['cached'] != data['warmup']['total']:
+                print(f"[FAIL] Warm-up set not fully cached: {data['warmup']}")
+                return False
+
+            if data['tts_breaker']['state'] != 'closed':
+                print("[FAIL] Breaker should be closed")
+                return False
+
+        print(f"[PASS] Ready after warming {data['warmup']['total']} clips")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Warm readiness test error: {e}")
+        return False
+
+def test_audio_served_from_cache():
+    """Test that a cached clip is served without calling TTS again"""
+    try:
+        import app as app_module
+        calls = []
+
+        def counting_synthesizer(text, gtts_lang):
+            calls.append(text)
+            return FAKE_MP3
+
+        reset_audio(app_module, counting_synthesizer)
+
+        with app_module.app.test_client() as client:
+            for _ in range(3):
+                response = client.get('/api/audio/phrase_001/zu')
+                if response.status_code != 200 or response.data != FAKE_MP3:
+                    print(f"[FAIL] Audio request failed: {response.status_code}")
+                    return False
+
+        if len(calls) != 1:
+            print(f"[FAIL] Expected 1 synthesis, got {len(calls)}")
+            return False
+
+        print("[PASS] Repeat audio requests served from cache")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Audio cache test error: {e}")
+        return False
+
+def test_breaker_opens():
+    """Test that repeated TTS failures open the breaker and return 503"""
+    try:
+        import app as app_module
+        reset_audio(app_module, failing_synthesizer)
+
+        with app_module.app.test_client() as client:
+            statuses = [client.get('/api/audio/phrase_001/en').status_code for _ in range(3)]
+
+            if statuses != [500, 500, 503]:
+                print(f"[FAIL] Expected [500, 500, 503], got {statuses}")
+                return False
+
+            response = client.get('/api/audio/phrase_001/en')
+            if 'Retry-After' not in response.headers:
+                print("[FAIL] 503 response missing Retry-After")
+                return False
+
+            response = client.get('/api/ready')
+            if response.get_json()['tts_breaker']['state'] != 'open':
+                print("[FAIL] Readiness does not report open breaker")
+                return False
+
+        print("[PASS] Breaker opens after repeated TTS failures")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Breaker test error: {e}")
+        return False
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_warmup_recovers():
+    """Test that a failed warm-up and clips dropped by a reload are regenerated in the background"""
+    try:
+        import app as app_module
+        from audio import CircuitBreaker
+        reset_audio(app_module, failing_synthesizer)
+        app_module.audio_service.breaker = CircuitBreaker(failure_threshold=1000)
+        app_module.app.config['AUDIO_WARMUP_RETRY'] = 0.2
+        app_module.warmup_state['started'] = False
+
+        with app_module.app.test_client() as client:
+            # The first probe starts the warm-up thread; TTS is down
+            client.get('/api/ready')
+            if not wait_for(lambda: app_module.warmup_state['passes'] >= 1):
+                print("[FAIL] Warm-up pass did not finish")
+                return False
+            response = client.get('/api/ready')
+            data = response.get_json()['warmup']
+            if data['failed'] == 0 or data['retry_in'] is None:
+                print(f"[FAIL] Failed pass not scheduled for a retry: {data}")
+                return False
+            if response.status_code != 503 or data['done']:
+                print(f"[FAIL] Ready after a pass that generated nothing: {response.status_code}")
+                return False
+
+            # TTS recovers - the retry fills the set without a restart
+            app_module.audio_service.synthesizer = fake_synthesizer
+            if not wait_for(lambda: client.get('/api/ready').get_json()['warmup']['failed'] == 0):
+                print("[FAIL] Warm-up was not retried after TTS recovered")
+                return False
+            response = client.get('/api/ready')
+            data = response.get_json()['warmup']
+            if response.status_code != 200 or data['cached'] != data['total']:
+                print(f"[FAIL] Not ready after the retry: {response.status_code} {data}")
+                return False
+
+            # A reload drops an edited emergency phrase's clip; the listeners re-warm it
+            catalog = app_module.get_catalog()
+            phrase, language = app_module.warmup_clips(catalog)[0]
+            app_module.audio_service.cache.delete(app_module.audio_service.key_for(phrase, language))
+            record = {'phrases': {'added': [], 'modified': [], 'deleted': []}}
+            for listener in app_module.catalog_store.listeners:
+                listener(catalog, catalog, record)
+            if client.get('/api/ready').status_code != 200:
+                print("[FAIL] A dropped clip took the worker out of rotation")
+                return False
+            if not wait_for(lambda: app_module.audio_service.is_cached(phrase, language)):
+                print("[FAIL] Dropped clip was not regenerated after the reload")
+                return False
+        passes = app_module.warmup_state['passes']
+
+        print(f"[PASS] Warm-up retried after TTS failure and re-run after a reload ({passes} passes)")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Warm-up recovery test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("READINESS VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Catalog Indexes', test_catalog_indexes),
+        ('Not Ready Before Warm-up', test_not_ready_before_warmup),
+        ('Ready After Warm-up', test_ready_after_warmup),
+        ('Audio Served From Cache', test_audio_served_from_cache),
+        ('TTS Breaker', test_breaker_opens),
+        ('Warm-up Recovers', test_warmup_recovers)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL READINESS TESTS PASSED")
+    else:
+        print("[FAILURE] SOME READINESS TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,479 @@
+"""
+Search Verification Tests
+Tests keyword, fuzzy, autocomplete and situation-finder search
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+def test_search_ranking():
+    """Test that search returns the matching phrase first"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            response = client.get('/api/search?q=open your mouth')
+            data = response.get_json()
+
+            if response.status_code != 200 or not data['success']:
+                print(f"[FAIL] Search returned {response.status_code}")
+                return False
+
+            if not data['results'] or data['results'][0]['phrase']['id'] != 'phrase_008':
+                print(f"[FAIL] Expected phrase_008 first, got {data['results'][:1]}")
+                return False
+
+            scores = [r['score'] for r in data['results']]
+            if scores != sorted(scores, reverse=True):
+                print("[FAIL] Results not sorted by score")
+                return False
+
+        print(f"[PASS] Search ranking ({data['total']} matches)")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Search ranking test error: {e}")
+        return False
+
+def test_search_other_languages():
+    """Test that non-English text and phonetic guides are searchable"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            checks = [
+                ('Sawubona', 'phrase_001', 'zu'),      # Zulu text
+                ('umlomo', 'phrase_008', 'zu'),        # Zulu text
+                ('HOE GAAN', 'phrase_001', 'af'),      # Afrikaans, case-insensitive
+                ('nahm-HLAHN-jeh', 'phrase_001', None) # phonetic guide
+            ]
+            for query, expected_id, expected_lang in checks:
+                data = client.get(f'/api/search?q={query}').get_json()
+                if not data['results'] or data['results'][0]['phrase']['id'] != expected_id:
+                    print(f"[FAIL] '{query}' did not find {expected_id}")
+                    return False
+                if expected_lang and data['results'][0]['language'] != expected_lang:
+                    print(f"[FAIL] '{query}' matched language {data['results'][0]['language']}")
+                    return False
+
+        print("[PASS] All languages and phonetic guides searchable")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Multilingual search test error: {e}")
+        return False
+
+def test_accent_normalization():
+    """Test that accents and case are normalized"""
+    try:
+        from search import normalize, tokenize
+
+        if normalize('Môre') != 'more' or tokenize('Hoë GAAN!') != ['hoe', 'gaan']:
+            print("[FAIL] Accent/case normalization incorrect")
+            return False
+
+        from app import app
+        with app.test_client() as client:
+            plain = client.get('/api/search?q=hoe gaan').get_json()
+            accented = client.get('/api/search?q=Hóe Gáan').get_json()
+            if plain['results'] != accented['results']:
+                print("[FAIL] Accented query gave different results")
+                return False
+
+        print("[PASS] Accent and case normalization")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Normalization test error: {e}")
+        return False
+
+def test_search_filters():
+    """Test language and category filters"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            # 'Sawubona' is Zulu only - an English-only search must not match it
+            data = client.get('/api/search?q=Sawubona&lang=en').get_json()
+            if data['total'] != 0:
+                print("[FAIL] Language filter did not exclude Zulu match")
+                return False
+
+            data = client.get('/api/search?q=please&category=examination').get_json()
+            for result in data['results']:
+                if 'examination' not in result['phrase']['categories']:
+                    print("[FAIL] Category filter returned phrase outside category")
+                    return False
+            if data['total'] == 0:
+                print("[FAIL] Category filter returned nothing")
+                return False
+
+            data = client.get('/api/search?q=please&limit=1').get_json()
+            if len(data['results']) != 1 or data['total'] < 2:
+                print("[FAIL] Limit not applied")
+                return False
+
+        print("[PASS] Language, category and limit filters")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Filter test error: {e}")
+        return False
+
+def test_search_errors():
+    """Test missing query and no-match responses"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            response = client.get('/api/search')
+            if response.status_code != 400 or response.get_json()['success'] != False:
+                print(f"[FAIL] Missing query should be 400, got {response.status_code}")
+                return False
+
+            data = client.get('/api/search?q=xyzzyqwerty').get_json()
+            if data['total'] != 0 or data['results'] != []:
+                print("[FAIL] Nonsense query should return no results")
+                return False
+
+        print("[PASS] Search error handling")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Search error test error: {e}")
+        return False
+
+def test_index_rebuilt_on_reload():
+    """Test that the search index is rebuilt when the data file changes"""
+    try:
+        from app import load_phrases_data
+        from catalog import CatalogStore
+        import search  # noqa: F401
+
+        data = load_phrases_data()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'phrases.json')
+
+            def loader():
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            store = CatalogStore(path, loader)
+            total, _ = store.get().index('search').search('stethoscope')
+            if total != 0:
+                print("[FAIL] Unexpected match before reload")
+                return False
+
+            data['phrases'][0]['translations']['en']['text'] = 'Hello, where is the stethoscope?'
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+
+            catalog = store.get()
+            total, hits = catalog.index('search').search('stethoscope')
+            if total != 1 or hits[0][0] != 'phrase_001' or catalog.version != 2:
+                print("[FAIL] Index not rebuilt after reload")
+                return False
+
+        print("[PASS] Search index rebuilt on catalog reload")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Reload test error: {e}")
+        return False
+
+def test_concepts_reload():
+    """Test that editing concepts.json rebuilds the situation finder, also over a snapshot"""
+    try:
+        import shutil
+        import semantic
+        from catalog import CatalogStore
+        from snapshot import SnapshotFile, compile_snapshot
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'phrases.json')
+            concepts_path = os.path.join(tmp, 'concepts.json')
+            snapshot_path = os.path.join(tmp, 'phrases.snapshot')
+            shutil.copyfile(os.path.join('data', 'phrases.json'), path)
+            shutil.copyfile(os.path.join('data', 'concepts.json'), concepts_path)
+            compile_snapshot(path, snapshot_path)
+
+            def loader():
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+
+            original = semantic.CONCEPTS_FILE
+            semantic.CONCEPTS_FILE = concepts_path
+            try:
+                store = CatalogStore(path, loader, snapshot=SnapshotFile(snapshot_path), index_files=[concepts_path])
+                before = store.get()
+                if concepts_path not in store.watched_paths() or before.index('semantic').search('stethoscope'):
+                    print("[FAIL] Unexpected concepts before the edit")
+                    return False
+
+                with open(concepts_path, 'r', encoding='utf-8') as f:
+                    concepts = json.load(f)
+                concepts['concepts']['examine'].append('stethoscope')
+                with open(concepts_path, 'w', encoding='utf-8') as f:
+                    json.dump(concepts, f)
+                os.utime(concepts_path, ns=(0, os.stat(snapshot_path).st_mtime_ns + 1_000_000))
+
+                catalog = store.get()
+                hits = catalog.index('semantic').search('stethoscope')
+            finally:
+                semantic.CONCEPTS_FILE = original
+
+        if catalog.version != 2 or catalog.digest != before.digest or catalog.source != 'json':
+            print(f"[FAIL] Expected a rebuild from JSON, got version {catalog.version} from {catalog.source}")
+            return False
+        if not hits or hits[0][0] != 'phrase_007':
+            print(f"[FAIL] Edited concepts not used: {hits}")
+            return False
+
+        print("[PASS] Concepts edit rebuilt the situation finder past a stale snapshot")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Concepts reload test error: {e}")
+        return False
+
+def test_fuzzy_search():
+    """Test typo- and pronunciation-tolerant fuzzy search"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            checks = [
+                ('emergensy', 'phrase_010'),     # English typo
+                ('sawbona', 'phrase_001'),       # Zulu, missing letter
+                ('umlomu', 'phrase_008'),        # Zulu, wrong vowel
+                ('sah woo bona', 'phrase_001'),  # typed the way it sounds
+                ('oon jah nee', 'phrase_001')    # matches the phonetic guide
+            ]
+            for query, expected_id in checks:
+                data = client.get(f'/api/search?q={query}&mode=fuzzy').get_json()
+                if not data['results'] or data['results'][0]['phrase']['id'] != expected_id:
+                    top = data['results'][0]['phrase']['id'] if data['results'] else None
+                    print(f"[FAIL] Fuzzy '{query}' expected {expected_id}, got {top}")
+                    return False
+
+            data = client.get('/api/search?q=sawbona&mode=fuzzy').get_json()
+            if data['matches'].get('sawbona') != [{'term': 'sawubona', 'distance': 1}]:
+                print(f"[FAIL] Unexpected fuzzy matches: {data['matches']}")
+                return False
+
+        print("[PASS] Fuzzy search tolerates typos and sound-spelling")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Fuzzy search test error: {e}")
+        return False
+
+def test_fuzzy_edit_bounds():
+    """Test that fuzzy matches respect the edit-distance bound"""
+    try:
+        from search import bounded_levenshtein
+        from app import app
+
+        if bounded_levenshtein('kitten', 'sitting', 3) != 3 or bounded_levenshtein('kitten', 'sitting', 1) != 2:
+            print("[FAIL] Bounded Levenshtein incorrect")
+            return False
+
+        with app.test_client() as client:
+            data = client.get('/api/search?q=sawbona&mode=fuzzy&max_distance=0').get_json()
+            if data['total'] != 0:
+                print("[FAIL] max_distance=0 should only allow exact words")
+                return False
+
+            data = client.get('/api/search?q=emergensy&mode=fuzzy').get_json()
+            for matches in data['matches'].values():
+                if any(m['distance'] > 2 for m in matches):
+                    print("[FAIL] Match exceeds edit-distance bound")
+                    return False
+
+            response = client.get('/api/search?q=test&mode=telepathy')
+            if response.status_code != 400:
+                print("[FAIL] Unknown mode should return 400")
+                return False
+
+        print("[PASS] Fuzzy edit-distance bounds")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Fuzzy bounds test error: {e}")
+        return False
+
+def test_autocomplete():
+    """Test prefix completions for words and whole phrases"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            data = client.get('/api/autocomplete?q=sa&lang=zu').get_json()
+            if 'Sawubona' not in data['words']:
+                print(f"[FAIL] Expected word 'Sawubona', got {data['words']}")
+                return False
+            if data['phrases'] != [{'id': 'phrase_001', 'text': 'Sawubona, unjani namhlanje?'}]:
+                print(f"[FAIL] Unexpected phrase completions: {data['phrases']}")
+                return False
+
+            # Multi-word prefixes only complete whole phrases
+            data = client.get('/api/autocomplete?q=please o&lang=en').get_json()
+            if data['words'] != [] or [p['id'] for p in data['phrases']] != ['phrase_008']:
+                print(f"[FAIL] Multi-word prefix gave {data}")
+                return False
+
+            data = client.get('/api/autocomplete?q=ngicela&lang=zu&category=examination').get_json()
+            if [p['id'] for p in data['phrases']] != ['phrase_008']:
+                print(f"[FAIL] Category filter gave {data['phrases']}")
+                return False
+
+            data = client.get('/api/autocomplete?q=h&lang=af&limit=2').get_json()
+            if len(data['words']) != 2:
+                print("[FAIL] Limit not applied to word completions")
+                return False
+
+            response = client.get('/api/autocomplete?q=a&lang=klingon')
+            if response.status_code != 400:
+                print("[FAIL] Unknown language should return 400")
+                return False
+
+        print("[PASS] Autocomplete words and phrases")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Autocomplete test error: {e}")
+        return False
+
+def test_autocomplete_popularity():
+    """Test that frequently played phrases rank first"""
+    try:
+        import app as app_module
+
+        with app_module.app.test_client() as client:
+            before = client.get('/api/autocomplete?q=please&lang=en').get_json()
+            last = before['phrases'][-1]['id']
+
+            catalog = app_module.get_catalog()
+            for _ in range(3):
+                app_module.phrase_usage.record(last, catalog)
+
+            after = client.get('/api/autocomplete?q=please&lang=en').get_json()
+            if after['phrases'][0]['id'] != last:
+                print(f"[FAIL] Popular phrase {last} not ranked first: {after['phrases']}")
+                return False
+
+        print("[PASS] Autocomplete ranks popular phrases first")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Autocomplete popularity test error: {e}")
+        return False
+
+def test_situation_finder():
+    """Test that plain-language situations find the right phrases"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            checks = [
+                ('I need to ask about chest pain', 'phrase_004'),
+                ('the patient is scared', 'phrase_009'),
+                ('how long have they been sick', 'phrase_005'),
+                ('I want to look in their throat', 'phrase_008'),
+                ('urgent bleeding', 'phrase_010')
+            ]
+            for query, expected_id in checks:
+                data = client.get(f'/api/suggest?q={query}').get_json()
+                if not data['results'] or data['results'][0]['phrase']['id'] != expected_id:
+                    top = data['results'][0]['phrase']['id'] if data['results'] else None
+                    print(f"[FAIL] '{query}' expected {expected_id}, got {top}")
+                    return False
+
+            data = client.get('/api/suggest?q=chest pain').get_json()
+            if 'pain_assessment' not in [c['id'] for c in data['categories']]:
+                print(f"[FAIL] Expected pain_assessment category, got {data['categories']}")
+                return False
+
+        print("[PASS] Situation finder matches plain-language descriptions")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Situation finder test error: {e}")
+        return False
+
+def test_situation_finder_filters():
+    """Test category filter, limit and errors for the situation finder"""
+    try:
+        from app import app
+        import numpy as np
+
+        with app.test_client() as client:
+            data = client.get('/api/suggest?q=open your mouth&category=emergency').get_json()
+            for result in data['results']:
+                if 'emergency' not in result['phrase']['categories']:
+                    print("[FAIL] Category filter returned phrase outside category")
+                    return False
+
+            data = client.get('/api/suggest?q=examine pain&limit=1').get_json()
+            if len(data['results']) != 1:
+                print("[FAIL] Limit not applied")
+                return False
+
+            if client.get('/api/suggest').status_code != 400:
+                print("[FAIL] Missing description should return 400")
+                return False
+
+        from app import get_catalog
+        index = get_catalog().index('semantic')
+        norms = np.linalg.norm(index.matrix, axis=1)
+        if not np.allclose(norms[norms > 0], 1, atol=1e-5):
+            print("[FAIL] Phrase vectors are not L2-normalized")
+            return False
+
+        print("[PASS] Situation finder filters and vectors")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Situation finder filter test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("SEARCH VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Search Ranking', test_search_ranking),
+        ('Multilingual Search', test_search_other_languages),
+        ('Accent Normalization', test_accent_normalization),
+        ('Search Filters', test_search_filters),
+        ('Search Errors', test_search_errors),
+        ('Index Rebuild on Reload', test_index_rebuilt_on_reload),
+        ('Concepts Reload', test_concepts_reload),
+        ('Fuzzy Search', test_fuzzy_search),
+        ('Fuzzy Edit Bounds', test_fuzzy_edit_bounds),
+        ('Autocomplete', test_autocomplete),
+        ('Autocomplete Popularity', test_autocomplete_popularity),
+        ('Situation Finder', test_situation_finder),
+        ('Situation Finder Filters', test_situation_finder_filters)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL SEARCH TESTS PASSED")
+    else:
+        print("[FAILURE] SOME SEARCH TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
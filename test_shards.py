@@ -0,0 +1,291 @@
+"""
+Language Shard Verification Tests
+Tests the sharded backend: splitting, lazy per-language loading,
+eviction and API parity with the in-memory catalog
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+URLS = [
+    '/api/categories',
+    '/api/phrases',
+    '/api/phrases?limit=3&langs=en,zu',
+    '/api/phrases/category/emergency',
+    '/api/phrases/query?q=emergency%20OR%20symptoms&fields=text',
+    '/api/phrases/batch?ids=phrase_003,missing,phrase_001',
+    '/api/phrase/phrase_002?langs=xh',
+    '/api/search?q=pain%20where&lang=en,zu',
+    '/api/search?q=sawubona&mode=fuzzy',
+    '/api/autocomplete?q=he&lang=en',
+    '/api/bootstrap'
+]
+
+class ShardedApp:
+    """Point the app at language shards split from a copy of phrases.json"""
+
+    def __init__(self, app_module, max_languages=0):
+        from serialization import BodyCache
+        from shards import ShardedCatalogStore
+        self.app_module = app_module
+        # Same digest as the in-memory catalog, so start with an empty body cache
+        self.original_body_cache = app_module.body_cache
+        app_module.body_cache = BodyCache()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmp.name, 'phrases.json')
+        self.shard_dir = os.path.join(self.tmp.name, 'shards')
+        shutil.copyfile(app_module.DATA_FILE, self.json_path)
+        self.original_store = app_module.catalog_store
+        self.store = ShardedCatalogStore(self.json_path, self.shard_dir, max_languages=max_languages)
+        app_module.catalog_store = self.store
+
+    def close(self):
+        self.app_module.catalog_store = self.original_store
+        self.app_module.body_cache = self.original_body_cache
+        self.tmp.cleanup()
+
+def strip_versions(data):
+    if isinstance(data, dict):
+        return {k: strip_versions(v) for k, v in data.items() if k != 'version'}
+    return data
+
+def test_api_parity():
+    """Test that routes answer the same from language shards as from memory"""
+    try:
+        import app as app_module
+
+        with app_module.app.test_client() as client:
+            expected = [(client.get(url).status_code, strip_versions(client.get(url).get_json())) for url in URLS]
+
+            sharded_app = ShardedApp(app_module)
+            try:
+                if app_module.get_catalog().source != 'shards':
+                    print("[FAIL] Sharded backend not in use")
+                    return False
+
+                for url, (status, data) in zip(URLS, expected):
+                    response = client.get(url)
+                    if response.status_code != status or strip_versions(response.get_json()) != data:
+                        print(f"[FAIL] {url} differs between backends")
+                        return False
+            finally:
+                sharded_app.close()
+
+        print(f"[PASS] {len(URLS)} requests answered the same from language shards")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Parity test error: {e}")
+        return False
+
+def test_lazy_loading_and_eviction():
+    """Test that shards load on first use and the least recently used is evicted"""
+    try:
+        import app as app_module
+        sharded_app = ShardedApp(app_module, max_languages=2)
+        try:
+            with app_module.app.test_client() as client:
+                catalog = app_module.get_catalog()
+                shard_files = sorted(os.listdir(sharded_app.shard_dir))
+                shard_files += sorted(os.listdir(os.path.join(sharded_app.shard_dir, catalog.digest)))
+                if shard_files != sorted([catalog.digest, 'core.json']) + sorted(f'{l}.json' for l in catalog.languages):
+                    print(f"[FAIL] Unexpected shard files: {shard_files}")
+                    return False
+
+                # Indexes were built from every shard, then the shards were released
+                if catalog.shards.loaded() != [] or len(catalog.languages) != 5:
+                    print(f"[FAIL] Shards left loaded after indexing: {catalog.shards.loaded()}")
+                    return False
+
+                client.get('/api/categories')
+                client.get('/api/phrases/category/emergency?fields=text&langs=zu')
+                if catalog.shards.loaded() != ['zu']:
+                    print(f"[FAIL] Only 'zu' should be loaded, got {catalog.shards.loaded()}")
+                    return False
+
+                client.get('/api/phrase/phrase_001?langs=en')
+                client.get('/api/phrase/phrase_001?langs=zu')
+                client.get('/api/phrases?langs=xh')
+                stats = catalog.shards.stats()
+                if stats['loaded'] != ['zu', 'xh'] or stats['evictions'] != 1:
+                    print(f"[FAIL] Expected 'en' evicted, got {stats}")
+                    return False
+
+                # An evicted language loads again on demand
+                phrase = client.get('/api/phrase/phrase_001?langs=en').get_json()['phrase']
+                if phrase['translations']['en']['text'] != 'Hello, how are you today?':
+                    print("[FAIL] Evicted language not reloaded")
+                    return False
+        finally:
+            sharded_app.close()
+
+        print("[PASS] Language shards load lazily and are evicted LRU")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Lazy loading test error: {e}")
+        return False
+
+def test_resplit_on_change():
+    """Test that editing phrases.json re-splits the shards and records the change"""
+    try:
+        import app as app_module
+        sharded_app = ShardedApp(app_module)
+        try:
+            with app_module.app.test_client() as client:
+                old_catalog = app_module.get_catalog()
+                digest = client.get('/api/phrases?langs=en').get_json()['catalog_version']
+
+                with open(sharded_app.json_path, encoding='utf-8') as f:
+                    data = json.load(f)
+                data['phrases'][0]['translations']['en']['text'] = 'Good morning'
+                for phrase in data['phrases']:
+                    phrase['translations'].pop('nso')
+                with open(sharded_app.json_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                core_path = os.path.join(sharded_app.shard_dir, 'core.json')
+                os.utime(sharded_app.json_path, ns=(0, os.stat(core_path).st_mtime_ns + 1_000_000))
+
+                phrase = client.get('/api/phrase/phrase_001').get_json()['phrase']
+                if phrase['translations']['en']['text'] != 'Good morning' or 'nso' in phrase['translations']:
+                    print("[FAIL] Edited JSON not re-split")
+                    return False
+                new_digest = app_module.get_catalog().digest
+                if os.path.exists(os.path.join(sharded_app.shard_dir, new_digest, 'nso.json')):
+                    print("[FAIL] Shard of removed language written")
+                    return False
+
+                changes = client.get(f'/api/changes?digest={digest}').get_json()
+                if len(changes['phrases']['modified']) != len(data['phrases']):
+                    print(f"[FAIL] Change history wrong: {changes['phrases']}")
+                    return False
+
+                # The previous catalog, still served by other workers, keeps reading its own shards
+                old_translations = old_catalog.get_phrase('phrase_001')['translations']
+                if old_translations['zu']['text'] != 'Sawubona, unjani namhlanje?' or 'text' not in old_translations['nso']:
+                    print("[FAIL] Old catalog lost its shards after the re-split")
+                    return False
+                response = client.get('/api/phrase/phrase_002?langs=zu')
+                if response.status_code != 200:
+                    print(f"[FAIL] Language first read after the re-split answered {response.status_code}")
+                    return False
+        finally:
+            sharded_app.close()
+
+        print("[PASS] Edited JSON re-split with change history")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Re-split test error: {e}")
+        return False
+
+def test_invalid_edit_keeps_serving():
+    """Test that a JSON edit that fails validation leaves the current shards in service"""
+    try:
+        import app as app_module
+        sharded_app = ShardedApp(app_module)
+        try:
+            with app_module.app.test_client() as client:
+                before = client.get('/api/phrases').get_json()
+
+                with open(sharded_app.json_path, encoding='utf-8') as f:
+                    data = json.load(f)
+                data['phrases'][0]['categories'].append('no_such_category')
+                with open(sharded_app.json_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                core_path = os.path.join(sharded_app.shard_dir, 'core.json')
+                os.utime(sharded_app.json_path, ns=(0, os.stat(core_path).st_mtime_ns + 1_000_000))
+
+                statuses = [client.get(url).status_code
+                            for url in ['/api/phrases', '/api/categories', '/api/phrase/phrase_001']]
+                if statuses != [200, 200, 200] or client.get('/api/phrases').get_json() != before:
+                    print(f"[FAIL] Invalid edit changed or broke the API: {statuses}")
+                    return False
+                error = client.get('/api/ready').get_json()['catalog']['import_error']
+                if not error or 'no_such_category' not in error:
+                    print(f"[FAIL] Split error not reported: {error}")
+                    return False
+        finally:
+            sharded_app.close()
+
+        print("[PASS] Invalid edit reported, previous shards served")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Invalid edit test error: {e}")
+        return False
+
+def test_concurrent_splits():
+    """Test that workers splitting the same JSON at once leave one consistent set of shards"""
+    try:
+        from shards import ShardedCatalogStore
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'phrases.json')
+            shard_dir = os.path.join(tmp, 'shards')
+            shutil.copyfile(os.path.join('data', 'phrases.json'), json_path)
+
+            pids = []
+            for _ in range(6):
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        catalog = ShardedCatalogStore(json_path, shard_dir).get()
+                        for phrase in catalog.phrases:
+                            dict(phrase['translations'])
+                        os._exit(0)
+                    except BaseException:
+                        os._exit(1)
+                pids.append(pid)
+            failed = sum(1 for pid in pids if os.waitpid(pid, 0)[1] != 0)
+            leftovers = [name for name in os.listdir(shard_dir) if name.endswith('.tmp')]
+
+        if failed or leftovers:
+            print(f"[FAIL] {failed} worker(s) failed, temporary files left: {leftovers}")
+            return False
+
+        print("[PASS] 6 workers split at once: every shard readable, no temporary files left")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Concurrent split test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("LANGUAGE SHARD VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('API Parity', test_api_parity),
+        ('Lazy Loading And Eviction', test_lazy_loading_and_eviction),
+        ('Re-split On Change', test_resplit_on_change),
+        ('Invalid Edit Keeps Serving', test_invalid_edit_keeps_serving),
+        ('Concurrent Splits', test_concurrent_splits)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL LANGUAGE SHARD TESTS PASSED")
+    else:
+        print("[FAILURE] SOME LANGUAGE SHARD TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
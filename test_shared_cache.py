@@ -0,0 +1,368 @@
+"""
+Shared Cache Verification Tests
+Tests the filesystem and Redis-protocol shared caches (against a local
+stand-in server): TTLs, size limits, stampede protection, outages and
+clips shared between app nodes
+"""
+
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """The subset of the Redis protocol the shared cache uses"""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line.startswith(b'*'):
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        server = self.server
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command, args = args[0].upper(), args[1:]
+            with server.lock:
+                server.commands += 1
+                now = time.monotonic()
+                for key in [k for k, (_, expires) in server.data.items() if expires and expires <= now]:
+                    del server.data[key]
+                if command in (b'PING', b'AUTH', b'SELECT'):
+                    reply = b'+OK\r\n'
+                elif command == b'GET':
+                    value = server.data.get(args[0], (None, None))[0]
+                    reply = b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+                elif command == b'SET':
+                    options = [arg.upper() for arg in args[2:]]
+                    expires = None
+                    if b'PX' in options:
+                        expires = now + int(args[2 + options.index(b'PX') + 1]) / 1000
+                    if b'NX' in options and args[0] in server.data:
+                        reply = b'$-1\r\n'
+                    else:
+                        server.data[args[0]] = (args[1], expires)
+                        reply = b'+OK\r\n'
+                elif command == b'DEL':
+                    reply = b':%d\r\n' % sum(server.data.pop(key, None) is not None for key in args)
+                elif command == b'EXISTS':
+                    reply = b':%d\r\n' % sum(key in server.data for key in args)
+                else:
+                    reply = b'-ERR unknown command\r\n'
+            self.wfile.write(reply)
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.data = {}
+        self.commands = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f'redis://127.0.0.1:{self.server_address[1]}/0'
+
+
+def test_file_cache_limits():
+    """Test that the file cache expires entries, skips large ones and evicts the oldest"""
+    try:
+        from shared_cache import open_shared_cache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = open_shared_cache(tmp, 'audio', ttl=60, max_bytes=10_000, max_entry_bytes=2_000)
+            cache.put('a/en/1', b'clip a')
+            if cache.get('a/en/1') != b'clip a' or 'a/en/1' not in cache or 'b/en/1' in cache:
+                print("[FAIL] Stored entry not read back")
+                return False
+
+            old = time.time() - 120
+            os.utime(cache._path('a/en/1'), (old, old))
+            if cache.get('a/en/1') is not None or os.path.exists(cache._path('a/en/1')):
+                print("[FAIL] Entry older than the TTL was served")
+                return False
+
+            cache.put('big', b'x' * 3_000)
+            if cache.get('big') is not None:
+                print("[FAIL] Entry over max_entry_bytes was stored")
+                return False
+
+            for n in range(12):
+                cache.put(f'clip/{n}', b'y' * 1_500)
+                stamp = time.time() - 30 + n
+                os.utime(cache._path(f'clip/{n}'), (stamp, stamp))
+            cache.evict()
+            stats = cache.stats()
+            if stats['bytes'] > 9_000 or cache.get('clip/0') is not None or cache.get('clip/11') is None:
+                print(f"[FAIL] Eviction did not remove the oldest entries: {stats}")
+                return False
+
+        print(f"[PASS] File cache expired, skipped and evicted entries ({stats['evicted']} evicted)")
+        return True
+    except Exception as e:
+        print(f"[FAIL] File cache test error: {e}")
+        return False
+
+
+def test_redis_cache():
+    """Test the Redis-protocol cache: binary values, TTLs, deletes and namespaces"""
+    try:
+        from shared_cache import open_shared_cache
+
+        server = StandInServer()
+        try:
+            audio = open_shared_cache(server.url, 'audio', ttl=0.2)
+            bodies = open_shared_cache(server.url, 'bodies', ttl=60)
+            clip = bytes(range(256)) * 10 + b'\r\n$-1\r\n'
+            audio.put('p1/en/abc', clip)
+            if audio.get('p1/en/abc') != clip or 'p1/en/abc' not in audio:
+                print("[FAIL] Binary clip not read back intact")
+                return False
+            if bodies.get('p1/en/abc') is not None:
+                print("[FAIL] Namespaces are not kept apart")
+                return False
+
+            time.sleep(0.3)
+            if audio.get('p1/en/abc') is not None:
+                print("[FAIL] Entry outlived its TTL")
+                return False
+
+            bodies.put('1:abc:/api/phrases', b'{"phrases":[]}')
+            if not bodies.delete('1:abc:/api/phrases') or bodies.delete('1:abc:/api/phrases'):
+                print("[FAIL] Delete did not report whether the key existed")
+                return False
+            stats = audio.stats()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        print(f"[PASS] Redis-protocol cache round-trips, expires and namespaces entries "
+              f"({stats['hits']} hits, {stats['misses']} misses)")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Redis cache test error: {e}")
+        return False
+
+
+def test_stampede_protection():
+    """Test that nodes missing the same key at once compute it only once"""
+    try:
+        from shared_cache import FileCache, open_shared_cache
+
+        server = StandInServer()
+        results = {}
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for backend, make in [('redis', lambda: open_shared_cache(server.url, 'audio', ttl=60)),
+                                      ('file', lambda: FileCache(tmp, ttl=60))]:
+                    # Three nodes with four request threads each
+                    nodes = [make() for _ in range(3)]
+                    calls = []
+                    values = []
+
+                    def compute():
+                        calls.append(1)
+                        time.sleep(0.3)
+                        return b'synthesized clip'
+
+                    def request(node):
+                        values.append(node.fill('p9/zu/abc', compute))
+
+                    threads = [threading.Thread(target=request, args=(node,)) for node in nodes for _ in range(4)]
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join(10)
+                    results[backend] = (len(calls), values, sum(node.waited for node in nodes))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        for backend, (computed, values, waited) in results.items():
+            if computed != 1 or values != [b'synthesized clip'] * 12:
+                print(f"[FAIL] {backend}: computed {computed} times for 12 concurrent requests")
+                return False
+            if waited < 2:
+                print(f"[FAIL] {backend}: other nodes did not wait for the first ({waited})")
+                return False
+
+        print("[PASS] 12 concurrent misses on 3 nodes computed once (Redis and file backends)")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Stampede test error: {e}")
+        return False
+
+
+def test_outage_falls_back():
+    """Test that an unreachable cache server behaves as a miss without slowing every request"""
+    try:
+        from shared_cache import RedisCache
+
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        cache = RedisCache(port=port, timeout=0.5, retry_interval=30)
+
+        start = time.perf_counter()
+        values = [cache.fill(f'key/{n}', lambda: b'computed') for n in range(20)]
+        elapsed = time.perf_counter() - start
+        stats = cache.stats()
+
+        if values != [b'computed'] * 20 or stats['available']:
+            print(f"[FAIL] Requests did not fall back to computing: {stats}")
+            return False
+        if elapsed > 1.0:
+            print(f"[FAIL] Outage slowed every request ({elapsed:.2f}s for 20)")
+            return False
+
+        print(f"[PASS] Unreachable server treated as a miss, {stats['errors']} errors, "
+              f"20 requests in {elapsed * 1000:.0f} ms")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Outage test error: {e}")
+        return False
+
+
+def test_nodes_share_clips():
+    """Test that a clip synthesized on one node is served by another without synthesizing"""
+    try:
+        import app as app_module
+        from audio import AudioCache, AudioService
+        from shared_cache import TieredCache, open_shared_cache
+
+        server = StandInServer()
+        try:
+            synthesized = []
+
+            def synthesizer(text, gtts_lang):
+                synthesized.append(text)
+                return b'ID3' + text.encode('utf-8')
+
+            nodes = [AudioService(cache=TieredCache(AudioCache(), open_shared_cache(server.url, 'audio')),
+                                  synthesizer=synthesizer) for _ in range(2)]
+            phrase = app_module.get_catalog().get_phrase('phrase_001')
+            first = nodes[0].get_clip(phrase, 'en')
+            second = nodes[1].get_clip(phrase, 'en')
+            cached = nodes[1].is_cached(phrase, 'zu')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        if first != second or len(synthesized) != 1:
+            print(f"[FAIL] Second node synthesized again ({len(synthesized)} syntheses)")
+            return False
+        if cached:
+            print("[FAIL] Clip never synthesized reported as cached")
+            return False
+
+        print("[PASS] Clip synthesized on one node served by the other from the shared cache")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Shared clip test error: {e}")
+        return False
+
+
+def test_nodes_share_bodies():
+    """Test that nodes serving the same data share rendered bodies whatever their reload count"""
+    try:
+        import app as app_module
+        from catalog import CatalogStore
+        from serialization import BodyCache
+        from shared_cache import TieredCache, open_shared_cache
+
+        renders = []
+        encode_body = app_module.encode_body
+
+        def counting_encode(payload, mimetype):
+            renders.append(mimetype)
+            return encode_body(payload, mimetype)
+
+        original = (app_module.catalog_store, app_module.body_cache, app_module.encode_body)
+        with tempfile.TemporaryDirectory() as tmp:
+            # Node B reloaded the same data twice more, so its version differs from node A's
+            stores = [CatalogStore(app_module.DATA_FILE, app_module.load_phrases_data) for _ in range(2)]
+            stores[0].get()
+            for _ in range(3):
+                stores[1].reload(force=True)
+            app_module.encode_body = counting_encode
+            try:
+                bodies = []
+                for store in stores:
+                    app_module.catalog_store = store
+                    app_module.body_cache = TieredCache(BodyCache(), open_shared_cache(tmp, 'bodies'))
+                    with app_module.app.test_client() as client:
+                        bodies.append(client.get('/api/phrases?limit=5').data)
+            finally:
+                app_module.catalog_store, app_module.body_cache, app_module.encode_body = original
+
+        if stores[0].get().version == stores[1].get().version:
+            print("[FAIL] Nodes should have different versions")
+            return False
+        if len(renders) != 1 or bodies[0] != bodies[1]:
+            print(f"[FAIL] Expected one render shared by both nodes, got {len(renders)}")
+            return False
+
+        print(f"[PASS] Body rendered on a node at version {stores[0].get().version} "
+              f"served at version {stores[1].get().version} from the shared cache")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Shared body test error: {e}")
+        return False
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("SHARED CACHE VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('File Cache Limits', test_file_cache_limits),
+        ('Redis Cache', test_redis_cache),
+        ('Stampede Protection', test_stampede_protection),
+        ('Outage Falls Back', test_outage_falls_back),
+        ('Nodes Share Clips', test_nodes_share_clips),
+        ('Nodes Share Bodies', test_nodes_share_bodies)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL SHARED CACHE TESTS PASSED")
+    else:
+        print("[FAILURE] SOME SHARED CACHE TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,194 @@
+"""
+Snapshot Verification Tests
+Tests compiling phrases.json into a binary snapshot and loading it
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+def make_store(tmp, data=None):
+    """Write phrases.json into tmp and return (json path, snapshot path, store factory)"""
+    import app  # noqa: F401 - registers every index
+    from catalog import CatalogStore
+    from snapshot import SnapshotFile
+
+    json_path = os.path.join(tmp, 'phrases.json')
+    snapshot_path = os.path.join(tmp, 'phrases.snapshot')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data or app.load_phrases_data(), f)
+
+    def loader():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def store():
+        return CatalogStore(json_path, loader, snapshot=SnapshotFile(snapshot_path))
+
+    return json_path, snapshot_path, store
+
+def query_results(catalog):
+    """Results of every index for a few queries, for comparing two catalogs"""
+    return [
+        catalog.index('search').search('pain where'),
+        catalog.index('fuzzy').search('sawubona'),
+        catalog.index('prefix').complete('he', 'en'),
+        [(i, round(s, 5)) for i, s in catalog.index('semantic').search('chest pain')],
+        catalog.index('category_bits').query('emergency OR symptoms').tolist(),
+        catalog.index('projection').project(catalog.phrases[:2], langs=['zu'])
+    ]
+
+def test_snapshot_matches_json():
+    """Test that a catalog loaded from the snapshot answers queries like the JSON one"""
+    try:
+        from snapshot import compile_snapshot
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path, snapshot_path, store = make_store(tmp)
+            from_json = store().get()
+            if from_json.source != 'json':
+                print("[FAIL] Should load JSON before a snapshot exists")
+                return False
+
+            header = compile_snapshot(json_path, snapshot_path)
+            from_snapshot = store().get()
+
+            if from_snapshot.source != 'snapshot':
+                print("[FAIL] Fresh snapshot not used")
+                return False
+
+            if from_snapshot.phrases != from_json.phrases or from_snapshot.digest != from_json.digest:
+                print("[FAIL] Snapshot data or digest differs from JSON")
+                return False
+
+            if query_results(from_snapshot) != query_results(from_json):
+                print("[FAIL] Snapshot indexes give different results")
+                return False
+
+            if sorted(header['indexes']) != sorted(i for i in from_snapshot.indexes if i != 'projection'):
+                print(f"[FAIL] Unexpected prebuilt indexes: {header['indexes']}")
+                return False
+
+        print(f"[PASS] Snapshot with {len(header['indexes'])} prebuilt indexes matches JSON")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Snapshot match test error: {e}")
+        return False
+
+def test_stale_or_corrupt_snapshot_falls_back():
+    """Test that an older or damaged snapshot is ignored in favour of JSON"""
+    try:
+        from snapshot import compile_snapshot
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path, snapshot_path, store = make_store(tmp)
+            compile_snapshot(json_path, snapshot_path)
+
+            # JSON edited after compiling
+            data = json.load(open(json_path, encoding='utf-8'))
+            data['phrases'].pop()
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.utime(json_path, ns=(0, os.stat(snapshot_path).st_mtime_ns + 1_000_000))
+            catalog = store().get()
+            if catalog.source != 'json' or len(catalog.phrases) != len(data['phrases']):
+                print("[FAIL] Stale snapshot should fall back to JSON")
+                return False
+
+            # Recompile, then corrupt the body
+            compile_snapshot(json_path, snapshot_path)
+            with open(snapshot_path, 'r+b') as f:
+                f.seek(-10, os.SEEK_END)
+                f.write(b'\xff' * 10)
+            catalog = store().get()
+            if catalog.source != 'json' or len(catalog.phrases) != len(data['phrases']):
+                print("[FAIL] Corrupt snapshot should fall back to JSON")
+                return False
+
+            # Not a snapshot at all
+            with open(snapshot_path, 'wb') as f:
+                f.write(b'{"phrases": []}')
+            if store().get().source != 'json':
+                print("[FAIL] Garbage snapshot should fall back to JSON")
+                return False
+
+        print("[PASS] Stale and corrupt snapshots fall back to JSON")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Fallback test error: {e}")
+        return False
+
+def test_compile_validates_data():
+    """Test that invalid catalog data is rejected at compile time"""
+    try:
+        import app
+        from catalog import CatalogValidationError
+        from snapshot import compile_snapshot
+
+        data = app.load_phrases_data()
+        data['phrases'].append(dict(data['phrases'][0]))
+        data['phrases'].append({'id': 'broken', 'categories': ['no_such_category'], 'translations': {}})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path, snapshot_path, _ = make_store(tmp, data)
+            try:
+                compile_snapshot(json_path, snapshot_path)
+                print("[FAIL] Invalid data compiled")
+                return False
+            except CatalogValidationError as e:
+                message = str(e)
+
+            for expected in ['Duplicate phrase id', 'unknown category', 'no translations']:
+                if expected not in message:
+                    print(f"[FAIL] Validation error missing '{expected}': {message}")
+                    return False
+
+            if os.path.exists(snapshot_path):
+                print("[FAIL] Snapshot written for invalid data")
+                return False
+
+        print("[PASS] Invalid data rejected at compile time")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Validation test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("SNAPSHOT VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Snapshot Matches JSON', test_snapshot_matches_json),
+        ('Stale Or Corrupt Snapshot Falls Back', test_stale_or_corrupt_snapshot_falls_back),
+        ('Compile Validates Data', test_compile_validates_data)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL SNAPSHOT TESTS PASSED")
+    else:
+        print("[FAILURE] SOME SNAPSHOT TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,322 @@
+"""
+SQLite Store Verification Tests
+Tests the SQLite backend: importer, indexed lookups and API parity with
+the in-memory catalog
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+URLS = [
+    '/api/categories',
+    '/api/phrases',
+    '/api/phrases?limit=3',
+    '/api/phrases/category/emergency',
+    '/api/phrases/category/instructions?limit=1&langs=zu',
+    '/api/phrases/category/unknown',
+    '/api/phrases/query?q=emergency%20OR%20symptoms%20NOT%20greeting',
+    '/api/phrases/query?q=nope',
+    '/api/phrases/query?q=' + '%20OR%20'.join(['emergency', 'symptoms', 'greeting'] * 8),
+    '/api/phrases/query?q=NOT%20(emergency%20(symptoms%20OR%20NOT%20(greeting%20emergency))%20OR%20symptoms)',
+    '/api/phrases/query?q=' + 'NOT%20(' * 10 + 'emergency' + ')' * 10,
+    '/api/phrases/batch?ids=phrase_003,missing,phrase_001',
+    '/api/phrase/phrase_002?fields=text',
+    '/api/phrase/missing',
+    '/api/search?q=sawubona&mode=fuzzy',
+    '/api/autocomplete?q=he&lang=en',
+    '/api/suggest?q=chest%20pain',
+    '/api/bootstrap'
+]
+
+class SQLiteApp:
+    """Point the app at a SQLite store built from a copy of phrases.json"""
+
+    def __init__(self, app_module):
+        from serialization import BodyCache
+        from sqlite_store import SQLiteCatalogStore
+        self.app_module = app_module
+        # Same digest and version as the in-memory catalog, so start with an empty body cache
+        self.original_body_cache = app_module.body_cache
+        app_module.body_cache = BodyCache()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmp.name, 'phrases.json')
+        self.db_path = os.path.join(self.tmp.name, 'phrases.db')
+        shutil.copyfile(app_module.DATA_FILE, self.json_path)
+        self.original_store = app_module.catalog_store
+        self.store = SQLiteCatalogStore(self.json_path, self.db_path)
+        app_module.catalog_store = self.store
+
+    def close(self):
+        self.app_module.catalog_store = self.original_store
+        self.app_module.body_cache = self.original_body_cache
+        self.tmp.cleanup()
+
+def strip_versions(data):
+    if isinstance(data, dict):
+        return {k: strip_versions(v) for k, v in data.items() if k != 'version'}
+    return data
+
+def test_api_parity():
+    """Test that routes answer the same from SQLite as from memory"""
+    try:
+        import app as app_module
+
+        with app_module.app.test_client() as client:
+            expected = [(client.get(url).status_code, strip_versions(client.get(url).get_json())) for url in URLS]
+            expected_search = client.get('/api/search?q=pain%20where&lang=en,zu').get_json()
+
+            sqlite_app = SQLiteApp(app_module)
+            try:
+                if app_module.get_catalog().source != 'sqlite':
+                    print("[FAIL] SQLite backend not in use")
+                    return False
+
+                for url, (status, data) in zip(URLS, expected):
+                    response = client.get(url)
+                    if response.status_code != status or strip_versions(response.get_json()) != data:
+                        print(f"[FAIL] {url} differs between backends")
+                        return False
+
+                # Keyword search ranks with SQLite's BM25 - same matches, scores may differ
+                search = client.get('/api/search?q=pain%20where&lang=en,zu').get_json()
+                if search['total'] != expected_search['total'] or \
+                        {r['phrase']['id'] for r in search['results']} != {r['phrase']['id'] for r in expected_search['results']}:
+                    print("[FAIL] Keyword search matches differ")
+                    return False
+            finally:
+                sqlite_app.close()
+
+        print(f"[PASS] {len(URLS) + 1} requests answered the same from SQLite")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Parity test error: {e}")
+        return False
+
+def test_lookups_use_indexes():
+    """Test the schema and that lookups, category lists and search are index-driven"""
+    try:
+        import app as app_module
+        sqlite_app = SQLiteApp(app_module)
+        try:
+            catalog = app_module.get_catalog()
+            from sqlite_store import PhraseRows
+            if not isinstance(catalog.phrases, PhraseRows):
+                print("[FAIL] Phrases should be read lazily from the database")
+                return False
+
+            # Search fetches only the page; the total comes from the same statement
+            from catalog import Catalog
+            memory_catalog = Catalog(app_module.load_phrases_data()).build_indexes()
+            expected_total, _ = memory_catalog.index('search').search('how are you')
+            fetched = []
+            query = catalog._query
+            catalog._query = lambda sql, params=(): fetched.append(len(query(sql, params))) or query(sql, params)
+            try:
+                total, hits = catalog.index('search').search('how are you', limit=2)
+            finally:
+                del catalog._query
+            if expected_total <= 2 or total != expected_total or len(hits) != 2 or fetched != [2]:
+                print(f"[FAIL] Search fetched {fetched} rows for {len(hits)} hits, total {total} of {expected_total}")
+                return False
+
+            db = sqlite3.connect(sqlite_app.db_path)
+            try:
+                counts = {table: db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                          for table in ['phrases', 'translations', 'phrase_categories', 'translations_fts']}
+                data = app_module.load_phrases_data()
+                if counts['phrases'] != len(data['phrases']) or \
+                        counts['translations'] != sum(len(p['translations']) for p in data['phrases']):
+                    print(f"[FAIL] Import row counts wrong: {counts}")
+                    return False
+
+                plans = {
+                    'id lookup': ('SELECT body FROM phrases WHERE id = ?', ('phrase_001',)),
+                    'category list': ('SELECT p.body FROM phrase_categories pc JOIN phrases p ON p.position = pc.phrase_position '
+                                      'WHERE pc.category_id = ? ORDER BY pc.phrase_position', ('emergency',)),
+                    'language filter': ('SELECT phrase_position FROM translations WHERE language = ?', ('zu',))
+                }
+                for name, (sql, params) in plans.items():
+                    plan = ' '.join(row[-1] for row in db.execute(f'EXPLAIN QUERY PLAN {sql}', params))
+                    if 'USING' not in plan or 'SCAN p' in plan:
+                        print(f"[FAIL] {name} is not index-driven: {plan}")
+                        return False
+            finally:
+                db.close()
+        finally:
+            sqlite_app.close()
+
+        print("[PASS] Import complete and lookups use indexes")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Index test error: {e}")
+        return False
+
+def test_reimport_on_change():
+    """Test that editing phrases.json re-imports the database and records the change"""
+    try:
+        import app as app_module
+        sqlite_app = SQLiteApp(app_module)
+        try:
+            with app_module.app.test_client() as client:
+                old_catalog = app_module.get_catalog()
+                digest = client.get('/api/phrases').get_json()['catalog_version']
+
+                with open(sqlite_app.json_path, encoding='utf-8') as f:
+                    data = json.load(f)
+                data['phrases'][0]['translations']['en']['text'] = 'Good morning'
+                with open(sqlite_app.json_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.utime(sqlite_app.json_path, ns=(0, os.stat(sqlite_app.db_path).st_mtime_ns + 1_000_000))
+
+                phrase = client.get('/api/phrase/phrase_001').get_json()['phrase']
+                if phrase['translations']['en']['text'] != 'Good morning':
+                    print("[FAIL] Edited JSON not re-imported")
+                    return False
+
+                changes = client.get(f'/api/changes?digest={digest}').get_json()
+                if [p['id'] for p in changes['phrases']['modified']] != ['phrase_001']:
+                    print(f"[FAIL] Change history wrong: {changes['phrases']}")
+                    return False
+
+                # The previous catalog keeps reading the file it opened
+                if old_catalog.get_phrase('phrase_001')['translations']['en']['text'] == 'Good morning':
+                    print("[FAIL] Old catalog sees the re-imported data")
+                    return False
+        finally:
+            sqlite_app.close()
+
+        print("[PASS] Edited JSON re-imported with change history")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Re-import test error: {e}")
+        return False
+
+def write_json(path, data, newer_than):
+    """Rewrite phrases.json with an mtime after `newer_than`'s"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.utime(path, ns=(0, os.stat(newer_than).st_mtime_ns + 1_000_000))
+
+def test_invalid_edit_keeps_serving():
+    """Test that a JSON edit that fails validation leaves the current database in service"""
+    try:
+        import app as app_module
+        sqlite_app = SQLiteApp(app_module)
+        try:
+            with app_module.app.test_client() as client:
+                before = client.get('/api/phrases').get_json()
+
+                with open(sqlite_app.json_path, encoding='utf-8') as f:
+                    data = json.load(f)
+                data['phrases'][0]['categories'].append('no_such_category')
+                write_json(sqlite_app.json_path, data, sqlite_app.db_path)
+
+                statuses = [client.get(url).status_code
+                            for url in ['/api/phrases', '/api/categories', '/api/phrase/phrase_001']]
+                if statuses != [200, 200, 200]:
+                    print(f"[FAIL] Invalid edit broke the API: {statuses}")
+                    return False
+                if client.get('/api/phrases').get_json() != before:
+                    print("[FAIL] Phrases changed after a failed import")
+                    return False
+                error = client.get('/api/ready').get_json()['catalog']['import_error']
+                if not error or 'no_such_category' not in error:
+                    print(f"[FAIL] Import error not reported: {error}")
+                    return False
+
+                # Fixing the file imports it
+                data['phrases'][0]['categories'].pop()
+                data['phrases'][0]['translations']['en']['text'] = 'Good morning'
+                write_json(sqlite_app.json_path, data, sqlite_app.json_path)
+                phrase = client.get('/api/phrase/phrase_001').get_json()['phrase']
+                if phrase['translations']['en']['text'] != 'Good morning' or sqlite_app.store.import_error:
+                    print("[FAIL] Fixed JSON not imported")
+                    return False
+        finally:
+            sqlite_app.close()
+
+        print("[PASS] Invalid edit reported, previous database served until the JSON is fixed")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Invalid edit test error: {e}")
+        return False
+
+def test_concurrent_imports():
+    """Test that workers importing the same edit at once leave one valid database"""
+    try:
+        from sqlite_store import SQLiteCatalog, SQLiteCatalogStore
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'phrases.json')
+            db_path = os.path.join(tmp, 'phrases.db')
+            shutil.copyfile(os.path.join('data', 'phrases.json'), json_path)
+
+            pids = []
+            for _ in range(6):
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        SQLiteCatalogStore(json_path, db_path).get()
+                        os._exit(0)
+                    except BaseException:
+                        os._exit(1)
+                pids.append(pid)
+            failed = sum(1 for pid in pids if os.waitpid(pid, 0)[1] != 0)
+
+            leftovers = [name for name in os.listdir(tmp) if name.endswith('.tmp')]
+            phrases = len(SQLiteCatalog(db_path).phrases)
+
+        if failed or leftovers or phrases == 0:
+            print(f"[FAIL] {failed} worker(s) failed, temporary files left: {leftovers}")
+            return False
+
+        print(f"[PASS] 6 workers imported at once: one database of {phrases} phrases, no temporary files left")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Concurrent import test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("SQLITE STORE VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('API Parity', test_api_parity),
+        ('Lookups Use Indexes', test_lookups_use_indexes),
+        ('Re-import On Change', test_reimport_on_change),
+        ('Invalid Edit Keeps Serving', test_invalid_edit_keeps_serving),
+        ('Concurrent Imports', test_concurrent_imports)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL SQLITE STORE TESTS PASSED")
+    else:
+        print("[FAILURE] SOME SQLITE STORE TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
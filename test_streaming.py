@@ -0,0 +1,149 @@
+"""
+Streaming Verification Tests
+Tests NDJSON streaming of the phrase list endpoints
+"""
+
+import json
+import sys
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def test_ndjson_matches_json():
+    """Test that NDJSON streams the same phrases as the JSON response"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            expected = client.get('/api/phrases').get_json()['phrases']
+
+            for response in [
+                client.get('/api/phrases?format=ndjson'),
+                client.get('/api/phrases', headers={'Accept': 'application/x-ndjson'})
+            ]:
+                if not response.is_streamed or response.mimetype != 'application/x-ndjson':
+                    print(f"[FAIL] Expected a streamed NDJSON response, got {response.mimetype}")
+                    return False
+
+                if read_ndjson(response) != expected:
+                    print("[FAIL] NDJSON records differ from JSON phrases")
+                    return False
+
+                if response.headers['X-Total-Count'] != str(len(expected)) or not response.headers.get('X-Catalog-Version'):
+                    print("[FAIL] Missing total/version headers")
+                    return False
+
+            # Browsers and plain clients still get JSON
+            for accept in ['*/*', 'application/json, */*', 'text/html,application/xhtml+xml,*/*;q=0.8']:
+                response = client.get('/api/phrases', headers={'Accept': accept})
+                if response.mimetype != 'application/json':
+                    print(f"[FAIL] Accept '{accept}' should get JSON, got {response.mimetype}")
+                    return False
+
+        print(f"[PASS] NDJSON streams {len(expected)} phrases")
+        return True
+    except Exception as e:
+        print(f"[FAIL] NDJSON test error: {e}")
+        return False
+
+def test_ndjson_category_and_projection():
+    """Test NDJSON on category and query endpoints with projection"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            records = read_ndjson(client.get('/api/phrases/category/emergency?format=ndjson&langs=zu&fields=text'))
+            expected = client.get('/api/phrases/category/emergency?langs=zu&fields=text').get_json()['phrases']
+            if not records or records != expected:
+                print("[FAIL] Category NDJSON differs from JSON")
+                return False
+
+            for record in records:
+                if list(record['translations']) != ['zu'] or list(record['translations']['zu']) != ['text']:
+                    print("[FAIL] Projection not applied to NDJSON records")
+                    return False
+
+            records = read_ndjson(client.get('/api/phrases/query?q=emergency%20OR%20symptoms&format=ndjson'))
+            expected = client.get('/api/phrases/query?q=emergency%20OR%20symptoms').get_json()['phrases']
+            if records != expected:
+                print("[FAIL] Query NDJSON differs from JSON")
+                return False
+
+            response = client.get('/api/phrases?format=ndjson&langs=xx')
+            if response.status_code != 400:
+                print(f"[FAIL] Bad projection should be 400 before streaming, got {response.status_code}")
+                return False
+
+        print("[PASS] NDJSON category, query and projection")
+        return True
+    except Exception as e:
+        print(f"[FAIL] NDJSON category test error: {e}")
+        return False
+
+def test_ndjson_chunking():
+    """Test that the encoder works a chunk at a time"""
+    try:
+        from serialization import ndjson_chunks
+
+        phrases = [{'id': f'p{i}', 'categories': [], 'translations': {'en': {'text': 'é'}}} for i in range(7)]
+        projected = []
+
+        def project(chunk):
+            projected.append(len(chunk))
+            return chunk
+
+        chunks = ndjson_chunks(phrases, project, chunk_size=3)
+        first = next(chunks)
+        if projected != [3] or first.count(b'\n') != 3:
+            print("[FAIL] First chunk should encode only 3 phrases")
+            return False
+
+        body = first + b''.join(chunks)
+        if projected != [3, 3, 1] or [json.loads(line) for line in body.splitlines()] != phrases:
+            print(f"[FAIL] Chunked output wrong: {projected}")
+            return False
+
+        print("[PASS] NDJSON encoded lazily in chunks")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Chunking test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("STREAMING VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('NDJSON Matches JSON', test_ndjson_matches_json),
+        ('NDJSON Category and Projection', test_ndjson_category_and_projection),
+        ('NDJSON Chunking', test_ndjson_chunking)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL STREAMING TESTS PASSED")
+    else:
+        print("[FAILURE] SOME STREAMING TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
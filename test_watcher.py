@@ -0,0 +1,211 @@
+"""
+File Watcher Verification Tests
+Tests the background watcher: debounced change detection with inotify
+and polling, and catalog reloads off the request path
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+def wait_for(condition, timeout=5.0):
+    """Poll `condition` until it is true or `timeout` seconds pass"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+def partial_saves_and_rename(tmp, path):
+    """Write a file in several bursts, then replace it the way editors do"""
+    with open(path, 'w') as f:
+        for chunk in ['{"a": ', '1, ', '"b": 2}']:
+            f.write(chunk)
+            f.flush()
+            time.sleep(0.03)
+    time.sleep(0.6)
+    tmp_path = os.path.join(tmp, '.phrases.json.swp')
+    with open(tmp_path, 'w') as f:
+        f.write('{"a": 3}')
+    os.replace(tmp_path, path)
+
+def test_debounced_changes():
+    """Test that bursts of writes call back once, with inotify and with polling"""
+    try:
+        from watcher import FileWatcher
+        for use_inotify in [True, False]:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'phrases.json')
+                other = os.path.join(tmp, 'notes.txt')
+                calls = []
+                watcher = FileWatcher([path], lambda: calls.append(time.monotonic()), debounce=0.3,
+                                      poll_interval=0.05, use_inotify=use_inotify).start()
+                expected_mode = 'inotify' if use_inotify and sys.platform.startswith('linux') else 'polling'
+                try:
+                    if watcher.mode != expected_mode:
+                        print(f"[FAIL] Expected {expected_mode} mode, got {watcher.mode}")
+                        return False
+
+                    # Other files in the same directory are ignored
+                    with open(other, 'w') as f:
+                        f.write('x')
+                    time.sleep(0.5)
+                    if calls:
+                        print(f"[FAIL] {watcher.mode}: unrelated file triggered a callback")
+                        return False
+
+                    partial_saves_and_rename(tmp, path)
+                    wait_for(lambda: len(calls) >= 2)
+                    time.sleep(0.5)
+                    if len(calls) != 2:
+                        print(f"[FAIL] {watcher.mode}: expected 2 callbacks (burst, rename), got {len(calls)}")
+                        return False
+                finally:
+                    watcher.stop()
+                if watcher.alive():
+                    print("[FAIL] Watcher thread still running after stop()")
+                    return False
+
+        print("[PASS] Partial saves and renames debounced with inotify and polling")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Debounce test error: {e}")
+        return False
+
+def test_callback_errors_counted():
+    """Test that a failing callback is recorded and the watcher keeps going"""
+    try:
+        from watcher import FileWatcher
+        with tempfile.TemporaryDirectory() as tmp:
+            watched = os.path.join(tmp, 'audio')
+            os.mkdir(watched)
+            calls = []
+
+            def callback():
+                calls.append(1)
+                if len(calls) == 1:
+                    raise ValueError('half-written file')
+
+            watcher = FileWatcher([watched], callback, debounce=0.1, poll_interval=0.05).start()
+            try:
+                for name in ['a.mp3', 'b.mp3']:
+                    with open(os.path.join(watched, name), 'wb') as f:
+                        f.write(b'ID3')
+                    if not wait_for(lambda: len(calls) == (1 if name == 'a.mp3' else 2)):
+                        print(f"[FAIL] New file {name} in a watched directory not noticed")
+                        return False
+                stats = watcher.stats()
+            finally:
+                watcher.stop()
+
+            if stats['errors'] != 1 or stats['last_error'] != 'half-written file' or stats['reloads'] != 2:
+                print(f"[FAIL] Unexpected watcher stats: {stats}")
+                return False
+
+        print("[PASS] Callback errors counted without stopping the watcher")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Callback error test error: {e}")
+        return False
+
+def test_store_reloads_in_background():
+    """Test that a watching store reloads on its own and get() stops calling stat()"""
+    try:
+        import app  # noqa: F401 - registers every index with the catalog
+        from catalog import CatalogStore
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'phrases.json')
+            with open(app.DATA_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+
+            def load():
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+
+            store = CatalogStore(path, load)
+            stats = []
+            original_file_mtime = store._file_mtime
+            store._file_mtime = lambda: stats.append(1) or original_file_mtime()
+
+            store.get()
+            store.start_watching(debounce=0.2, poll_interval=0.05)
+            try:
+                stats.clear()
+                for _ in range(100):
+                    store.get()
+                if stats:
+                    print(f"[FAIL] get() checked the file {len(stats)} times while watching")
+                    return False
+
+                reloaded = threading.Event()
+                store.listeners.append(lambda old, new, record: reloaded.set())
+                data['phrases'][0]['translations']['en']['text'] = 'Good morning'
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                if not reloaded.wait(10):
+                    print("[FAIL] Watcher did not reload the edited catalog")
+                    return False
+                if store.get().get_phrase(data['phrases'][0]['id'])['translations']['en']['text'] != 'Good morning':
+                    print("[FAIL] Reloaded catalog misses the edit")
+                    return False
+            finally:
+                store.stop_watching()
+
+            # Without a watcher, get() checks the file again
+            stats.clear()
+            store.get()
+            if not stats or store.watching:
+                print("[FAIL] get() should check the file once the watcher stopped")
+                return False
+
+        print("[PASS] Catalog reloaded by the watcher, no stat() per get()")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Store watcher test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("FILE WATCHER VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Debounced Changes', test_debounced_changes),
+        ('Callback Errors Counted', test_callback_errors_counted),
+        ('Store Reloads In Background', test_store_reloads_in_background)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL FILE WATCHER TESTS PASSED")
+    else:
+        print("[FAILURE] SOME FILE WATCHER TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,147 @@
+"""
+Wire Format Verification Tests
+Tests MessagePack/CBOR responses chosen through the Accept header
+"""
+
+import sys
+
+import cbor2
+import msgpack
+
+DECODERS = {
+    'application/msgpack': lambda body: msgpack.unpackb(body, raw=False),
+    'application/x-msgpack': lambda body: msgpack.unpackb(body, raw=False),
+    'application/cbor': cbor2.loads
+}
+
+URLS = [
+    '/api/categories',
+    '/api/phrases',
+    '/api/phrases?limit=3',
+    '/api/phrases/category/emergency?langs=zu',
+    '/api/phrases/query?q=emergency%20OR%20symptoms',
+    '/api/phrase/phrase_001',
+    '/api/phrases/batch?ids=phrase_001,missing',
+    '/api/bootstrap'
+]
+
+def test_binary_matches_json():
+    """Test that each binary format decodes to the same data as the JSON body"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            for url in URLS:
+                expected = client.get(url).get_json()
+                for mimetype, decode in DECODERS.items():
+                    response = client.get(url, headers={'Accept': mimetype})
+                    if response.mimetype != mimetype:
+                        print(f"[FAIL] {url} with Accept {mimetype} returned {response.mimetype}")
+                        return False
+                    if decode(response.data) != expected:
+                        print(f"[FAIL] {url} as {mimetype} differs from JSON")
+                        return False
+                    if 'Accept' not in response.headers.get('Vary', ''):
+                        print(f"[FAIL] {url} missing Vary: Accept")
+                        return False
+
+        print(f"[PASS] {len(URLS)} endpoints served as MessagePack and CBOR")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Binary format test error: {e}")
+        return False
+
+def test_json_stays_default():
+    """Test that JSON is served unless a binary format is preferred"""
+    try:
+        from app import app
+
+        with app.test_client() as client:
+            for accept in [None, '*/*', 'application/json', 'application/json, application/msgpack;q=0.5', 'text/html']:
+                headers = {'Accept': accept} if accept else {}
+                response = client.get('/api/phrases', headers=headers)
+                if response.mimetype != 'application/json':
+                    print(f"[FAIL] Accept {accept!r} should get JSON, got {response.mimetype}")
+                    return False
+
+            response = client.get('/api/phrases', headers={'Accept': 'application/json;q=0.5, application/cbor'})
+            if response.mimetype != 'application/cbor':
+                print("[FAIL] Preferred CBOR not chosen")
+                return False
+
+            # Errors stay JSON
+            response = client.get('/api/phrase/missing', headers={'Accept': 'application/msgpack'})
+            if response.status_code != 404 or response.get_json()['success'] != False:
+                print("[FAIL] Errors should stay JSON")
+                return False
+
+        print("[PASS] JSON remains the default format")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Default format test error: {e}")
+        return False
+
+def test_encoded_bodies_cached():
+    """Test that encoded bodies are cached per catalog version and format"""
+    try:
+        import app as app_module
+        from serialization import BodyCache
+
+        app_module.body_cache = BodyCache(max_bytes=app_module.app.config['BODY_CACHE_MAX_BYTES'])
+        with app_module.app.test_client() as client:
+            for mimetype in ['application/msgpack', 'application/cbor', 'application/json']:
+                first = client.get('/api/phrases', headers={'Accept': mimetype}).data
+                second = client.get('/api/phrases', headers={'Accept': mimetype}).data
+                if first != second:
+                    print(f"[FAIL] Cached {mimetype} body differs")
+                    return False
+
+        stats = app_module.body_cache.stats()
+        if stats['entries'] != 3 or stats['hits'] != 3:
+            print(f"[FAIL] Expected one cached body per format, got {stats}")
+            return False
+
+        print("[PASS] Encoded bodies cached per format")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Body cache test error: {e}")
+        return False
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("WIRE FORMAT VERIFICATION TESTS")
+    print("=" * 60)
+    print()
+
+    tests = [
+        ('Binary Matches JSON', test_binary_matches_json),
+        ('JSON Stays Default', test_json_stays_default),
+        ('Encoded Bodies Cached', test_encoded_bodies_cached)
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"[ERROR] {name} crashed: {e}")
+            results.append((name, False))
+        print()
+
+    print("=" * 60)
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+    print(f"RESULTS: {passed}/{total} tests passed")
+
+    if passed == total:
+        print("[SUCCESS] ALL WIRE FORMAT TESTS PASSED")
+    else:
+        print("[FAILURE] SOME WIRE FORMAT TESTS FAILED")
+        for name, result in results:
+            if not result:
+                print(f"  - {name}")
+
+    print("=" * 60)
+
+    sys.exit(0 if passed == total else 1)
@@ -0,0 +1,226 @@
+"""
+SA Health App - File Watcher
+Background thread that watches files and directories and calls back,
+debounced, when they change, so requests no longer have to stat() the
+data files to notice edits.
+
+On Linux the watcher uses inotify (through ctypes, no extra package)
+on the parent directory of each watched file, which also catches
+editors that save by writing a temporary file and renaming it. Anywhere
+else, or when inotify cannot be set up, it polls mtimes and sizes.
+
+Changes are debounced: the callback runs once no event has arrived for
+`debounce` seconds (or `max_delay` after the first event at the latest),
+so an editor's partial writes trigger a single reload.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Minimal inotify wrapper; raises OSError if inotify is unavailable"""
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux')
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directories = {}
+
+    def add_directory(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'Cannot watch {path}')
+        self.directories[wd] = path
+
+    def read(self, timeout):
+        """[(directory, name), ...] of the events within `timeout` seconds"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if wd in self.directories:
+                events.append((self.directories[wd], name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _signature(path):
+    """What polling compares: mtime and size of a file, or of a directory's entries"""
+    try:
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                return sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size) for entry in entries)
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+
+class FileWatcher:
+    """Calls `callback()` in a background thread after files or directories change
+
+    `paths` may name files (which need not exist yet) and directories,
+    whose contents are watched. Exceptions raised by the callback are
+    counted in stats() and do not stop the watcher.
+    """
+
+    def __init__(self, paths, callback, debounce=0.5, max_delay=5.0, poll_interval=1.0, use_inotify=True):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode = None
+        self.events = 0
+        self.triggers = 0
+        self.errors = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = None
+        self._watched = {}
+        self._signatures = {}
+
+    def _watches(self):
+        """{directory: names in it whose events count, or None for any name}"""
+        watches = {}
+
+        def add(directory, name):
+            names = watches.setdefault(directory, set())
+            if names is not None:
+                names.add(name)
+
+        for path in self.paths:
+            if os.path.isdir(path):
+                watches[path] = None
+                replaced = path
+            else:
+                add(os.path.dirname(path), os.path.basename(path))
+                replaced = os.path.dirname(path)
+            # Repointing a symlinked directory (e.g. a 'current' build link)
+            # is an event in the link's parent, not in either target
+            if os.path.islink(replaced):
+                add(os.path.dirname(replaced), os.path.basename(replaced))
+        return watches
+
+    def _setup(self):
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._watched = self._watches()
+                for directory in sorted(self._watched):
+                    self._inotify.add_directory(directory)
+                self.mode = 'inotify'
+                return
+            except (OSError, AttributeError):
+                # No inotify (other OS, missing directory, watch limit) - poll instead
+                if self._inotify is not None:
+                    self._inotify.close()
+                    self._inotify = None
+        self._signatures = {path: _signature(path) for path in self.paths}
+        self.mode = 'polling'
+
+    def _relevant(self, directory, name):
+        names = self._watched.get(directory, ())
+        return names is None or name in names
+
+    def _wait(self, timeout):
+        """Wait up to `timeout` seconds; True if a watched path changed"""
+        if self._inotify is not None:
+            return any(self._relevant(directory, name) for directory, name in self._inotify.read(timeout))
+        if self._stop.wait(min(timeout, self.poll_interval)):
+            return False
+        changed = False
+        for path in self.paths:
+            signature = _signature(path)
+            if signature != self._signatures[path]:
+                self._signatures[path] = signature
+                changed = True
+        return changed
+
+    def _run(self):
+        first = last = None
+        while not self._stop.is_set():
+            timeout = self.debounce if last is not None else 1.0
+            if self._wait(timeout):
+                self.events += 1
+                last = time.monotonic()
+                first = first or last
+            if last is None:
+                continue
+            now = time.monotonic()
+            if now - last >= self.debounce or now - first >= self.max_delay:
+                first = last = None
+                self.triggers += 1
+                try:
+                    self.callback()
+                except Exception as e:
+                    self.errors += 1
+                    self.last_error = str(e)
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def start(self):
+        """Start watching; the mode ('inotify' or 'polling') is set on return"""
+        self._setup()
+        self._thread = threading.Thread(target=self._run, name='file-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def alive(self):
+        """False before start(), after stop() and in a process forked from the watching one"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'paths': self.paths,
+            'events': self.events,
+            'reloads': self.triggers,
+            'errors': self.errors,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,76 @@
+"""
+SA Health App - Production WSGI Entry Point
+Loads the catalog and every index once in the server's master process,
+then forks the workers, so they share those pages copy-on-write instead
+of each building their own copy.
+
+The audio warm-up calls text-to-speech, which may be slow or down, so by
+default it does not hold up the import: each worker runs it in the
+background once forked (see app.keep_warm). With WSGI_WARMUP_AUDIO=1 the
+master generates the clips before forking instead, and the workers share
+them too.
+
+Python's cyclic garbage collector writes to every tracked object it
+scans, which would copy the shared pages into each worker one by one.
+preload() therefore runs with the collector off and moves everything it
+loaded into the permanent generation with gc.freeze(), which the
+collector never scans. Reference counting still writes to objects a
+worker touches; the NumPy arrays and byte buffers the indexes (and the
+compact backend's phrase table) are made of keep most of the data in
+buffers that refcounts never touch.
+
+Usage: gunicorn -c gunicorn.conf.py wsgi:application
+"""
+
+import gc
+import os
+
+import app as app_module
+from pipeline import PREBUILT_URLS
+
+# Set to 0 to skip preloading, e.g. when comparing memory use
+PRELOAD = os.environ.get('WSGI_PRELOAD', '1') != '0'
+
+# Set to 1 to generate the warm-up audio in the master, before forking
+WARMUP_AUDIO = os.environ.get('WSGI_WARMUP_AUDIO', '0') == '1'
+
+
+def preload(freeze=True, warmup_audio=WARMUP_AUDIO):
+    """Load and index the catalog, warm the caches, then freeze it all out of the GC
+
+    Returns the loaded catalog. Must run before the workers are forked
+    and with no other threads running; `freeze=False` is only for
+    measuring what the freeze saves (see bench_preload.py).
+    """
+    gc.disable()
+    try:
+        catalog = app_module.catalog_store.get()
+        # Computed on first use otherwise - in every worker
+        catalog.phrase_hashes
+        catalog.category_hashes
+
+        if warmup_audio:
+            app_module.warmup_state['started'] = True
+            app_module.warm_up()
+        else:
+            # No threads in the master: every forked worker starts its own warm-up
+            os.register_at_fork(after_in_child=app_module.start_warmup)
+
+        with app_module.app.test_client() as client:
+            for url in PREBUILT_URLS:
+                client.get(url)
+
+        # The master never serves; each worker starts its own watcher
+        app_module.catalog_store.stop_watching()
+        gc.collect()
+        if freeze:
+            gc.freeze()
+    finally:
+        gc.enable()
+    return catalog
+
+
+if PRELOAD:
+    preload()
+
+application = app_module.app